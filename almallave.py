@@ -8,15 +8,16 @@ import datetime
 import hashlib
 import stat
 import gc
+import time
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from argon2.low_level import hash_secret_raw, Type as ArgonType
-try:
-    import sha3   # de la librería pysha3 (para keccak256)
-except ImportError:
-    import sha3_compat as sha3  # Fallback a pycryptodome
+from keccak_backend import derivar_direccion  # pysha3 o pycryptodome, elegido al importar
 
 
 # Aqui empiezan ls utildades generales (base64, fechas, permisos)
@@ -107,6 +108,102 @@ def derivar_clave_argon2(passphrase: str, salt: bytes,
     )
     return clave
 
+# Perfil de parámetros Argon2id por defecto.
+# calibrar_kdf.py mide el equipo y escribe el perfil; crear_keystore lo usa cuando no recibe kdf_params.
+
+KDF_PARAMS_POR_DEFECTO = {
+    "time_cost": 2,
+    "memory_cost_kib": 131072,
+    "parallelism": 1
+}
+
+# Memoria total para derivaciones Argon2 simultáneas (el servidor y el aprovisionamiento masivo)
+KDF_PRESUPUESTO_MEMORIA_KIB = int(os.environ.get("KDF_MEMORY_BUDGET_KIB", 4 * 131072))
+
+# Mínimo de memoria aceptado al calibrar (19 MiB, recomendación OWASP para Argon2id)
+KDF_MEMORIA_MINIMA_KIB = 19456
+
+RUTA_PERFIL_KDF = os.environ.get(
+    "KDF_PROFILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "kdf_profile.json")
+)
+
+def cargar_perfil_kdf(path: str = None) -> dict:
+    """Lee el perfil de Argon2id; si no existe o es inválido usa los valores por defecto."""
+    path = path or RUTA_PERFIL_KDF
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            perfil = json.load(f)
+        return {
+            "time_cost": max(1, int(perfil["time_cost"])),
+            "memory_cost_kib": max(8, int(perfil["memory_cost_kib"])),
+            "parallelism": max(1, int(perfil["parallelism"]))
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return dict(KDF_PARAMS_POR_DEFECTO)
+
+def guardar_perfil_kdf(params: dict, path: str = None) -> str:
+    """Guarda el perfil de Argon2id que usará crear_keystore por defecto."""
+    path = path or RUTA_PERFIL_KDF
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(params, f, sort_keys=True, indent=2)
+    return path
+
+def _medir_argon2(time_cost: int, memory_cost_kib: int, parallelism: int) -> float:
+    # Una derivación de prueba; regresa los milisegundos que tardó
+    inicio = time.perf_counter()
+    derivar_clave_argon2(b"calibracion", os.urandom(16), time_cost=time_cost,
+                         memory_cost_kib=memory_cost_kib, parallelism=parallelism)
+    return (time.perf_counter() - inicio) * 1000.0
+
+def calibrar_argon2(objetivo_ms: float = 500.0, memoria_max_kib: int = 262144,
+                    lanes: int = None, time_cost_max: int = 10) -> dict:
+    """
+    Busca parámetros Argon2id que tarden cerca de objetivo_ms en este equipo.
+    Se prioriza memoria (hasta memoria_max_kib) y luego se sube time_cost.
+    lanes: carriles en paralelo; por defecto uno por núcleo (máximo 8).
+    """
+    if lanes is None:
+        lanes = min(os.cpu_count() or 1, 8)
+    lanes = max(1, int(lanes))
+
+    # 1) Memoria: la mayor potencia de dos (<= máximo) que con time_cost=1 quepa en el objetivo
+    memoria = max(8 * lanes, int(memoria_max_kib))
+    medido = _medir_argon2(1, memoria, lanes)
+    while medido > objetivo_ms and memoria // 2 >= max(KDF_MEMORIA_MINIMA_KIB, 8 * lanes):
+        memoria //= 2
+        medido = _medir_argon2(1, memoria, lanes)
+
+    # 2) Tiempo: el costo crece casi lineal con time_cost
+    time_cost = max(1, min(time_cost_max, int(objetivo_ms // max(medido, 1e-3))))
+    if time_cost > 1:
+        medido = _medir_argon2(time_cost, memoria, lanes)
+        while medido > objetivo_ms * 1.1 and time_cost > 1:
+            time_cost -= 1
+            medido = _medir_argon2(time_cost, memoria, lanes)
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost_kib": memoria,
+        "parallelism": lanes,
+        "medido_ms": round(medido, 1)
+    }
+
+# Deriva la clave directamente o a través de un ejecutor acotado (ver app/kdf_pool.py),
+# que reserva memory_cost_kib de su presupuesto de memoria mientras corre Argon2.
+
+def _derivar_con_ejecutor(ejecutor_kdf, passphrase, salt, time_cost, memory_cost_kib,
+                          parallelism, longitud=32) -> bytes:
+
+    if ejecutor_kdf is None:
+        return derivar_clave_argon2(passphrase, salt, time_cost=time_cost,
+                                    memory_cost_kib=memory_cost_kib,
+                                    parallelism=parallelism, longitud=longitud)
+
+    return ejecutor_kdf.ejecutar(memory_cost_kib, derivar_clave_argon2, passphrase, salt,
+                                 time_cost=time_cost, memory_cost_kib=memory_cost_kib,
+                                 parallelism=parallelism, longitud=longitud)
+
 # -------------------------------------------------------------
 # Alternativa PBKDF2 en caso de no tener Argon2 es más antiguo pero por si las moscas
 # -------------------------------------------------------------
@@ -150,12 +247,8 @@ def descifrar_llave_privada(ciphertext: bytes, tag: bytes,
 
 
 def derivar_direccion_keccak(pubkey_bytes: bytes) -> str:
-    
-    k = sha3.keccak_256()
-    k.update(pubkey_bytes)
-    h = k.digest()
-    direccion = h[12:]
-    return "0x" + direccion.hex()
+
+    return derivar_direccion(pubkey_bytes)
 
 
 # Checksum del archivo JSON (sin incluir el campo checksum)
@@ -181,24 +274,56 @@ def generar_checksum(obj: dict, excluir: str = "checksum_hex") -> str:
 def crear_keystore(path: str, passphrase: str,
                    esquema: str = "Ed25519",
                    kdf_params=None,
-                   cifrado="AES-256-GCM"):
-   
+                   cifrado="AES-256-GCM",
+                   ejecutor_kdf=None,
+                   llave_privada=None):
+
+    obj, _, _ = _crear_keystore(path, passphrase, esquema, kdf_params, cifrado, ejecutor_kdf,
+                                llave_privada)
+    return obj
+
+# Crea el keystore y regresa la wallet ya desbloqueada, con una sola derivación Argon2.
+# Evita el cargar_keystore inmediato (releer el archivo, checksum y un segundo Argon2).
+
+def crear_keystore_desbloqueado(path: str, passphrase: str,
+                                esquema: str = "Ed25519",
+                                kdf_params=None,
+                                cifrado="AES-256-GCM",
+                                ejecutor_kdf=None):
 
-    # 1) Generar par de llaves
-    priv_obj, priv_bytes, pub_bytes = generar_par_ed25519_raw()
+    obj, priv_obj, pub_bytes = _crear_keystore(path, passphrase, esquema, kdf_params,
+                                               cifrado, ejecutor_kdf)
+    direccion = derivar_direccion_keccak(pub_bytes)
+    return priv_obj, pub_bytes, direccion, obj
+
+def _crear_keystore(path, passphrase, esquema, kdf_params, cifrado, ejecutor_kdf,
+                    llave_privada=None):
+
+
+    # 1) Generar par de llaves (o usar la recibida, p. ej. la encontrada por vanity.py)
+    if llave_privada is None:
+        priv_obj, priv_bytes, pub_bytes = generar_par_ed25519_raw()
+    else:
+        priv_obj = llave_privada
+        priv_bytes = priv_obj.private_bytes(
+            encoding = serialization.Encoding.Raw,
+            format = serialization.PrivateFormat.Raw,
+            encryption_algorithm = serialization.NoEncryption()
+        )
+        pub_bytes = priv_obj.public_key().public_bytes(
+            encoding = serialization.Encoding.Raw,
+            format = serialization.PublicFormat.Raw
+        )
 
     # 2) Generar un salt aleatorio
     salt = os.urandom(16)
 
-    # 3) Derivar la clave con Argon2id
+    # 3) Derivar la clave con Argon2id (perfil calibrado del equipo si existe)
     if kdf_params is None:
-        kdf_params = {
-            "time_cost": 2,
-            "memory_cost_kib": 131072,
-            "parallelism": 1
-        }
+        kdf_params = cargar_perfil_kdf()
 
-    clave_derivada = derivar_clave_argon2(
+    clave_derivada = _derivar_con_ejecutor(
+        ejecutor_kdf,
         passphrase,
         salt,
         time_cost=kdf_params["time_cost"],
@@ -234,9 +359,8 @@ def crear_keystore(path: str, passphrase: str,
     # 7) Calcular checksum
     obj["checksum_hex"] = generar_checksum(obj, "checksum_hex")
 
-    # 8) Guardar archivo
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, sort_keys=True, indent=2, ensure_ascii=False)
+    # 8) Guardar archivo (escritura atómica: nunca queda un keystore a medias)
+    _escribir_json_atomico(path, obj)
 
     establecer_permiso_solo_usuario(path)
 
@@ -249,11 +373,95 @@ def crear_keystore(path: str, passphrase: str,
     except:
         pass
 
-    return obj
+    return obj, priv_obj, pub_bytes
+
+# Escribe un JSON en un temporal del mismo directorio y lo renombra al destino.
+
+def _escribir_json_atomico(path: str, obj) -> None:
+
+    directorio = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directorio, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f, sort_keys=True, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+# Aprovisionamiento masivo de wallets
+# Genera n keystores en un pool de procesos; el número de procesos se limita para que
+# las derivaciones Argon2 simultáneas no pasen de memoria_max_kib (por defecto el presupuesto
+# KDF) y para que sus lanes de parallelism no excedan los núcleos.
+
+def _provisionar_uno(tarea):
+    # Corre en un proceso del pool; la llave privada nunca sale del proceso
+    path, passphrase, kdf_params = tarea
+    obj, _, pub_bytes = _crear_keystore(path, passphrase, "Ed25519", kdf_params,
+                                        "AES-256-GCM", None)
+    return {
+        "address": derivar_direccion_keccak(pub_bytes),
+        "path": path,
+        "pubkey_b64": obj["pubkey_b64"]
+    }
+
+def _resolver_passphrases(passphrase_source, n: int) -> list:
+    if isinstance(passphrase_source, str):
+        return [passphrase_source] * n
+    if callable(passphrase_source):
+        return [passphrase_source(i) for i in range(n)]
+    passphrases = list(itertools.islice(passphrase_source, n))
+    if len(passphrases) < n:
+        raise ValueError(f"Se requieren {n} passphrases y solo hay {len(passphrases)}.")
+    return passphrases
+
+def _workers_lote(n: int, workers: int, memoria_max_kib: int, kdf_params) -> int:
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, int(kdf_params.get("parallelism", 1))))
+    if memoria_max_kib is None:
+        memoria_max_kib = KDF_PRESUPUESTO_MEMORIA_KIB
+    workers = min(workers, max(1, memoria_max_kib // int(kdf_params["memory_cost_kib"])))
+    return max(1, min(workers, n))
+
+def crear_keystores_lote(n: int, directorio: str, passphrase_source,
+                         workers: int = None, memoria_max_kib: int = None,
+                         kdf_params=None, manifiesto: str = "manifest.json",
+                         prefijo: str = "wallet"):
+    """
+    Crea n keystores en `directorio` y escribe un manifiesto address -> path -> pubkey.
+    passphrase_source: un str (la misma para todas), una función i -> str o un iterable de str.
+    Regresa la lista de entradas del manifiesto en el orden de creación.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    if kdf_params is None:
+        kdf_params = cargar_perfil_kdf()
+    passphrases = _resolver_passphrases(passphrase_source, n)
+
+    workers = _workers_lote(n, workers, memoria_max_kib, kdf_params)
+
+    ancho = max(6, len(str(n)))
+    tareas = [
+        (os.path.join(directorio, f"{prefijo}_{i:0{ancho}d}.json"), passphrases[i], kdf_params)
+        for i in range(n)
+    ]
+
+    if workers == 1:
+        entradas = [_provisionar_uno(t) for t in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entradas = list(pool.map(_provisionar_uno, tareas))
+
+    _escribir_json_atomico(os.path.join(directorio, manifiesto), entradas)
+    return entradas
+
 
 # Lo siguiente carga un archivo keystore, valida su checksum y recupera la llave privada real descifrándola.
 
-def cargar_keystore(path: str, passphrase: str):
+def cargar_keystore(path: str, passphrase: str, ejecutor_kdf=None):
 
 
 
@@ -281,7 +489,8 @@ def cargar_keystore(path: str, passphrase: str):
     pub_bytes = de_base64(obj["pubkey_b64"])
 
     # Derivar la clave nuevamente
-    clave = derivar_clave_argon2(
+    clave = _derivar_con_ejecutor(
+        ejecutor_kdf,
         passphrase,
         salt,
         time_cost=int(kdfp["time_cost"]),
@@ -3,30 +3,119 @@ API Server para Crypto Cold Wallet
 Conecta el frontend HTML/CSS/JS con el backend Python
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g
 from flask_cors import CORS
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import atexit
 import json
 import base64
 import os
+import time
 from pathlib import Path
 from datetime import datetime
 
 # Importar módulos del proyecto
 from almallave import (
-    crear_keystore,
+    crear_keystore_desbloqueado,
     cargar_keystore,
-    derivar_direccion_keccak,
-    a_base64
+    a_base64,
+    KDF_PRESUPUESTO_MEMORIA_KIB
 )
-from app.signer import Signer
+from keccak_backend import direccion_cacheada
+from app.cache import CacheLRU
+from app.kdf_pool import KdfPool, PoolSaturado, MemoriaExcedida
+from app.metrics import Registro, BUCKETS_KDF, CONTENT_TYPE
+from app.profiling import Perfilador, iniciar_tracemalloc, instantanea_memoria
+from app.session_store import SessionStore
 from app.transaction import Transaction
-from verifier import verificar_firma, NonceStore, VerificaResultato
+from verifier import verificar_firma, verificar_lote, NonceStore, VerificaResultato, VERIFICADORES, RECUPERABLES
+from indice_tx import IndiceTransacciones, LIMITE_POR_DEFECTO
 
 app = Flask(__name__, static_folder='.')
 CORS(app)  # Permitir CORS para desarrollo
 
-# Estado de la sesión (en producción usar sesiones seguras)
-active_wallets = {}
+# Métricas en formato Prometheus (/api/metrics); cada colector solo toma un lock corto al sumar
+metricas = Registro()
+http_requests = metricas.contador('http_requests_total', 'Peticiones HTTP atendidas', ('endpoint', 'method', 'status'))
+http_latencia = metricas.histograma('http_request_duration_seconds', 'Latencia de las peticiones HTTP', ('endpoint',))
+kdf_duracion = metricas.histograma('kdf_argon2_duration_seconds', 'Duración de cada derivación Argon2', buckets=BUCKETS_KDF)
+kdf_espera = metricas.histograma('kdf_queue_wait_seconds', 'Espera por cupo en el pool de Argon2', buckets=BUCKETS_KDF)
+firmas_total = metricas.contador('signatures_total', 'Transacciones firmadas', ('scheme',))
+verificaciones_total = metricas.contador('signature_verifications_total', 'Verificaciones de firma por resultado', ('endpoint', 'razon'))
+cripto_latencia = metricas.histograma('crypto_operation_duration_seconds', 'Tiempo de firma/verificación por petición', ('operation',))
+
+# Sesiones de wallets desbloqueadas, con expiración por inactividad/edad y límite LRU
+active_wallets = SessionStore(
+    idle_ttl=int(os.environ.get('SESSION_IDLE_TTL', 900)),
+    absolute_ttl=int(os.environ.get('SESSION_ABSOLUTE_TTL', 8 * 3600)),
+    max_entries=int(os.environ.get('SESSION_MAX_ENTRIES', 1000)),
+    sweep_interval=int(os.environ.get('SESSION_SWEEP_INTERVAL', 60))
+)
+active_wallets.iniciar_barrido()
+
+# Pool acotado para Argon2: cada derivación reserva su memoria del presupuesto;
+# si la cola se llena se responde 503 con Retry-After en lugar de agotar la RAM
+kdf_pool = KdfPool(
+    memoria_max_kib=KDF_PRESUPUESTO_MEMORIA_KIB,
+    max_workers=int(os.environ.get('KDF_WORKERS', min(4, os.cpu_count() or 1))),
+    max_cola=int(os.environ.get('KDF_MAX_QUEUE', 16)),
+    espera_max=float(os.environ.get('KDF_MAX_WAIT', 30)),
+    retry_after=int(os.environ.get('KDF_RETRY_AFTER', 2)),
+    observador=lambda duracion, espera: (kdf_duracion.observe(duracion), kdf_espera.observe(espera))
+)
+
+# Resultados de verificación sin estado (firma y dirección, nunca el nonce) para sobres repetidos
+# llave: (esquema, pubkey, sha256 de los bytes canónicos, firma); VERIFY_CACHE_SIZE=0 lo desactiva
+verification_cache = CacheLRU(
+    max_entries=int(os.environ.get('VERIFY_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('VERIFY_CACHE_TTL', 300))
+)
+
+# Índice de transacciones verificadas; lo actualiza simulator.py al procesar el inbox
+tx_index = IndiceTransacciones(os.environ.get('TX_INDEX_PATH', 'verified_index.sqlite3'))
+
+# Valores instantáneos: se leen solo cuando se piden las métricas
+metricas.medidor('sessions_active', 'Wallets desbloqueadas en memoria', lambda: len(active_wallets))
+metricas.medidor('kdf_queue_depth', 'Derivaciones esperando cupo en el pool', lambda: kdf_pool.stats()['queue_depth'])
+metricas.medidor('kdf_running', 'Derivaciones Argon2 en ejecución', lambda: kdf_pool.stats()['running'])
+metricas.medidor('verification_cache_entries', 'Resultados en el caché de verificación', lambda: len(verification_cache))
+metricas.medidor('verification_cache_hit_ratio', 'Tasa de aciertos del caché de verificación',
+                 lambda: verification_cache.stats()['hit_rate'])
+
+
+# Perfilado opcional: cProfile por petición (muestreo o header X-Profile) y tracemalloc.
+# Apagado por defecto; los .pstats quedan en PROFILE_DIR
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_DEBUG_ENDPOINTS = os.environ.get('PROFILE_DEBUG_ENDPOINTS', '0') == '1'
+perfilador = Perfilador(
+    directorio=PROFILE_DIR,
+    muestreo=float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0)),
+    permitir_header=os.environ.get('PROFILE_ALLOW_HEADER', '0') == '1'
+)
+if os.environ.get('PROFILE_TRACEMALLOC', '0') == '1':
+    iniciar_tracemalloc(int(os.environ.get('PROFILE_TRACEMALLOC_FRAMES', 1)))
+
+
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+    if perfilador.activo and perfilador.debe_perfilar(request.headers.get('X-Profile')):
+        g.perfil = perfilador.iniciar()
+
+
+@app.after_request
+def registrar_medicion(response):
+    inicio = g.pop('inicio_peticion', None)
+    if inicio is not None:
+        endpoint = request.endpoint or 'desconocido'  # Nombre de la vista: cardinalidad acotada
+        http_latencia.observe(time.perf_counter() - inicio, endpoint)
+        http_requests.inc(endpoint, request.method, response.status_code)
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        ruta = perfilador.terminar(perfil, request.endpoint or 'desconocido')
+        response.headers['X-Profile-File'] = ruta.name
+    return response
 
 # ==================== Rutas para servir el frontend ====================
 
@@ -40,6 +129,52 @@ def serve_static(path):
     """Sirve archivos estáticos (CSS, JS)"""
     return send_from_directory('.', path)
 
+# ==================== Utilidades ====================
+
+# Máximo de transacciones aceptadas en una sola petición de firma por lote
+MAX_BATCH_SIZE = 1000
+
+# Máximo de sobres aceptados en una sola petición de verificación por lote
+MAX_VERIFY_BATCH_SIZE = 10000
+
+# Procesos para la verificación por lote (por defecto uno por núcleo)
+VERIFY_WORKERS = int(os.environ.get('VERIFY_WORKERS', os.cpu_count() or 1))
+
+# Un solo pool compartido por todas las peticiones de verify-batch: levantar procesos por petición
+# dominaba la latencia y las peticiones concurrentes multiplicaban los procesos
+verify_pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS) if VERIFY_WORKERS > 1 else None
+if verify_pool is not None:
+    atexit.register(verify_pool.shutdown, wait=False, cancel_futures=True)
+
+
+def transaccion_desde_json(tx_data, timestamp=None):
+    """
+    Construye un Transaction a partir del JSON recibido del frontend
+    tx_data: { from, to, value, nonce, data_hex }
+    """
+    if timestamp is None:
+        timestamp = datetime.utcnow().isoformat() + 'Z'
+
+    return Transaction(
+        sender=tx_data.get('from'),
+        receiver=tx_data.get('to'),
+        value=tx_data.get('value'),
+        nonce=int(tx_data.get('nonce', 0)),
+        data_hex=tx_data.get('data_hex', ''),
+        timestamp=timestamp
+    )
+
+def respuesta_saturado(error):
+    """
+    Respuesta rápida cuando el pool de Argon2 no tiene cupo
+    """
+    response = jsonify({
+        'success': False,
+        'error': str(error)
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 # ==================== API Endpoints ====================
 
 @app.route('/api/wallet/create', methods=['POST'])
@@ -67,28 +202,18 @@ def create_wallet():
                 'error': 'La passphrase debe tener al menos 8 caracteres'
             }), 400
 
-        # Crear el keystore
-        keystore_data = crear_keystore(keystore_path, passphrase)
-
-        # Extraer llave pública
-        pub_bytes_b64 = keystore_data['pubkey_b64']
-        pub_bytes = base64.b64decode(pub_bytes_b64)
-
-        # Derivar dirección
-        address = derivar_direccion_keccak(pub_bytes)
-
-        # Cargar la wallet para obtener el objeto completo
-        priv_key, pub_bytes, metadata = cargar_keystore(keystore_path, passphrase)
+        # Crear el keystore y obtener la wallet ya desbloqueada (una sola derivación Argon2)
+        priv_key, pub_bytes, address, keystore_data = crear_keystore_desbloqueado(
+            keystore_path, passphrase, ejecutor_kdf=kdf_pool
+        )
 
         # Guardar en sesión activa
-        session_id = os.urandom(16).hex()
-        active_wallets[session_id] = {
-            'private_key': priv_key,
-            'public_key': pub_bytes,
-            'address': address,
-            'keystore_path': keystore_path,
-            'description': description
-        }
+        session_id = active_wallets.create(
+            priv_key,
+            address=address,
+            keystore_path=keystore_path,
+            description=description
+        )
 
         return jsonify({
             'success': True,
@@ -101,6 +226,14 @@ def create_wallet():
             }
         })
 
+    except PoolSaturado as e:
+        return respuesta_saturado(e)
+    except MemoriaExcedida as e:
+        # memory_cost_kib del perfil KDF por encima del presupuesto: no se deriva nunca
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -133,23 +266,21 @@ def load_wallet():
             }), 404
 
         # Cargar el keystore
-        priv_key, pub_bytes, metadata = cargar_keystore(keystore_path, passphrase)
+        priv_key, pub_bytes, metadata = cargar_keystore(keystore_path, passphrase, ejecutor_kdf=kdf_pool)
 
         # Derivar dirección
-        address = derivar_direccion_keccak(pub_bytes)
+        address = direccion_cacheada(pub_bytes)
 
         # Obtener descripción del metadata (si existe)
         description = metadata.get('description', 'Wallet cargada')
 
         # Guardar en sesión activa
-        session_id = os.urandom(16).hex()
-        active_wallets[session_id] = {
-            'private_key': priv_key,
-            'public_key': pub_bytes,
-            'address': address,
-            'keystore_path': keystore_path,
-            'description': description
-        }
+        session_id = active_wallets.create(
+            priv_key,
+            address=address,
+            keystore_path=keystore_path,
+            description=description
+        )
 
         return jsonify({
             'success': True,
@@ -162,6 +293,14 @@ def load_wallet():
             }
         })
 
+    except PoolSaturado as e:
+        return respuesta_saturado(e)
+    except MemoriaExcedida as e:
+        # memory_cost_kib del keystore por encima del presupuesto: no se deriva nunca
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except ValueError as e:
         # Error de passphrase incorrecta o checksum
         return jsonify({
@@ -186,7 +325,8 @@ def sign_transaction():
         session_id = data.get('sessionId')
         tx_data = data.get('transaction')
 
-        if not session_id or session_id not in active_wallets:
+        wallet = active_wallets.get(session_id)
+        if wallet is None:
             return jsonify({
                 'success': False,
                 'error': 'Sesión inválida o expirada. Debes cargar una wallet primero.'
@@ -198,21 +338,14 @@ def sign_transaction():
                 'error': 'Datos de transacción requeridos'
             }), 400
 
-        wallet = active_wallets[session_id]
-
         # Crear objeto Transaction (ajustar a los parámetros de tu clase)
-        transaction = Transaction(
-            sender=tx_data.get('from'),
-            receiver=tx_data.get('to'),
-            value=tx_data.get('value'),
-            nonce=int(tx_data.get('nonce', 0)),
-            data_hex=tx_data.get('data_hex', ''),
-            timestamp=datetime.utcnow().isoformat() + 'Z'
-        )
+        transaction = transaccion_desde_json(tx_data)
 
-        # Crear Signer y firmar
-        signer = Signer(wallet['private_key'])
-        signed_data = signer.sign_transaction(transaction)
+        # Firmar con el Signer cacheado en la sesión
+        inicio = time.perf_counter()
+        signed_data = wallet['signer'].sign_transaction(transaction)
+        cripto_latencia.observe(time.perf_counter() - inicio, 'sign')
+        firmas_total.inc(signed_data['sig_scheme'])
 
         return jsonify({
             'success': True,
@@ -227,6 +360,78 @@ def sign_transaction():
         }), 500
 
 
+@app.route('/api/wallet/sign-batch', methods=['POST'])
+def sign_batch():
+    """
+    Firma un lote de transacciones con la wallet de una sesión
+    Body: { sessionId, transactions: [ { from, to, value, nonce, data_hex }, ... ] }
+    Los errores se reportan por elemento, en el mismo orden de entrada
+    """
+    try:
+        data = request.json
+        session_id = data.get('sessionId')
+        transactions = data.get('transactions')
+
+        wallet = active_wallets.get(session_id)
+        if wallet is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sesión inválida o expirada. Debes cargar una wallet primero.'
+            }), 401
+
+        if not isinstance(transactions, list) or not transactions:
+            return jsonify({
+                'success': False,
+                'error': 'Se requiere una lista de transacciones'
+            }), 400
+
+        if len(transactions) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'El lote excede el máximo de {MAX_BATCH_SIZE} transacciones'
+            }), 400
+
+        # Construir todas las transacciones; las inválidas se reportan sin detener el lote
+        results = [None] * len(transactions)
+        validas = []
+        indices = []
+        timestamp = datetime.utcnow().isoformat() + 'Z'
+        for i, tx_data in enumerate(transactions):
+            try:
+                if not isinstance(tx_data, dict):
+                    raise ValueError('La transacción debe ser un objeto JSON')
+                validas.append(transaccion_desde_json(tx_data, timestamp))
+                indices.append(i)
+            except Exception as e:
+                results[i] = {'index': i, 'success': False, 'error': str(e)}
+
+        # Un solo Signer (el de la sesión) para todo el lote
+        inicio = time.perf_counter()
+        firmados = wallet['signer'].sign_batch(validas)
+        cripto_latencia.observe(time.perf_counter() - inicio, 'sign_batch')
+        firmas_total.inc(wallet['signer'].sig_scheme, cantidad=len(firmados))
+        for i, signed_data in zip(indices, firmados):
+            results[i] = {
+                'index': i,
+                'success': True,
+                'signature': signed_data['signature_b64'],
+                'signedTransaction': signed_data
+            }
+
+        return jsonify({
+            'success': True,
+            'signed': len(indices),
+            'failed': len(transactions) - len(indices),
+            'results': results
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/signature/verify', methods=['POST'])
 def verify_signature():
     """
@@ -235,7 +440,8 @@ def verify_signature():
         fromAddress,
         originalMessage (JSON string del tx),
         signature (base64),
-        publicKey (base64)
+        publicKey (base64; opcional si sigScheme permite recuperarla de la firma),
+        sigScheme (opcional, 'ed25519' por defecto)
     }
     """
     try:
@@ -244,8 +450,16 @@ def verify_signature():
         original_message_str = data.get('originalMessage')
         signature_b64 = data.get('signature')
         public_key_b64 = data.get('publicKey')
+        sig_scheme = data.get('sigScheme') or 'ed25519'
 
-        if not all([from_address, original_message_str, signature_b64, public_key_b64]):
+        if sig_scheme not in VERIFICADORES:
+            return jsonify({
+                'success': False,
+                'error': f'Esquema de firma no soportado: {sig_scheme}'
+            }), 400
+
+        if not all([from_address, original_message_str, signature_b64]) or \
+                (not public_key_b64 and sig_scheme not in RECUPERABLES):
             return jsonify({
                 'success': False,
                 'error': 'Faltan campos requeridos'
@@ -264,13 +478,17 @@ def verify_signature():
         # El verifier espera que el tx tenga estos campos: from_address, to, value, nonce, timestamp
         verification_data = {
             'tx': tx_dict,
-            'sig_scheme': 'ed25519',  # Minúsculas según verifier.py línea 80
-            'signature_b64': signature_b64,
-            'public_key_b64': public_key_b64
+            'sig_scheme': sig_scheme,
+            'signature_b64': signature_b64
         }
+        if public_key_b64:
+            verification_data['public_key_b64'] = public_key_b64
 
         # Verificar firma
-        resultado = verificar_firma(verification_data, nonce_store=None)
+        inicio = time.perf_counter()
+        resultado = verificar_firma(verification_data, nonce_store=None, cache=verification_cache)
+        cripto_latencia.observe(time.perf_counter() - inicio, 'verify')
+        verificaciones_total.inc('verify', resultado.razon)
 
         return jsonify({
             'success': True,
@@ -286,6 +504,176 @@ def verify_signature():
         }), 500
 
 
+@app.route('/api/signature/verify-batch', methods=['POST'])
+def verify_signature_batch():
+    """
+    Verifica un lote de sobres firmados
+    Body: {
+        envelopes: [ { tx, sig_scheme, signature_b64, public_key_b64 | pubkey_b64 }, ... ],
+        workers (opcional; 1 verifica en el mismo proceso, > 1 usa el pool compartido)
+    }
+    Los resultados se devuelven en el mismo orden de entrada
+    """
+    try:
+        data = request.json
+        envelopes = data.get('envelopes')
+
+        if not isinstance(envelopes, list) or not envelopes:
+            return jsonify({
+                'success': False,
+                'error': 'Se requiere una lista de sobres firmados'
+            }), 400
+
+        if len(envelopes) > MAX_VERIFY_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'El lote excede el máximo de {MAX_VERIFY_BATCH_SIZE} sobres'
+            }), 400
+
+        try:
+            workers = int(data.get('workers', VERIFY_WORKERS))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'workers debe ser un entero'
+            }), 400
+
+        # Verificar firmas (sin nonce_store, igual que /api/signature/verify)
+        inicio = time.perf_counter()
+        resultados = verificar_lote(envelopes, nonce_store=None, workers=1,
+                                    executor=verify_pool if workers > 1 else None)
+        cripto_latencia.observe(time.perf_counter() - inicio, 'verify_batch')
+        for razon, cantidad in Counter(r.razon for r in resultados).items():
+            verificaciones_total.inc('verify_batch', razon, cantidad=cantidad)
+
+        return jsonify({
+            'success': True,
+            'valid': sum(1 for r in resultados if r.valido),
+            'invalid': sum(1 for r in resultados if not r.valido),
+            'results': [
+                {
+                    'index': i,
+                    'valid': r.valido,
+                    'reason': r.razon,
+                    'details': r.detalles
+                }
+                for i, r in enumerate(resultados)
+            ]
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/signature/cache-stats', methods=['GET'])
+def verification_cache_stats():
+    """
+    Estado del caché de verificaciones (tamaño, aciertos y tasa de aciertos)
+    """
+    return jsonify({
+        'success': True,
+        'stats': verification_cache.stats()
+    })
+
+
+@app.route('/api/transactions', methods=['GET'])
+def list_transactions():
+    """
+    Consulta transacciones verificadas usando el índice
+    Query: from, to, nonce, hash, limit, cursor (todos opcionales)
+    Para la página siguiente se repite la consulta con cursor=nextCursor
+    """
+    try:
+        try:
+            nonce = request.args.get('nonce')
+            cursor = request.args.get('cursor')
+            transacciones, siguiente = tx_index.buscar(
+                from_address=request.args.get('from'),
+                to=request.args.get('to'),
+                nonce=int(nonce) if nonce is not None else None,
+                tx_hash=request.args.get('hash'),
+                limite=int(request.args.get('limit', LIMITE_POR_DEFECTO)),
+                despues=int(cursor) if cursor is not None else None
+            )
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'nonce, limit y cursor deben ser enteros'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'transactions': transacciones,
+            'nextCursor': siguiente
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Métricas en formato de texto de Prometheus (contadores, histogramas de latencia y medidores)
+    """
+    return app.response_class(metricas.exponer(), content_type=CONTENT_TYPE)
+
+
+@app.route('/api/debug/tracemalloc', methods=['GET'])
+def tracemalloc_snapshot():
+    """
+    Instantánea de memoria (tracemalloc) con el total del almacén de sesiones y de los cachés
+    Solo existe con PROFILE_DEBUG_ENDPOINTS=1. Query: start=1 para empezar a rastrear, limit
+    """
+    if not PROFILE_DEBUG_ENDPOINTS:
+        return not_found(None)
+    try:
+        if request.args.get('start') == '1' and iniciar_tracemalloc():
+            return jsonify({
+                'success': True,
+                'tracing': True,
+                'message': 'tracemalloc iniciado; vuelve a pedir la instantánea más tarde'
+            })
+
+        resumen = instantanea_memoria(PROFILE_DIR, limite=int(request.args.get('limit', 20)))
+        resumen['sessions'] = len(active_wallets)
+        resumen['verification_cache_entries'] = len(verification_cache)
+        return jsonify({
+            'success': True,
+            'tracing': True,
+            'snapshot': resumen
+        })
+
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'tracing': False,
+            'error': f'{e}; usa start=1 o PROFILE_TRACEMALLOC=1'
+        }), 409
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/kdf/stats', methods=['GET'])
+def kdf_stats():
+    """
+    Estado del pool de derivación de llaves (cola, memoria y tiempos de espera)
+    """
+    return jsonify({
+        'success': True,
+        'stats': kdf_pool.stats()
+    })
+
+
 @app.route('/api/wallet/update-description', methods=['POST'])
 def update_description():
     """
@@ -297,14 +685,15 @@ def update_description():
         session_id = data.get('sessionId')
         description = data.get('description', '')
 
-        if not session_id or session_id not in active_wallets:
+        wallet = active_wallets.get(session_id)
+        if wallet is None:
             return jsonify({
                 'success': False,
                 'error': 'Sesión inválida'
             }), 401
 
         # Actualizar en memoria
-        active_wallets[session_id]['description'] = description
+        wallet['description'] = description
 
         # TODO: Aquí podrías actualizar el archivo keystore si quieres persistir la descripción
 
@@ -330,9 +719,9 @@ def logout_wallet():
         data = request.json
         session_id = data.get('sessionId')
 
-        if session_id and session_id in active_wallets:
+        if session_id:
             # Limpiar datos sensibles
-            del active_wallets[session_id]
+            active_wallets.remove(session_id)
 
         return jsonify({
             'success': True,
@@ -0,0 +1,243 @@
+import base64
+import json
+import re
+import struct
+
+# Formato binario de sobres firmados (versión 1)
+#
+#   "CWE" | versión u8 | esquema u8 | flags u8
+#   largo pubkey u8 | pubkey (cruda; largo 0 = sin pubkey)
+#   largo firma u8  | firma (cruda)
+#   número de campos u8 | campos del tx, en su orden original
+#
+# Cada campo: id de llave u8 (0 = llave propia: varint largo + utf8) | tipo u8 | valor
+# Los largos de los valores son varint (LEB128). La conversión con el JSON es sin pérdida.
+
+MAGIC = b"CWE"
+VERSION = 1
+
+ESQUEMAS = ("ed25519", "secp256k1")
+
+# Nombre del campo de la llave pública en el JSON (Signer usa pubkey_b64, el verifier public_key_b64)
+FLAG_PUBKEY_CORTO = 0x01
+
+LLAVES = ("from_address", "to", "value", "nonce", "gas_limit", "data_hex", "timestamp", "from")
+_ID_LLAVE = {llave: i + 1 for i, llave in enumerate(LLAVES)}
+
+T_STR = 0        # texto utf8
+T_INT = 1        # entero JSON (con signo, big-endian)
+T_DIRECCION = 2  # "0x" + 40 hex en minúsculas -> 20 bytes
+T_DECIMAL = 3    # texto con un entero decimal canónico ("100", "21000") -> entero sin signo
+T_NULL = 4
+T_JSON = 5       # cualquier otro valor JSON (float, bool, listas, objetos)
+
+_RE_DIRECCION = re.compile(r"0x[0-9a-f]{40}\Z")
+_RE_DECIMAL = re.compile(r"(0|[1-9][0-9]*)\Z")
+_CABECERA = struct.Struct("3sBBB")
+
+
+def _varint(n, salida):
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            salida.append(byte | 0x80)
+        else:
+            salida.append(byte)
+            return
+
+
+def _con_largo(datos, salida):
+    _varint(len(datos), salida)
+    salida += datos
+
+
+def _entero_a_bytes(n):
+    return n.to_bytes((n.bit_length() + 8) // 8 or 1, "big", signed=True)
+
+
+def _valor(valor, salida):
+    tipo = type(valor)
+    if tipo is str:
+        if _RE_DIRECCION.match(valor):
+            salida.append(T_DIRECCION)
+            salida += bytes.fromhex(valor[2:])
+        elif _RE_DECIMAL.match(valor):
+            salida.append(T_DECIMAL)
+            n = int(valor)
+            _con_largo(n.to_bytes((n.bit_length() + 7) // 8, "big"), salida)
+        else:
+            salida.append(T_STR)
+            _con_largo(valor.encode("utf-8"), salida)
+    elif tipo is int:
+        salida.append(T_INT)
+        _con_largo(_entero_a_bytes(valor), salida)
+    elif valor is None:
+        salida.append(T_NULL)
+    else:
+        salida.append(T_JSON)
+        _con_largo(json.dumps(valor, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), salida)
+
+
+def _b64_exacto(texto, campo):
+    crudo = base64.b64decode(texto, validate=True)
+    if base64.b64encode(crudo).decode("ascii") != texto:
+        raise ValueError(f"{campo} no está en base64 canónico")
+    return crudo
+
+
+def codificar(sobre):
+    """
+    Convierte un sobre JSON (tx, sig_scheme, signature_b64, pubkey_b64/public_key_b64)
+    a su forma binaria. Lanza ValueError si el sobre no se puede representar sin pérdida
+    """
+    if not isinstance(sobre, dict):
+        raise ValueError("el sobre debe ser un diccionario")
+    permitidas = {"tx", "sig_scheme", "signature_b64", "pubkey_b64", "public_key_b64"}
+    sobrantes = set(sobre) - permitidas
+    if sobrantes:
+        raise ValueError(f"campos no soportados: {sorted(sobrantes)}")
+    if "pubkey_b64" in sobre and "public_key_b64" in sobre:
+        raise ValueError("el sobre trae pubkey_b64 y public_key_b64 a la vez")
+
+    esquema = sobre.get("sig_scheme")
+    if esquema not in ESQUEMAS:
+        raise ValueError(f"sig_scheme no soportado: {esquema}")
+    tx = sobre.get("tx")
+    if not isinstance(tx, dict) or len(tx) > 255:
+        raise ValueError("tx debe ser un diccionario de a lo más 255 campos")
+
+    flags = 0
+    pubkey = b""
+    if "pubkey_b64" in sobre:
+        flags |= FLAG_PUBKEY_CORTO
+        pubkey = _b64_exacto(sobre["pubkey_b64"], "pubkey_b64")
+    elif "public_key_b64" in sobre:
+        pubkey = _b64_exacto(sobre["public_key_b64"], "public_key_b64")
+    firma = _b64_exacto(sobre.get("signature_b64", ""), "signature_b64")
+    if len(pubkey) > 255 or len(firma) > 255:
+        raise ValueError("llave pública o firma demasiado largas")
+
+    salida = bytearray(_CABECERA.pack(MAGIC, VERSION, ESQUEMAS.index(esquema), flags))
+    salida.append(len(pubkey))
+    salida += pubkey
+    salida.append(len(firma))
+    salida += firma
+    salida.append(len(tx))
+    for llave, valor in tx.items():
+        id_llave = _ID_LLAVE.get(llave)
+        if id_llave is None:
+            salida.append(0)
+            _con_largo(llave.encode("utf-8"), salida)
+        else:
+            salida.append(id_llave)
+        _valor(valor, salida)
+    return bytes(salida)
+
+
+class SobreBinario:
+    """
+    Sobre decodificado; public_key y signature son memoryview sobre el buffer original
+    (sin copias). public_key es None si el sobre no la trae
+    """
+    __slots__ = ("tx", "sig_scheme", "public_key", "signature", "flags")
+
+    def __init__(self, tx, sig_scheme, public_key, signature, flags):
+        self.tx = tx
+        self.sig_scheme = sig_scheme
+        self.public_key = public_key
+        self.signature = signature
+        self.flags = flags
+
+    def to_json(self):
+        """
+        Forma JSON equivalente (la misma que se usó para codificar)
+        """
+        sobre = {
+            "tx": self.tx,
+            "sig_scheme": self.sig_scheme,
+            "signature_b64": base64.b64encode(self.signature).decode("ascii"),
+        }
+        if self.public_key is not None:
+            campo = "pubkey_b64" if self.flags & FLAG_PUBKEY_CORTO else "public_key_b64"
+            sobre[campo] = base64.b64encode(self.public_key).decode("ascii")
+        return sobre
+
+
+def decodificar(buf):
+    """
+    Decodifica un sobre binario; lanza ValueError si está truncado o mal formado
+    """
+    vista = memoryview(buf)
+    try:
+        magic, version, esquema, flags = _CABECERA.unpack_from(vista, 0)
+        if magic != MAGIC:
+            raise ValueError("no es un sobre binario")
+        if version != VERSION:
+            raise ValueError(f"versión no soportada: {version}")
+        if esquema >= len(ESQUEMAS):
+            raise ValueError(f"esquema desconocido: {esquema}")
+        pos = _CABECERA.size
+
+        def tomar(n):
+            nonlocal pos
+            if pos + n > len(vista):
+                raise ValueError("sobre truncado")
+            trozo = vista[pos:pos + n]
+            pos += n
+            return trozo
+
+        def varint():
+            nonlocal pos
+            n = 0
+            desplazamiento = 0
+            while True:
+                byte = tomar(1)[0]
+                n |= (byte & 0x7F) << desplazamiento
+                if not byte & 0x80:
+                    return n
+                desplazamiento += 7
+
+        largo_pub = tomar(1)[0]
+        public_key = tomar(largo_pub) if largo_pub else None
+        signature = tomar(tomar(1)[0])
+
+        tx = {}
+        for _ in range(tomar(1)[0]):
+            id_llave = tomar(1)[0]
+            if id_llave == 0:
+                llave = str(tomar(varint()), "utf-8")
+            elif id_llave <= len(LLAVES):
+                llave = LLAVES[id_llave - 1]
+            else:
+                raise ValueError(f"id de llave desconocido: {id_llave}")
+
+            tipo = tomar(1)[0]
+            if tipo == T_STR:
+                valor = str(tomar(varint()), "utf-8")
+            elif tipo == T_DIRECCION:
+                valor = "0x" + tomar(20).hex()
+            elif tipo == T_DECIMAL:
+                valor = str(int.from_bytes(tomar(varint()), "big"))
+            elif tipo == T_INT:
+                valor = int.from_bytes(tomar(varint()), "big", signed=True)
+            elif tipo == T_NULL:
+                valor = None
+            elif tipo == T_JSON:
+                valor = json.loads(str(tomar(varint()), "utf-8"))
+            else:
+                raise ValueError(f"tipo de valor desconocido: {tipo}")
+            tx[llave] = valor
+    except struct.error as e:
+        raise ValueError(f"sobre truncado: {e}")
+
+    if pos != len(vista):
+        raise ValueError("bytes sobrantes al final del sobre")
+    return SobreBinario(tx, ESQUEMAS[esquema], public_key, signature, flags)
+
+
+def a_json(buf):
+    """
+    Convierte un sobre binario a su forma JSON
+    """
+    return decodificar(buf).to_json()
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+_FALTA = object()
+
+class CacheLRU:
+    def __init__(self, max_entries=10000, ttl=300, clock=time.monotonic):
+        """
+        Caché acotado por tamaño y por edad
+        - max_entries: al llenarse se desaloja la entrada menos usada recientemente (LRU)
+        - ttl: segundos de vida de cada entrada desde que se guardó (None = sin vencimiento)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+
+        # llave -> (valor, guardada); el orden es el de uso (LRU al inicio)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, llave, default=None):
+        """
+        Retorna el valor guardado o default si no está o ya venció
+        """
+        with self._lock:
+            entrada = self._entradas.get(llave, _FALTA)
+            if entrada is _FALTA:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self._clock() - entrada[1] > self.ttl:
+                del self._entradas[llave]
+                self.expired += 1
+                self.misses += 1
+                return default
+            self._entradas.move_to_end(llave)
+            self.hits += 1
+            return entrada[0]
+
+    def put(self, llave, valor):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entradas[llave] = (valor, self._clock())
+            self._entradas.move_to_end(llave)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def stats(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'size': len(self._entradas),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / consultas if consultas else 0.0,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
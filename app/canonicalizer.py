@@ -1,4 +1,5 @@
 import json
+from json.encoder import encode_basestring
 
 def canonicalize(data_dict):
     """
@@ -16,4 +17,76 @@ def canonicalize(data_dict):
         ensure_ascii=False
     )
     
-    return json_str.encode('utf-8')
\ No newline at end of file
+    return json_str.encode('utf-8')
+
+
+# Motor rápido para transacciones
+# Las transacciones siempre traen las mismas llaves, así que el orden y los prefijos '"llave":'
+# se calculan una sola vez por "forma" (tupla de llaves en orden de inserción).
+# Los valores str e int se serializan directo; cualquier otro caso usa canonicalize.
+# La salida es byte por byte igual a la de canonicalize.
+
+_MAX_FORMAS = 256
+_formas = {}
+
+def _plan(llaves):
+    plan = _formas.get(llaves)
+    if plan is None:
+        for llave in llaves:
+            if type(llave) is not str:
+                return None
+        plan = tuple((llave, encode_basestring(llave) + ':') for llave in sorted(llaves))
+        if len(_formas) < _MAX_FORMAS:
+            _formas[llaves] = plan
+    return plan
+
+def _canonico_str(data_dict):
+    """
+    Regresa el JSON canónico como str, o None si el diccionario no es
+    de la forma plana que cubre el motor rápido
+    """
+    if type(data_dict) is not dict:
+        return None
+    plan = _plan(tuple(data_dict))
+    if plan is None:
+        return None
+
+    partes = []
+    agregar = partes.append
+    for llave, prefijo in plan:
+        valor = data_dict[llave]
+        tipo = type(valor)
+        if tipo is str:
+            agregar(prefijo + encode_basestring(valor))
+        elif tipo is int:
+            agregar(prefijo + int.__repr__(valor))
+        elif valor is None:
+            agregar(prefijo + 'null')
+        else:
+            return None
+    return '{' + ','.join(partes) + '}'
+
+def canonicalize_tx(data_dict):
+    """
+    Igual que canonicalize, optimizado para transacciones planas (valores str/int)
+    """
+    texto = _canonico_str(data_dict)
+    if texto is None:
+        return canonicalize(data_dict)
+    return texto.encode('utf-8')
+
+def canonicalize_into(data_dict, buffer):
+    """
+    Agrega los bytes canónicos al final de un bytearray dado
+    Retorna cuántos bytes se escribieron
+    """
+    datos = canonicalize_tx(data_dict)
+    buffer.extend(datos)
+    return len(datos)
+
+def write_canonical(data_dict, archivo):
+    """
+    Escribe los bytes canónicos en un archivo abierto en modo binario
+    Retorna cuántos bytes se escribieron
+    """
+    return archivo.write(canonicalize_tx(data_dict))
@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class PoolSaturado(Exception):
+    """
+    Se lanza cuando la cola del pool está llena o la espera excede el límite
+    retry_after: segundos sugeridos antes de reintentar
+    """
+    def __init__(self, mensaje, retry_after=1):
+        super().__init__(mensaje)
+        self.retry_after = retry_after
+
+class MemoriaExcedida(ValueError):
+    """
+    El trabajo pide más memoria que todo el presupuesto del pool; reintentar no sirve
+    """
+
+class KdfPool:
+    def __init__(self, memoria_max_kib, max_workers=2, max_cola=16,
+                 espera_max=30.0, retry_after=1, observador=None):
+        """
+        Ejecutor acotado para derivaciones Argon2
+        - memoria_max_kib: presupuesto de memoria para derivaciones simultáneas
+        - max_workers: hilos del ejecutor (Argon2 libera el GIL)
+        - max_cola: peticiones que pueden esperar turno; si se llena se rechaza de inmediato
+        - espera_max: segundos máximos esperando memoria antes de rechazar
+        - observador: fn(duracion_s, espera_s) llamada al terminar cada derivación (métricas)
+        """
+        self.memoria_max_kib = memoria_max_kib
+        self.max_workers = max_workers
+        self.max_cola = max_cola
+        self.espera_max = espera_max
+        self.retry_after = retry_after
+        self.observador = observador
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kdf')
+        self._cond = threading.Condition()
+        self._memoria_en_uso = 0
+        self._en_ejecucion = 0
+        self._en_cola = 0
+
+        self.completadas = 0
+        self.rechazadas = 0
+        self.espera_total = 0.0
+        self.espera_max_observada = 0.0
+        self.duracion_total = 0.0
+
+    def _cabe(self, memoria_kib):
+        # Hace falta memoria y un hilo libre: lo admitido nunca espera dentro del ejecutor
+        return (self._memoria_en_uso + memoria_kib <= self.memoria_max_kib
+                and self._en_ejecucion < self.max_workers)
+
+    def _rechazar(self, mensaje):
+        self.rechazadas += 1
+        raise PoolSaturado(mensaje, self.retry_after)
+
+    def ejecutar(self, memoria_kib, fn, *args, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) en el pool reservando memoria_kib del presupuesto
+        Bloquea hasta obtener el resultado; lanza PoolSaturado si no hay cupo
+        y MemoriaExcedida si memoria_kib supera el presupuesto completo
+        """
+        inicio = time.monotonic()
+        with self._cond:
+            if memoria_kib > self.memoria_max_kib:
+                self.rechazadas += 1
+                raise MemoriaExcedida(f'La derivación pide {memoria_kib} KiB y el presupuesto '
+                                      f'del pool es {self.memoria_max_kib} KiB')
+            if not self._cabe(memoria_kib):
+                if self._en_cola >= self.max_cola:
+                    self._rechazar('Cola de derivación de llaves llena')
+                self._en_cola += 1
+                try:
+                    admitido = self._cond.wait_for(lambda: self._cabe(memoria_kib), self.espera_max)
+                finally:
+                    self._en_cola -= 1
+                if not admitido:
+                    self._rechazar('Tiempo de espera agotado para derivar la llave')
+
+            espera = time.monotonic() - inicio
+            self.espera_total += espera
+            self.espera_max_observada = max(self.espera_max_observada, espera)
+            self._memoria_en_uso += memoria_kib
+            self._en_ejecucion += 1
+
+        comienzo = time.monotonic()
+        try:
+            return self._executor.submit(fn, *args, **kwargs).result()
+        finally:
+            duracion = time.monotonic() - comienzo
+            with self._cond:
+                self._memoria_en_uso -= memoria_kib
+                self._en_ejecucion -= 1
+                self.completadas += 1
+                self.duracion_total += duracion
+                self._cond.notify_all()
+            if self.observador is not None:
+                self.observador(duracion, espera)
+
+    def stats(self):
+        with self._cond:
+            admitidas = self.completadas + self._en_ejecucion
+            return {
+                'queue_depth': self._en_cola,
+                'max_queue': self.max_cola,
+                'running': self._en_ejecucion,
+                'memory_in_use_kib': self._memoria_en_uso,
+                'memory_budget_kib': self.memoria_max_kib,
+                'completed': self.completadas,
+                'rejected': self.rechazadas,
+                'wait_avg_s': self.espera_total / admitidas if admitidas else 0.0,
+                'wait_max_s': self.espera_max_observada,
+                'kdf_avg_s': self.duracion_total / self.completadas if self.completadas else 0.0
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,166 @@
+import bisect
+import math
+import threading
+
+# Buckets por defecto (segundos), pensados para latencias HTTP y de firma/verificación
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Argon2 tarda cientos de milisegundos por diseño
+BUCKETS_KDF = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _numero(valor):
+    if valor == math.inf:
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor)) if abs(valor) < 1e15 else repr(valor)
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra is not None:
+        pares.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _llave(self, valores):
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f'{self.nombre} espera las etiquetas {self.etiquetas}')
+        return tuple(str(v) for v in valores)
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        lineas.extend(self._muestras())
+        return lineas
+
+
+class Contador(_Metrica):
+    """
+    Contador monótono por combinación de etiquetas
+    El lock solo protege la suma en el diccionario
+    """
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores = {}
+
+    def inc(self, *valores, cantidad=1):
+        llave = self._llave(valores)
+        with self._lock:
+            self._valores[llave] = self._valores.get(llave, 0) + cantidad
+
+    def valor(self, *valores):
+        return self._valores.get(self._llave(valores), 0)
+
+    def _muestras(self):
+        with self._lock:
+            copia = sorted(self._valores.items())
+        return [f'{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}' for k, v in copia]
+
+
+class Histograma(_Metrica):
+    """
+    Histograma con buckets fijos; el bucket se busca fuera del lock
+    y dentro solo se incrementan dos contadores y la suma
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # llave -> [conteos por bucket (+Inf al final), suma]
+
+    def observe(self, valor, *valores):
+        llave = self._llave(valores)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(llave)
+            if serie is None:
+                serie = self._series[llave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def conteo(self, *valores):
+        serie = self._series.get(self._llave(valores))
+        return sum(serie[0]) if serie else 0
+
+    def _muestras(self):
+        with self._lock:
+            copia = sorted((k, (list(conteos), suma)) for k, (conteos, suma) in self._series.items())
+        lineas = []
+        for llave, (conteos, suma) in copia:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (math.inf,), conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{_etiquetas(self.etiquetas, llave, ("le", _numero(float(limite))))} {acumulado}')
+            lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, llave)} {_numero(suma)}')
+            lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, llave)} {acumulado}')
+        return lineas
+
+
+class Medidor(_Metrica):
+    """
+    Valor instantáneo que se lee al exponer (tamaño de sesiones, cola del KDF, etc.)
+    fn retorna un número o un diccionario {tupla de etiquetas: número}; no cuesta nada en el camino caliente
+    """
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, fn, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._fn = fn
+
+    def _muestras(self):
+        valor = self._fn()
+        if not isinstance(valor, dict):
+            return [f'{self.nombre} {_numero(valor)}']
+        return [f'{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}' for k, v in sorted(valor.items())]
+
+
+class Registro:
+    def __init__(self):
+        """
+        Conjunto de métricas que se exponen juntas en formato de texto de Prometheus
+        """
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _agregar(self, metrica):
+        with self._lock:
+            if metrica.nombre in self._metricas:
+                raise ValueError(f'Métrica duplicada: {metrica.nombre}')
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._agregar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        return self._agregar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def medidor(self, nombre, ayuda, fn, etiquetas=()):
+        return self._agregar(Medidor(nombre, ayuda, fn, etiquetas))
+
+    def exponer(self):
+        """
+        Texto en formato de exposición de Prometheus (version=0.0.4)
+        """
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,134 @@
+import cProfile
+import itertools
+import os
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+# Archivos cuyas asignaciones se reportan por separado en las instantáneas de memoria
+COMPONENTES_MEMORIA = {
+    'session_store': ('app/session_store.py', 'app/signer.py'),
+    'caches': ('app/cache.py', 'keccak_backend.py', 'verifier.py', 'app/canonicalizer.py'),
+}
+
+
+class Perfilador:
+    def __init__(self, directorio='profiles', muestreo=0.0, permitir_header=False):
+        """
+        Perfilado opcional con cProfile; cuando está apagado solo cuesta una comparación
+        - directorio: dónde se escriben los .pstats (formato estándar de pstats)
+        - muestreo: fracción de peticiones que se perfilan (0.0 = ninguna, 1.0 = todas)
+        - permitir_header: si True, una petición con X-Profile: 1 se perfila siempre
+        """
+        self.directorio = Path(directorio)
+        self.muestreo = float(muestreo)
+        self.permitir_header = permitir_header
+        self._secuencia = itertools.count()
+        self.escritos = 0
+
+    @property
+    def activo(self):
+        return self.muestreo > 0 or self.permitir_header
+
+    def debe_perfilar(self, header=None):
+        """
+        Decide si se perfila la petición actual (por header o por muestreo)
+        """
+        if self.permitir_header and header not in (None, '', '0'):
+            return True
+        return self.muestreo > 0 and random.random() < self.muestreo
+
+    def iniciar(self):
+        """
+        Retorna un cProfile.Profile ya habilitado, o None si otro perfilador ya está activo
+        """
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:  # Python 3.12+: solo un perfilador a la vez
+            return None
+        return perfil
+
+    def terminar(self, perfil, nombre):
+        """
+        Detiene el perfil y lo escribe en el directorio; retorna la ruta del .pstats
+        """
+        perfil.disable()
+        return self.guardar(perfil, nombre)
+
+    def guardar(self, perfil, nombre):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        marca = time.strftime('%Y%m%d-%H%M%S')
+        ruta = self.directorio / f'{nombre}-{marca}-{os.getpid()}-{next(self._secuencia)}.pstats'
+        perfil.dump_stats(str(ruta))
+        self.escritos += 1
+        return ruta
+
+    @contextmanager
+    def perfilar(self, nombre):
+        """
+        with perfilador.perfilar('procesar_inbox') as rutas: ...
+        Al salir, rutas contiene la ruta del .pstats escrito
+        """
+        rutas = []
+        perfil = self.iniciar()
+        try:
+            yield rutas
+        finally:
+            if perfil is not None:
+                rutas.append(self.terminar(perfil, nombre))
+
+
+def iniciar_tracemalloc(frames=1):
+    """
+    Empieza a rastrear asignaciones (si no se estaba haciendo); retorna True si lo inició
+    """
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def instantanea_memoria(directorio, limite=20, componentes=COMPONENTES_MEMORIA):
+    """
+    Toma una instantánea de tracemalloc, la guarda en el directorio (Snapshot.load la lee)
+    y resume las líneas que más memoria retienen y el total por componente
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError('tracemalloc no está activo')
+    instantanea = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    ruta = directorio / f'tracemalloc-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.snapshot'
+    instantanea.dump(str(ruta))
+
+    por_componente = {}
+    for nombre, archivos in componentes.items():
+        filtros = [tracemalloc.Filter(True, f'*{os.sep}{archivo.replace("/", os.sep)}') for archivo in archivos]
+        estadisticas = instantanea.filter_traces(filtros).statistics('filename')
+        por_componente[nombre] = {
+            'size_kib': round(sum(e.size for e in estadisticas) / 1024, 1),
+            'blocks': sum(e.count for e in estadisticas),
+        }
+
+    actual, pico = tracemalloc.get_traced_memory()
+    return {
+        'snapshot': str(ruta),
+        'traced_kib': round(actual / 1024, 1),
+        'peak_kib': round(pico / 1024, 1),
+        'components': por_componente,
+        'top': [
+            {
+                'location': f'{e.traceback[0].filename}:{e.traceback[0].lineno}',
+                'size_kib': round(e.size / 1024, 1),
+                'blocks': e.count,
+            }
+            for e in instantanea.statistics('lineno')[:limite]
+        ],
+    }
@@ -0,0 +1,165 @@
+"""
+Aritmética mínima de secp256k1 para firmas recuperables (r || s || v)
+cryptography firma y verifica, pero no recupera llaves públicas; aquí solo se
+hacen operaciones con datos públicos (recuperar la llave y calcular v)
+"""
+
+import hashlib
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed, decode_dss_signature
+
+# Parámetros de la curva y^2 = x^3 + 7 sobre F_P
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+     0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+LARGO_FIRMA = 65  # r (32) || s (32) || v (1)
+
+# Puntos en coordenadas jacobianas (X, Y, Z); el infinito tiene Z = 0
+_INFINITO = (0, 1, 0)
+
+
+def _doblar(p):
+    x, y, z = p
+    if not y or not z:
+        return _INFINITO
+    yy = y * y % P
+    s = 4 * x * yy % P
+    m = 3 * x * x % P
+    nx = (m * m - 2 * s) % P
+    ny = (m * (s - nx) - 8 * yy * yy) % P
+    return nx, ny, 2 * y * z % P
+
+
+def _sumar(p, q):
+    if not p[2]:
+        return q
+    if not q[2]:
+        return p
+    x1, y1, z1 = p
+    x2, y2, z2 = q
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+    if u1 == u2:
+        return _doblar(p) if s1 == s2 else _INFINITO
+    h = u2 - u1
+    r = s2 - s1
+    hh = h * h % P
+    hhh = h * hh % P
+    v = u1 * hh % P
+    nx = (r * r - hhh - 2 * v) % P
+    ny = (r * (v - nx) - s1 * hhh) % P
+    return nx, ny, h * z1 * z2 % P
+
+
+def _afin(p):
+    x, y, z = p
+    if not z:
+        raise ValueError("punto en el infinito")
+    zi = pow(z, -1, P)
+    zi2 = zi * zi % P
+    return x * zi2 % P, y * zi2 * zi % P
+
+
+def _combinar(a, p, b, q):
+    # a*P + b*Q con el truco de Shamir: una sola pasada de doblados
+    p, q = (p[0], p[1], 1), (q[0], q[1], 1)
+    pq = _sumar(p, q)
+    tabla = (None, p, q, pq)
+    r = _INFINITO
+    for i in range(max(a.bit_length(), b.bit_length()) - 1, -1, -1):
+        r = _doblar(r)
+        indice = ((a >> i) & 1) | (((b >> i) & 1) << 1)
+        if indice:
+            r = _sumar(r, tabla[indice])
+    return r
+
+
+def _y_desde_x(x, impar):
+    if not 0 <= x < P:
+        raise ValueError("x fuera del campo")
+    y = pow((x * x * x + 7) % P, (P + 1) // 4, P)
+    if (y * y - (x * x * x + 7)) % P:
+        raise ValueError("x no está en la curva")
+    return y if (y & 1) == impar else P - y
+
+
+def punto(public_key: bytes):
+    """Punto afín desde SEC1 comprimido (33 bytes) o sin comprimir (65 bytes o 64 sin prefijo)."""
+    public_key = bytes(public_key)
+    if len(public_key) == 33 and public_key[0] in (2, 3):
+        x = int.from_bytes(public_key[1:], "big")
+        return x, _y_desde_x(x, public_key[0] & 1)
+    if len(public_key) == 65 and public_key[0] == 4:
+        public_key = public_key[1:]
+    if len(public_key) == 64:
+        x, y = int.from_bytes(public_key[:32], "big"), int.from_bytes(public_key[32:], "big")
+        if x >= P or y >= P or (y * y - (x * x * x + 7)) % P:
+            raise ValueError("el punto no está en la curva")
+        return x, y
+    raise ValueError(f"llave pública secp256k1 de largo inválido: {len(public_key)}")
+
+
+def sin_comprimir(public_key: bytes) -> bytes:
+    """X || Y (64 bytes), la forma que se usa para derivar la dirección."""
+    x, y = punto(public_key)
+    return x.to_bytes(32, "big") + y.to_bytes(32, "big")
+
+
+def _r_s_v(firma: bytes):
+    firma = bytes(firma)
+    if len(firma) != LARGO_FIRMA:
+        raise ValueError(f"la firma recuperable debe tener {LARGO_FIRMA} bytes")
+    r = int.from_bytes(firma[:32], "big")
+    s = int.from_bytes(firma[32:64], "big")
+    v = firma[64]
+    if v >= 27:  # Convención de Ethereum (27/28)
+        v -= 27
+    if not (0 < r < N and 0 < s < N) or v > 3:
+        raise ValueError("firma recuperable fuera de rango")
+    return r, s, v
+
+
+def recuperar_llave(digest: bytes, firma: bytes) -> bytes:
+    """
+    Recupera la llave pública (SEC1 comprimida) que produjo firma sobre digest
+    Lanza ValueError si la firma no permite recuperar un punto válido
+    """
+    r, s, v = _r_s_v(firma)
+    x = r + (v >> 1) * N
+    if x >= P:
+        raise ValueError("id de recuperación inválido")
+    punto_r = (x, _y_desde_x(x, v & 1))
+    e = int.from_bytes(bytes(digest), "big") % N
+    r_inv = pow(r, -1, N)
+    # Q = r^-1 (s*R - e*G)
+    q = _afin(_combinar(s * r_inv % N, punto_r, (-e * r_inv) % N, G))
+    return bytes([2 | (q[1] & 1)]) + q[0].to_bytes(32, "big")
+
+
+def firmar_recuperable(private_key: ec.EllipticCurvePrivateKey, mensaje: bytes,
+                       public_key: bytes | None = None) -> bytes:
+    """
+    Firma SHA-256(mensaje) con ECDSA de cryptography (OpenSSL, k aleatorio) y agrega v
+    s se normaliza a la mitad baja (firma no maleable); v se calcula con datos públicos
+    """
+    digest = hashlib.sha256(mensaje).digest()
+    r, s = decode_dss_signature(private_key.sign(digest, ec.ECDSA(Prehashed(hashes.SHA256()))))
+    if s > N // 2:
+        s = N - s
+    if public_key is None:
+        public_key = private_key.public_key().public_bytes(serialization.Encoding.X962,
+                                                           serialization.PublicFormat.CompressedPoint)
+    # R = s^-1 (e*G + r*Q): su paridad y si x desbordó N dan el id de recuperación
+    e = int.from_bytes(digest, "big") % N
+    s_inv = pow(s, -1, N)
+    rx, ry = _afin(_combinar(e * s_inv % N, G, r * s_inv % N, punto(public_key)))
+    v = (ry & 1) | (2 if rx != r else 0)
+    return r.to_bytes(32, "big") + s.to_bytes(32, "big") + bytes([v])
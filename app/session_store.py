@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.signer import Signer
+
+class SessionStore:
+    def __init__(self, idle_ttl=900, absolute_ttl=8 * 3600, max_entries=1000,
+                 sweep_interval=60, clock=time.monotonic):
+        """
+        Almacén de sesiones de wallets desbloqueadas
+        - idle_ttl: segundos sin uso antes de expirar
+        - absolute_ttl: vida máxima de una sesión aunque se siga usando
+        - max_entries: al llenarse se desaloja la sesión menos usada recientemente (LRU)
+        - sweep_interval: cada cuánto se barren todas las sesiones expiradas
+        """
+        self.idle_ttl = idle_ttl
+        self.absolute_ttl = absolute_ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+
+        # session_id -> [datos, creada, ultimo_uso]; el orden es el de uso (LRU al inicio)
+        self._sesiones = OrderedDict()
+        self._lock = threading.Lock()
+        self._ultimo_barrido = clock()
+        self._hilo_barrido = None
+        self._detener_barrido = threading.Event()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expirada(self, sesion, ahora):
+        _, creada, ultimo_uso = sesion
+        return ahora - ultimo_uso > self.idle_ttl or ahora - creada > self.absolute_ttl
+
+    def _barrer(self, ahora):
+        # Se llama con el lock tomado
+        vencidas = [sid for sid, sesion in self._sesiones.items() if self._expirada(sesion, ahora)]
+        for sid in vencidas:
+            del self._sesiones[sid]
+        self.expired += len(vencidas)
+        self._ultimo_barrido = ahora
+        return len(vencidas)
+
+    def _barrer_si_toca(self, ahora):
+        if ahora - self._ultimo_barrido >= self.sweep_interval:
+            self._barrer(ahora)
+
+    def create(self, private_key, **datos):
+        """
+        Registra una wallet desbloqueada y retorna su sessionId
+        El Signer y los bytes de la llave pública se construyen una sola vez aquí
+        """
+        signer = Signer(private_key)
+        entrada = dict(datos)
+        entrada['private_key'] = private_key
+        entrada['public_key'] = signer.public_bytes
+        entrada['signer'] = signer
+
+        session_id = os.urandom(16).hex()
+        with self._lock:
+            ahora = self._clock()
+            self._barrer_si_toca(ahora)
+            self._sesiones[session_id] = [entrada, ahora, ahora]
+            while len(self._sesiones) > self.max_entries:
+                self._sesiones.popitem(last=False)
+                self.evicted += 1
+        return session_id
+
+    def get(self, session_id):
+        """
+        Retorna los datos de la sesión o None si no existe o ya expiró
+        """
+        if not session_id:
+            return None
+        with self._lock:
+            ahora = self._clock()
+            self._barrer_si_toca(ahora)
+            sesion = self._sesiones.get(session_id)
+            if sesion is None:
+                self.misses += 1
+                return None
+            if self._expirada(sesion, ahora):
+                del self._sesiones[session_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            sesion[2] = ahora
+            self._sesiones.move_to_end(session_id)
+            self.hits += 1
+            return sesion[0]
+
+    def remove(self, session_id):
+        """
+        Cierra una sesión; retorna True si existía
+        """
+        with self._lock:
+            return self._sesiones.pop(session_id, None) is not None
+
+    def sweep(self):
+        """
+        Elimina todas las sesiones expiradas y retorna cuántas fueron
+        """
+        with self._lock:
+            return self._barrer(self._clock())
+
+    def iniciar_barrido(self):
+        """
+        Barre las sesiones expiradas cada sweep_interval segundos en un hilo daemon,
+        así un servidor sin tráfico no retiene llaves desbloqueadas vencidas
+        """
+        if self._hilo_barrido is not None and self._hilo_barrido.is_alive():
+            return
+        self._detener_barrido.clear()
+        self._hilo_barrido = threading.Thread(target=self._barrer_periodicamente,
+                                              name='session-sweep', daemon=True)
+        self._hilo_barrido.start()
+
+    def _barrer_periodicamente(self):
+        while not self._detener_barrido.wait(self.sweep_interval):
+            self.sweep()
+
+    def detener_barrido(self):
+        """
+        Detiene el hilo de barrido (si está corriendo) y espera a que termine
+        """
+        self._detener_barrido.set()
+        if self._hilo_barrido is not None:
+            self._hilo_barrido.join()
+            self._hilo_barrido = None
+
+    def __len__(self):
+        return len(self._sesiones)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._sesiones),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
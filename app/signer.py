@@ -1,38 +1,76 @@
 import base64
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 from cryptography.hazmat.primitives import serialization
-from app.canonicalizer import canonicalize
+from app.secp256k1 import firmar_recuperable
 
 class Signer:
-    def __init__(self, private_key: Ed25519PrivateKey):
+    def __init__(self, private_key, incluir_pubkey: bool = True):
         """
         El Signer recibe una llave privada cargada
         (no el archivo, sino el objeto llave)
+        - Ed25519PrivateKey -> sig_scheme "ed25519"
+        - EllipticCurvePrivateKey sobre SECP256K1 -> sig_scheme "secp256k1" (firma recuperable r||s||v)
+        - incluir_pubkey=False omite pubkey_b64 (solo secp256k1: el verifier la recupera de la firma)
         """
         self.private_key = private_key
 
+        # La llave pública se serializa una sola vez por Signer,
+        # así cada firma solo paga canonicalizar + firmar
+        if isinstance(private_key, Ed25519PrivateKey):
+            self.sig_scheme = "ed25519"
+            self.public_bytes = private_key.public_key().public_bytes(
+                encoding=serialization.Encoding.Raw,
+                format=serialization.PublicFormat.Raw
+            )
+        elif isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256K1):
+            self.sig_scheme = "secp256k1"
+            self.public_bytes = private_key.public_key().public_bytes(
+                encoding=serialization.Encoding.X962,
+                format=serialization.PublicFormat.CompressedPoint
+            )
+        else:
+            raise TypeError("Llave privada no soportada: se espera Ed25519 o secp256k1")
+
+        if not incluir_pubkey and self.sig_scheme != "secp256k1":
+            raise ValueError("Solo las firmas secp256k1 permiten omitir la llave pública")
+        self.incluir_pubkey = incluir_pubkey
+        self.pubkey_b64 = base64.b64encode(self.public_bytes).decode('utf-8')
+
+    def _firmar(self, tx_bytes):
+        if self.sig_scheme == "ed25519":
+            return self.private_key.sign(tx_bytes)
+        return firmar_recuperable(self.private_key, tx_bytes, self.public_bytes)
+
+    def _sobre(self, tx_dict, signature):
+        sobre = {
+            "tx": tx_dict,
+            "sig_scheme": self.sig_scheme,
+            "signature_b64": base64.b64encode(signature).decode('utf-8')
+        }
+        if self.incluir_pubkey:
+            sobre["pubkey_b64"] = self.pubkey_b64
+        return sobre
+
     def sign_transaction(self, transaction):
         """
         Toma una instancia de Transaction, la canonicaliza y la firma
         Retorna el diccionario listo para guardarse en el JSON
         """
-        # Convertir Transacción a Diccionario y luego a Bytes Canonicos
+        # Bytes canónicos memorizados en la Transacción (no se re-serializa al firmar de nuevo)
         tx_dict = transaction.to_dict()
-        tx_bytes = canonicalize(tx_dict)
+        tx_bytes = transaction.canonical_bytes
 
-        # Firmar (Ed25519)
-        signature = self.private_key.sign(tx_bytes)
+        return self._sobre(tx_dict, self._firmar(tx_bytes))
 
-        # Obtener la llave pública para adjuntarla 
-        public_key = self.private_key.public_key()
-        public_bytes = public_key.public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw
-        )
+    def sign_batch(self, transactions):
+        """
+        Firma un lote de transacciones con la misma llave
+        Retorna la lista de diccionarios firmados en el mismo orden de entrada
+        """
+        # Referencias locales para no resolver atributos en cada vuelta
+        firmar = self._firmar
+        sobre = self._sobre
 
-        return {
-            "tx": tx_dict,
-            "sig_scheme": "ed25519",
-            "signature_b64": base64.b64encode(signature).decode('utf-8'),
-            "pubkey_b64": base64.b64encode(public_bytes).decode('utf-8')
-        }
\ No newline at end of file
+        return [sobre(transaction.to_dict(), firmar(transaction.canonical_bytes))
+                for transaction in transactions]
@@ -1,26 +1,74 @@
 import time
-import json
+import hashlib
+from app.canonicalizer import canonicalize_tx
+
+def calcular_tx_hash(canonical_bytes):
+    """
+    Hash de la transacción: SHA-256 de sus bytes canónicos, en hexadecimal con prefijo 0x
+    """
+    return "0x" + hashlib.sha256(canonical_bytes).hexdigest()
 
 class Transaction:
+    # Sin __dict__ por instancia: menos memoria cuando hay muchas transacciones pendientes
+    __slots__ = ("sender", "receiver", "value", "nonce", "gas_limit", "data_hex", "timestamp",
+                 "_canonical", "_hash")
+
     def __init__(self, sender, receiver, value, nonce, gas_limit=21000, data_hex="", timestamp=None):
         """
         Inicializa una transacción 
+        Después de construida es inmutable
         """
 
         if not sender or not receiver:
             raise ValueError("Sender y Receiver son obligatorios")
             
-        self.sender = sender
-        self.receiver = receiver
-        self.value = str(value) 
-        self.nonce = int(nonce)
-        self.gas_limit = int(gas_limit)
-        self.data_hex = data_hex
+        asignar = object.__setattr__
+        asignar(self, "sender", sender)
+        asignar(self, "receiver", receiver)
+        asignar(self, "value", str(value))
+        asignar(self, "nonce", int(nonce))
+        asignar(self, "gas_limit", int(gas_limit))
+        asignar(self, "data_hex", data_hex)
         
         if timestamp is None:
-            self.timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
-        else:
-            self.timestamp = timestamp
+            timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        asignar(self, "timestamp", timestamp)
+
+        # Se calculan la primera vez que se piden y se reutilizan
+        asignar(self, "_canonical", None)
+        asignar(self, "_hash", None)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Construye una transacción a partir del diccionario que produce to_dict
+        (acepta "from" como alias de "from_address")
+        """
+        return cls(
+            sender=data.get("from_address", data.get("from")),
+            receiver=data.get("to"),
+            value=data["value"],
+            nonce=data["nonce"],
+            gas_limit=data.get("gas_limit", 21000),
+            data_hex=data.get("data_hex", ""),
+            timestamp=data.get("timestamp")
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Transaction es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Transaction es inmutable")
+
+    def __reduce__(self):
+        # pickle y copy no pueden asignar atributos uno por uno; se reconstruye con __init__
+        # (así viaja a los procesos de verificar_lote)
+        return (Transaction, (self.sender, self.receiver, self.value, self.nonce,
+                              self.gas_limit, self.data_hex, self.timestamp))
+
+    def __repr__(self):
+        return (f"Transaction(sender={self.sender!r}, receiver={self.receiver!r}, "
+                f"value={self.value!r}, nonce={self.nonce!r})")
 
     def to_dict(self):
         """
@@ -30,9 +78,27 @@ class Transaction:
         return {
             "from_address": self.sender,
             "to": self.receiver,
-            "value": str(self.value),
+            "value": self.value,
             "nonce": str(self.nonce),
             "gas_limit": str(self.gas_limit),
             "data_hex": self.data_hex,
             "timestamp": self.timestamp
-        }
\ No newline at end of file
+        }
+
+    @property
+    def canonical_bytes(self):
+        """
+        Bytes canónicos (los que se firman), calculados una sola vez
+        """
+        if self._canonical is None:
+            object.__setattr__(self, "_canonical", canonicalize_tx(self.to_dict()))
+        return self._canonical
+
+    @property
+    def tx_hash(self):
+        """
+        Hash de la transacción, calculado una sola vez
+        """
+        if self._hash is None:
+            object.__setattr__(self, "_hash", calcular_tx_hash(self.canonical_bytes))
+        return self._hash
@@ -0,0 +1,374 @@
+"""
+Suite de benchmarks reproducibles (micro y macro) con salida JSON y comparación contra un baseline
+Uso: python benchmarks/bench_suite.py [--casos canonicalize,verificar_firma] [--repeticiones 5]
+                                      [--semilla 1234] [--archivos 200] [--rapido]
+                                      [--salida actual.json] [--json]
+                                      [--comparar baseline.json] [--umbral 0.10] [--desde actual.json]
+Con --comparar el código de salida es 1 si algún caso empeoró más que el umbral
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+import simulator
+from almallave import cargar_keystore, crear_keystore
+from app.canonicalizer import canonicalize, canonicalize_tx
+from app.signer import Signer
+from app.transaction import Transaction
+from verifier import NonceStore, address_from_public_key, verificar_firma
+
+VERSION = 1
+
+# Argon2 fijo y liviano: el perfil calibrado de cada equipo haría incomparables las corridas
+KDF_BENCH = {"time_cost": 1, "memory_cost_kib": 8192, "parallelism": 1}
+
+# Operaciones por corrida de cada caso (escala normal / --rapido)
+TAMANOS = {
+    "normal": {"canonicalize": 5000, "firmas": 2000, "verificaciones": 2000, "nonces": 500,
+               "nonces_lote": 5000, "keystores": 5, "archivos": 200},
+    "rapido": {"canonicalize": 500, "firmas": 200, "verificaciones": 200, "nonces": 50,
+               "nonces_lote": 500, "keystores": 2, "archivos": 20},
+}
+
+REMITENTES = 16
+TIMESTAMP = 1234567890  # Fijo: los bytes canónicos no dependen de la hora de la corrida
+
+CASOS = {}
+
+
+def caso(nombre, tipo):
+    """
+    Registra un caso; la fábrica recibe (tamanos, rng, tmp) y retorna
+    (operaciones, correr, preparar): preparar() no se mide y su resultado se pasa a correr()
+    """
+    def registrar(fabrica):
+        CASOS[nombre] = (tipo, fabrica)
+        return fabrica
+    return registrar
+
+
+def _llaves(rng, n=REMITENTES):
+    return [ed25519.Ed25519PrivateKey.from_private_bytes(rng.randbytes(32)) for _ in range(n)]
+
+
+def _transacciones(rng, llaves, n):
+    direcciones = [address_from_public_key(llave.public_key().public_bytes_raw()) for llave in llaves]
+    return [
+        Transaction(direcciones[i % len(llaves)], "0x" + rng.randbytes(20).hex(), rng.randrange(1, 10 ** 9),
+                    i // len(llaves), timestamp=TIMESTAMP)
+        for i in range(n)
+    ]
+
+
+def _sobres(rng, n):
+    # Sobres tal como los emite el Signer
+    llaves = _llaves(rng)
+    return [Signer(llave).sign_transaction(tx)
+            for tx, llave in zip(_transacciones(rng, llaves, n), llaves * (n // len(llaves) + 1))]
+
+
+@caso("canonicalize", "micro")
+def _canonicalize(tamanos, rng, tmp):
+    dicts = [tx.to_dict() for tx in _transacciones(rng, _llaves(rng), tamanos["canonicalize"])]
+    return len(dicts), lambda _: [canonicalize(d) for d in dicts], None
+
+
+@caso("canonicalize_tx", "micro")
+def _canonicalize_tx(tamanos, rng, tmp):
+    dicts = [tx.to_dict() for tx in _transacciones(rng, _llaves(rng), tamanos["canonicalize"])]
+    return len(dicts), lambda _: [canonicalize_tx(d) for d in dicts], None
+
+
+@caso("sign_transaction", "micro")
+def _sign_transaction(tamanos, rng, tmp):
+    llaves = _llaves(rng)
+    firmantes = [Signer(llave) for llave in llaves]
+    base = [tx.to_dict() for tx in _transacciones(rng, llaves, tamanos["firmas"])]
+
+    def preparar():
+        # Transacciones nuevas: los bytes canónicos memorizados no se reutilizan entre corridas
+        return [Transaction.from_dict(d) for d in base]
+
+    def correr(txs):
+        for i, tx in enumerate(txs):
+            firmantes[i % REMITENTES].sign_transaction(tx)
+
+    return len(base), correr, preparar
+
+
+@caso("verificar_firma", "micro")
+def _verificar_firma(tamanos, rng, tmp):
+    sobres = _sobres(rng, tamanos["verificaciones"])
+
+    def correr(_):
+        for sobre in sobres:
+            if not verificar_firma(sobre).valido:
+                raise AssertionError("sobre inválido en el benchmark")
+
+    return len(sobres), correr, None
+
+
+def _nonces(tamanos, rng, tmp, clave, lote):
+    direcciones = ["0x" + rng.randbytes(20).hex() for _ in range(REMITENTES)]
+    n = tamanos[clave]
+    contador = iter(range(10 ** 9))
+
+    def preparar():
+        carpeta = tmp / f"nonces-{next(contador)}"
+        carpeta.mkdir()
+        return NonceStore(carpeta / "nonces.json")
+
+    def correr(store):
+        with store.lote() if lote else contextlib.nullcontext():
+            for i in range(n):
+                store.update_nonce(direcciones[i % REMITENTES], i // REMITENTES)
+        store.close()
+
+    return n, correr, preparar
+
+
+@caso("update_nonce", "micro")
+def _update_nonce(tamanos, rng, tmp):
+    # Un fsync del journal por actualización
+    return _nonces(tamanos, rng, tmp, "nonces", lote=False)
+
+
+@caso("update_nonce_lote", "micro")
+def _update_nonce_lote(tamanos, rng, tmp):
+    # Group commit: un fsync por lote
+    return _nonces(tamanos, rng, tmp, "nonces_lote", lote=True)
+
+
+@caso("crear_keystore", "macro")
+def _crear_keystore(tamanos, rng, tmp):
+    llaves = _llaves(rng, tamanos["keystores"])
+    contador = iter(range(10 ** 9))
+
+    def correr(_):
+        carpeta = tmp / f"crear-{next(contador)}"
+        carpeta.mkdir()
+        for i, llave in enumerate(llaves):
+            crear_keystore(str(carpeta / f"{i}.json"), "passphrase-bench", kdf_params=KDF_BENCH,
+                           llave_privada=llave)
+
+    return len(llaves), correr, None
+
+
+@caso("cargar_keystore", "macro")
+def _cargar_keystore(tamanos, rng, tmp):
+    carpeta = tmp / "cargar"
+    carpeta.mkdir()
+    rutas = [str(carpeta / f"{i}.json") for i in range(tamanos["keystores"])]
+    for ruta, llave in zip(rutas, _llaves(rng, len(rutas))):
+        crear_keystore(ruta, "passphrase-bench", kdf_params=KDF_BENCH, llave_privada=llave)
+
+    def correr(_):
+        for ruta in rutas:
+            cargar_keystore(ruta, "passphrase-bench")
+
+    return len(rutas), correr, None
+
+
+@caso("procesar_inbox", "macro")
+def _procesar_inbox(tamanos, rng, tmp):
+    contenidos = [json.dumps(sobre) for sobre in _sobres(rng, tamanos["archivos"])]
+    contador = iter(range(10 ** 9))
+
+    def preparar():
+        carpeta = tmp / f"inbox-{next(contador)}"
+        (carpeta / "inbox").mkdir(parents=True)
+        for i, contenido in enumerate(contenidos):
+            (carpeta / "inbox" / f"tx-{i:06d}.json").write_text(contenido, encoding="utf-8")
+        return carpeta
+
+    def correr(carpeta):
+        rutas = {"INBOX_DIR": carpeta / "inbox", "OUTBOX_DIR": carpeta / "outbox",
+                 "VERIFIED_DIR": carpeta / "verified", "NONCES_FILE": carpeta / "nonces.json",
+                 "INDICE_FILE": carpeta / "verified_index.sqlite3"}
+        originales = {nombre: getattr(simulator, nombre) for nombre in rutas}
+        try:
+            for nombre, ruta in rutas.items():
+                setattr(simulator, nombre, ruta)
+            with contextlib.redirect_stdout(io.StringIO()):
+                simulator.procesar_inbox(workers=1)
+        finally:
+            for nombre, ruta in originales.items():
+                setattr(simulator, nombre, ruta)
+        if len(list((carpeta / "verified").iterdir())) != len(contenidos):
+            raise AssertionError("el simulador rechazó sobres del benchmark")
+
+    return len(contenidos), correr, preparar
+
+
+def medir(nombre, tamanos, semilla, repeticiones, tmp) -> dict:
+    tipo, fabrica = CASOS[nombre]
+    # Semilla por caso: agregar o quitar casos no cambia los datos de los demás
+    rng = random.Random(f"{semilla}:{nombre}")
+    carpeta = Path(tmp) / nombre
+    carpeta.mkdir()
+    operaciones, correr, preparar = fabrica(tamanos, rng, carpeta)
+
+    correr(preparar() if preparar else None)  # Calentamiento (cachés, imports perezosos)
+    tiempos = []
+    for _ in range(repeticiones):
+        estado = preparar() if preparar else None
+        inicio = time.perf_counter()
+        correr(estado)
+        tiempos.append((time.perf_counter() - inicio) / operaciones * 1e6)
+    shutil.rmtree(carpeta, ignore_errors=True)
+
+    mediana = statistics.median(tiempos)
+    return {
+        "tipo": tipo,
+        "operaciones": operaciones,
+        "repeticiones": repeticiones,
+        "us_por_op": {
+            "min": min(tiempos),
+            "mediana": mediana,
+            "media": statistics.fmean(tiempos),
+            "desviacion": statistics.pstdev(tiempos),
+        },
+        "ops_por_s": 1e6 / mediana,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parents[1], timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def ejecutar(casos=None, repeticiones=5, semilla=1234, escala="normal", archivos=None) -> dict:
+    """
+    Corre los casos pedidos (todos por defecto) y retorna el documento JSON de resultados
+    """
+    casos = list(casos or CASOS)
+    desconocidos = [c for c in casos if c not in CASOS]
+    if desconocidos:
+        raise ValueError(f"casos desconocidos: {', '.join(desconocidos)}")
+    tamanos = dict(TAMANOS[escala])
+    if archivos:
+        tamanos["archivos"] = archivos
+
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        for nombre in casos:
+            resultados[nombre] = medir(nombre, tamanos, semilla, repeticiones, tmp)
+
+    return {
+        "version": VERSION,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "entorno": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": _commit(),
+        },
+        "parametros": {"semilla": semilla, "repeticiones": repeticiones, "escala": escala,
+                       "tamanos": tamanos, "kdf": KDF_BENCH},
+        "resultados": resultados,
+    }
+
+
+def comparar(base: dict, actual: dict, umbral: float = 0.10) -> list[dict]:
+    """
+    Compara la mediana de us/op de cada caso; cambio > umbral es regresión y < -umbral es mejora
+    """
+    filas = []
+    nombres = list(actual["resultados"]) + [n for n in base["resultados"] if n not in actual["resultados"]]
+    for nombre in nombres:
+        antes = base["resultados"].get(nombre)
+        ahora = actual["resultados"].get(nombre)
+        if antes is None or ahora is None:
+            filas.append({"caso": nombre, "estado": "nuevo" if antes is None else "ausente"})
+            continue
+        us_antes = antes["us_por_op"]["mediana"]
+        us_ahora = ahora["us_por_op"]["mediana"]
+        cambio = us_ahora / us_antes - 1
+        estado = "regresion" if cambio > umbral else "mejora" if cambio < -umbral else "igual"
+        filas.append({"caso": nombre, "estado": estado, "base_us": us_antes, "actual_us": us_ahora,
+                      "cambio": cambio})
+    return filas
+
+
+def _imprimir(documento: dict) -> None:
+    for nombre, r in documento["resultados"].items():
+        us = r["us_por_op"]
+        print(f"{nombre:20s} {r['tipo']:5s} {us['mediana']:10.1f} us/op (min {us['min']:.1f}, "
+              f"±{us['desviacion']:.1f})  {r['ops_por_s']:10.0f} op/s")
+
+
+def _imprimir_comparacion(filas: list[dict], umbral: float) -> None:
+    print(f"\nComparación contra el baseline (umbral {umbral:.0%}):")
+    for fila in filas:
+        if "cambio" not in fila:
+            print(f"{fila['caso']:20s} {fila['estado']}")
+            continue
+        marca = "  <-- REGRESIÓN" if fila["estado"] == "regresion" else ""
+        print(f"{fila['caso']:20s} {fila['base_us']:10.1f} -> {fila['actual_us']:10.1f} us/op "
+              f"{fila['cambio']:+8.1%}{marca}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--casos", default=None, help=f"lista separada por comas ({', '.join(CASOS)})")
+    parser.add_argument("--repeticiones", type=int, default=5, help="corridas medidas por caso")
+    parser.add_argument("--semilla", type=int, default=1234, help="semilla de llaves y transacciones")
+    parser.add_argument("--archivos", type=int, default=None, help="archivos en el inbox de procesar_inbox")
+    parser.add_argument("--rapido", action="store_true", help="tamaños reducidos (humo, no para comparar)")
+    parser.add_argument("--salida", type=Path, default=None, help="guarda los resultados en este JSON")
+    parser.add_argument("--json", action="store_true", help="imprime los resultados en JSON")
+    parser.add_argument("--comparar", type=Path, default=None, help="JSON de baseline contra el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="empeoramiento tolerado (0.10 = 10%%)")
+    parser.add_argument("--desde", type=Path, default=None,
+                        help="usa un JSON de resultados ya guardado en lugar de correr la suite")
+    args = parser.parse_args()
+
+    if args.desde is not None:
+        documento = json.loads(args.desde.read_text(encoding="utf-8"))
+    else:
+        casos = args.casos.split(",") if args.casos else None
+        documento = ejecutar(casos, args.repeticiones, args.semilla,
+                             "rapido" if args.rapido else "normal", args.archivos)
+    if args.salida is not None:
+        args.salida.write_text(json.dumps(documento, indent=2), encoding="utf-8")
+
+    filas = None
+    if args.comparar is not None:
+        base = json.loads(args.comparar.read_text(encoding="utf-8"))
+        if base["parametros"]["tamanos"] != documento["parametros"]["tamanos"]:
+            print("Aviso: el baseline se midió con otros tamaños", file=sys.stderr)
+        filas = comparar(base, documento, args.umbral)
+
+    if args.json:
+        if filas is not None:
+            documento = {**documento, "comparacion": filas}
+        print(json.dumps(documento, indent=2))
+    else:
+        _imprimir(documento)
+        if filas is not None:
+            _imprimir_comparacion(filas, args.umbral)
+
+    return 1 if filas and any(f["estado"] == "regresion" for f in filas) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
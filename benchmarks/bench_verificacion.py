@@ -0,0 +1,172 @@
+"""
+Costo por verificación con y sin el caché de llaves públicas parseadas
+Uso: python benchmarks/bench_verificacion.py [--esquema ed25519|secp256k1] [--remitentes 16]
+                                             [--firmas 2000] [--repeticiones 5] [--json]
+"""
+
+import argparse
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+import verifier
+from app.secp256k1 import firmar_recuperable
+from verifier import address_from_public_key, canonical_json_bytes, verificar_sin_nonce
+
+
+class Ed25519:
+    nombre = "ed25519"
+
+    @staticmethod
+    def llave(semilla: int):
+        llave = ed25519.Ed25519PrivateKey.from_private_bytes(semilla.to_bytes(32, "big"))
+        return llave, llave.public_key().public_bytes_raw()
+
+    @staticmethod
+    def firmar(llave, mensaje: bytes) -> bytes:
+        return llave.sign(mensaje)
+
+    @staticmethod
+    def verificar_sin_cache(pub: bytes, mensaje: bytes, firma: bytes) -> None:
+        ed25519.Ed25519PublicKey.from_public_bytes(pub).verify(firma, mensaje)
+
+
+class Secp256k1:
+    nombre = "secp256k1"
+
+    @staticmethod
+    def llave(semilla: int):
+        llave = ec.derive_private_key(semilla, ec.SECP256K1())
+        # Punto comprimido: descomprimirlo es la parte cara del parseo
+        return llave, llave.public_key().public_bytes(serialization.Encoding.X962,
+                                                      serialization.PublicFormat.CompressedPoint)
+
+    @staticmethod
+    def firmar(llave, mensaje: bytes) -> bytes:
+        return firmar_recuperable(llave, mensaje)
+
+    @staticmethod
+    def verificar_sin_cache(pub: bytes, mensaje: bytes, firma: bytes) -> None:
+        llave = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256K1(), pub)
+        der = encode_dss_signature(int.from_bytes(firma[:32], "big"), int.from_bytes(firma[32:64], "big"))
+        llave.verify(der, mensaje, ec.ECDSA(hashes.SHA256()))
+
+
+ESQUEMAS = {esquema.nombre: esquema for esquema in (Ed25519, Secp256k1)}
+
+
+def preparar(esquema, remitentes: int, firmas: int) -> list[tuple[bytes, bytes, bytes, dict]]:
+    # Semillas fijas: la misma carga en cada corrida
+    llaves = [esquema.llave(i) for i in range(1, remitentes + 1)]
+    casos = []
+    for n in range(firmas):
+        llave, pub = llaves[n % remitentes]
+        tx = {"from_address": address_from_public_key(pub, esquema.nombre), "to": "0xDESTINO123",
+              "value": str(n), "nonce": str(n // remitentes), "timestamp": 1234567890}
+        mensaje = canonical_json_bytes(tx)
+        firma = esquema.firmar(llave, mensaje)
+        sobre = {
+            "tx": tx,
+            "sig_scheme": esquema.nombre,
+            "signature_b64": base64.b64encode(firma).decode("ascii"),
+            "public_key_b64": base64.b64encode(pub).decode("ascii"),
+        }
+        casos.append((pub, mensaje, firma, sobre))
+    return casos
+
+
+def sin_cache(esquema, casos) -> None:
+    # Lo que haría un verificador ingenuo: parsear la llave en cada firma
+    verificar = esquema.verificar_sin_cache
+    for pub, mensaje, firma, _ in casos:
+        verificar(pub, mensaje, firma)
+
+
+def con_cache(esquema, casos) -> None:
+    verificar = verifier.VERIFICADORES[esquema.nombre]
+    for pub, mensaje, firma, _ in casos:
+        if not verificar(pub, mensaje, firma):
+            raise AssertionError("firma inválida en el benchmark")
+
+
+def sobre_completo(esquema, casos) -> None:
+    # Camino completo del verifier: canonicalización, base64, firma y dirección
+    for _, _, _, sobre in casos:
+        if not verificar_sin_nonce(sobre)[0].valido:
+            raise AssertionError("sobre inválido en el benchmark")
+
+
+def sin_pubkey(esquema, casos) -> None:
+    # Sobres sin public_key_b64: la llave sale de la firma (caché de llaves recuperadas tibio)
+    for _, _, _, sobre in casos:
+        sobre = {k: v for k, v in sobre.items() if k != "public_key_b64"}
+        if not verificar_sin_nonce(sobre)[0].valido:
+            raise AssertionError("sobre inválido en el benchmark")
+
+
+def sin_pubkey_sin_cache(esquema, casos) -> None:
+    # Igual, pero recuperando la llave en cada sobre
+    for _, _, _, sobre in casos:
+        verifier.llaves_recuperadas.clear()
+        sobre = {k: v for k, v in sobre.items() if k != "public_key_b64"}
+        if not verificar_sin_nonce(sobre)[0].valido:
+            raise AssertionError("sobre inválido en el benchmark")
+
+
+def medir(fn, esquema, casos, repeticiones: int) -> float:
+    # Mejor de N corridas, en segundos por verificación
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn(esquema, casos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor / len(casos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--esquema", choices=sorted(ESQUEMAS), default="ed25519")
+    parser.add_argument("--remitentes", type=int, default=16, help="llaves distintas (remitentes frecuentes)")
+    parser.add_argument("--firmas", type=int, default=2000, help="verificaciones por corrida")
+    parser.add_argument("--repeticiones", type=int, default=5, help="corridas; se reporta la mejor")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    esquema = ESQUEMAS[args.esquema]
+    casos = preparar(esquema, args.remitentes, args.firmas)
+    verifier.pubkey_cache_clear()
+    medidas = {
+        "sin_cache": medir(sin_cache, esquema, casos, args.repeticiones),
+        "con_cache": medir(con_cache, esquema, casos, args.repeticiones),
+        "sobre_completo": medir(sobre_completo, esquema, casos, args.repeticiones),
+    }
+    if esquema.nombre in verifier.RECUPERABLES:
+        medidas["sin_pubkey_recuperando"] = medir(sin_pubkey_sin_cache, esquema, casos, args.repeticiones)
+        medidas["sin_pubkey_cache"] = medir(sin_pubkey, esquema, casos, args.repeticiones)
+    resultado = {
+        "esquema": esquema.nombre,
+        "remitentes": args.remitentes,
+        "firmas": args.firmas,
+        "us_por_verificacion": {k: v * 1e6 for k, v in medidas.items()},
+        "verificaciones_por_s": {k: 1 / v for k, v in medidas.items()},
+        "cache_llaves": verifier.pubkey_cache_info()[esquema.nombre],
+    }
+
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+    for nombre, segundos in medidas.items():
+        print(f"{nombre:22s} {segundos * 1e6:8.1f} us/verif  {1 / segundos:10.0f} verif/s")
+    print(f"ahorro del caché de llaves: {(1 - medidas['con_cache'] / medidas['sin_cache']) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Bundles JSON Lines: muchos sobres firmados por archivo (.jsonl), una línea por sobre
+Escritura solo-append, lectura con mmap por generador (memoria acotada) y un índice
+opcional de offsets (<bundle>.idx) para acceso directo y para repartir por rangos
+"""
+
+import json
+import math
+import mmap
+import os
+from array import array
+from pathlib import Path
+
+EXTENSION = ".jsonl"
+EXTENSION_INDICE = ".idx"
+EXTENSION_PARCIAL = ".part"
+
+
+def ruta_indice(path) -> Path:
+    """Ruta del índice de offsets de un bundle (<bundle>.idx)."""
+    path = Path(path)
+    return path.with_name(path.name + EXTENSION_INDICE)
+
+
+def ruta_parcial(path) -> Path:
+    """Ruta con la que se escribe un bundle hasta cerrarlo (<bundle>.part)."""
+    path = Path(path)
+    return path.with_name(path.name + EXTENSION_PARCIAL)
+
+
+def linea_json(sobre) -> bytes:
+    """Serializa un sobre como una línea JSON compacta (sin saltos de línea internos)."""
+    return json.dumps(sobre, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class EscritorBundle:
+    """
+    Escritor solo-append de bundles
+    Cada sobre se escribe en una sola llamada write (línea completa), así un lector nunca
+    ve una línea a medias salvo por un crash; con indice=True también mantiene el .idx
+    Mientras está abierto el bundle se llama <bundle>.part y close() lo renombra al nombre
+    final: quien vigila la carpeta solo ve bundles sellados
+    """
+
+    def __init__(self, path, indice: bool = False, fsync: bool = True) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self._parcial = ruta_parcial(self.path)
+        # Para seguir agregando a un bundle ya publicado se retira primero del nombre final
+        if self.path.exists() and self._parcial.exists(): # .part de un escritor que no cerró
+            raise FileExistsError(f"{self.path} y {self._parcial} existen a la vez")
+        if self.path.exists():
+            if indice and ruta_indice(self.path).exists():
+                os.replace(ruta_indice(self.path), ruta_indice(self._parcial))
+            os.replace(self.path, self._parcial)
+        self._archivo = open(self._parcial, "ab")
+        self._offset = self._archivo.seek(0, os.SEEK_END)
+        self._indice = None
+        if indice:
+            # Un índice que no corresponde al contenido actual se reconstruye antes de seguir
+            if self._offset and cargar_indice(self._parcial) is None:
+                indexar_bundle(self._parcial)
+            self._indice = open(ruta_indice(self._parcial), "ab")
+        self.escritos = 0
+
+    def agregar(self, sobre) -> int:
+        """Agrega un sobre (dict) o una línea ya serializada; retorna su offset."""
+        linea = sobre if isinstance(sobre, (bytes, bytearray)) else linea_json(sobre)
+        if not linea.endswith(b"\n"):
+            linea += b"\n"
+        if linea.count(b"\n") != 1:
+            raise ValueError("una línea de bundle no puede contener saltos de línea")
+        offset = self._offset
+        self._archivo.write(linea)
+        self._offset += len(linea)
+        if self._indice is not None:
+            self._indice.write(array("Q", [offset]).tobytes())
+        self.escritos += 1
+        return offset
+
+    def agregar_muchos(self, sobres) -> int:
+        """Agrega varios sobres; retorna cuántos se escribieron."""
+        n = 0
+        for sobre in sobres:
+            self.agregar(sobre)
+            n += 1
+        return n
+
+    def flush(self) -> None:
+        self._archivo.flush()
+        if self._indice is not None:
+            self._indice.flush()
+        if self.fsync:
+            os.fsync(self._archivo.fileno())
+
+    def close(self) -> None:
+        if self._archivo.closed:
+            return
+        self.flush()
+        self._archivo.close()
+        if self._indice is not None: # El índice se publica antes que su bundle
+            self._indice.close()
+            os.replace(ruta_indice(self._parcial), ruta_indice(self.path))
+        os.replace(self._parcial, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _abrir_mmap(archivo):
+    if os.fstat(archivo.fileno()).st_size == 0:
+        return None  # mmap no acepta archivos vacíos
+    return mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _inicio_de_linea(mm, pos: int) -> int:
+    # Primera línea que empieza en pos o después
+    if pos <= 0:
+        return 0
+    if mm[pos - 1] == 0x0A:
+        return pos
+    fin = mm.find(b"\n", pos)
+    return len(mm) if fin == -1 else fin + 1
+
+
+def iterar_lineas(mm, inicio: int = 0, fin: int | None = None):
+    """
+    Recorre las líneas de un buffer que *empiezan* en [inicio, fin); genera (offset, bytes)
+    Los rangos contiguos cubren cada línea exactamente una vez aunque corten a media línea
+    """
+    total = len(mm)
+    fin = total if fin is None else min(fin, total)
+    pos = _inicio_de_linea(mm, inicio)
+    while pos < fin:
+        salto = mm.find(b"\n", pos)
+        siguiente = total if salto == -1 else salto + 1
+        linea = mm[pos:siguiente if salto == -1 else salto]
+        if linea.strip():
+            yield pos, linea
+        pos = siguiente
+
+
+def leer_bundle(path, inicio: int = 0, fin: int | None = None):
+    """
+    Generador de (offset, línea) de un bundle usando mmap; solo la línea actual se copia
+    inicio/fin delimitan un rango de bytes (para repartir un bundle entre workers)
+    """
+    with open(path, "rb") as archivo:
+        mm = _abrir_mmap(archivo)
+        if mm is None:
+            return
+        with mm:
+            yield from iterar_lineas(mm, inicio, fin)
+
+
+def leer_sobres(path, inicio: int = 0, fin: int | None = None):
+    """Generador de (offset, sobre) ya parseados; una línea inválida lanza ValueError."""
+    for offset, linea in leer_bundle(path, inicio, fin):
+        yield offset, json.loads(linea)
+
+
+def indexar_bundle(path) -> array:
+    """Construye (o reconstruye) <bundle>.idx con el offset de cada línea como u64."""
+    offsets = array("Q", (offset for offset, _ in leer_bundle(path)))
+    destino = ruta_indice(path)
+    temporal = destino.with_name(destino.name + ".tmp")
+    temporal.write_bytes(offsets.tobytes())
+    os.replace(temporal, destino)
+    return offsets
+
+
+def cargar_indice(path) -> array | None:
+    """
+    Carga el índice de un bundle; None si no existe o no corresponde al archivo
+    (se comprueba que el último offset caiga al inicio de una línea dentro del archivo)
+    """
+    idx = ruta_indice(path)
+    try:
+        crudo = idx.read_bytes()
+        tamano = os.path.getsize(path)
+    except FileNotFoundError:
+        return None
+    if len(crudo) % 8:
+        return None
+    offsets = array("Q")
+    offsets.frombytes(crudo)
+    if not offsets:
+        return offsets if tamano == 0 else None
+    ultimo = offsets[-1]
+    if ultimo >= tamano:
+        return None
+    with open(path, "rb") as archivo:
+        if ultimo:
+            archivo.seek(ultimo - 1)
+            if archivo.read(1) != b"\n":
+                return None
+        archivo.seek(ultimo)
+        cola = archivo.read()
+    if cola.rstrip(b"\n").count(b"\n"):  # Hay líneas después de la última indexada
+        return None
+    return offsets
+
+
+def leer_linea(path, n: int, indice: array | None = None) -> bytes:
+    """Línea n del bundle (desde 0) en O(1) con el índice."""
+    indice = indice if indice is not None else cargar_indice(path)
+    if indice is None:
+        raise ValueError(f"{path} no tiene un índice válido")
+    with open(path, "rb") as archivo:
+        archivo.seek(indice[n])
+        return archivo.readline().rstrip(b"\n")
+
+
+def rangos_bundle(path, partes: int, indice: array | None = None) -> list[tuple[int, int]]:
+    """
+    Parte un bundle en hasta `partes` rangos de bytes [inicio, fin) contiguos
+    Con índice los rangos quedan alineados a líneas y con igual número de sobres;
+    sin índice se reparte por bytes y el lector alinea cada rango a la línea siguiente
+    """
+    tamano = os.path.getsize(path)
+    partes = max(1, int(partes))
+    if tamano == 0:
+        return []
+    indice = indice if indice is not None else cargar_indice(path)
+    if indice is not None and len(indice):
+        por_parte = math.ceil(len(indice) / partes)
+        inicios = [indice[i] for i in range(0, len(indice), por_parte)]
+        inicios[0] = 0
+    else:
+        paso = math.ceil(tamano / partes)
+        inicios = list(range(0, tamano, paso))
+    return list(zip(inicios, inicios[1:] + [tamano]))
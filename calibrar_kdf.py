@@ -0,0 +1,41 @@
+"""
+Calibra los parámetros de Argon2id para este equipo
+Mide varias derivaciones y guarda el perfil que usará crear_keystore por defecto
+"""
+
+import argparse
+import json
+
+from almallave import calibrar_argon2, guardar_perfil_kdf, RUTA_PERFIL_KDF
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibración de Argon2id para el keystore")
+    parser.add_argument("--objetivo-ms", type=float, default=500.0,
+                        help="latencia objetivo de desbloqueo en milisegundos")
+    parser.add_argument("--memoria-max-mib", type=int, default=256,
+                        help="memoria máxima por derivación en MiB")
+    parser.add_argument("--lanes", type=int, default=None,
+                        help="carriles de Argon2 (por defecto uno por núcleo, máximo 8)")
+    parser.add_argument("--salida", default=RUTA_PERFIL_KDF,
+                        help="archivo donde se guarda el perfil")
+    parser.add_argument("--solo-medir", action="store_true",
+                        help="muestra el resultado sin guardar el perfil")
+    args = parser.parse_args()
+
+    print(f"Calibrando Argon2id (objetivo {args.objetivo_ms:.0f} ms, máximo {args.memoria_max_mib} MiB)...")
+    resultado = calibrar_argon2(
+        objetivo_ms=args.objetivo_ms,
+        memoria_max_kib=args.memoria_max_mib * 1024,
+        lanes=args.lanes
+    )
+    print(json.dumps(resultado, indent=2))
+
+    if not args.solo_medir:
+        perfil = {k: resultado[k] for k in ("time_cost", "memory_cost_kib", "parallelism")}
+        ruta = guardar_perfil_kdf(perfil, args.salida)
+        print(f"Perfil guardado en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Índice en disco de transacciones verificadas (SQLite)
+Claves: remitente, destinatario, nonce y hash del tx; lo actualiza procesar_inbox de forma
+incremental y lo consulta /api/transactions con paginación por cursor (keyset)
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.binary_envelope import decodificar as decodificar_binario
+from app.canonicalizer import canonicalize_tx
+from app.transaction import Transaction, calcular_tx_hash
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 1000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS transacciones (
+    id INTEGER PRIMARY KEY,
+    tx_hash TEXT NOT NULL UNIQUE,
+    from_address TEXT NOT NULL,
+    to_address TEXT,
+    nonce TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    offset INTEGER,
+    tx TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_tx_from_nonce ON transacciones (from_address, nonce);
+CREATE INDEX IF NOT EXISTS ix_tx_to ON transacciones (to_address);
+CREATE INDEX IF NOT EXISTS ix_tx_nonce ON transacciones (nonce);
+"""
+
+_COLUMNAS = "id, tx_hash, from_address, to_address, nonce, archivo, offset, tx"
+
+# Los nonces no caben siempre en el INTEGER de SQLite (64 bits con signo): se guardan como texto
+# decimal con ceros a la izquierda, así cualquier uint256 ordena igual que el número
+ANCHO_NONCE = 78
+
+
+def _clave_nonce(nonce) -> str:
+    return f"{int(nonce):0{ANCHO_NONCE}d}"
+
+
+def registro_desde_sobre(sobre) -> tuple | None:
+    """
+    (tx_hash, from_address, to, nonce, tx canónico) de un sobre JSON, binario o con Transaction
+    None si el sobre no trae un tx reconocible
+    """
+    if isinstance(sobre, (bytes, bytearray, memoryview)):
+        tx = decodificar_binario(sobre).tx
+    else:
+        tx = sobre.get("tx") if isinstance(sobre, dict) else None
+        if isinstance(tx, Transaction):
+            tx = tx.to_dict()
+    if not isinstance(tx, dict):
+        return None
+    remitente = tx.get("from_address", tx.get("from"))
+    if remitente is None or tx.get("nonce") is None:
+        return None
+    canonico = canonicalize_tx(tx)
+    destino = tx.get("to")
+    return (calcular_tx_hash(canonico), str(remitente).lower(),
+            str(destino).lower() if destino is not None else None,
+            int(tx["nonce"]), canonico.decode("utf-8"))
+
+
+class IndiceTransacciones:
+    def __init__(self, path) -> None:
+        """
+        Abre (o crea) el índice en path; una sola conexión protegida por lock
+        En modo WAL el servidor puede leer mientras el simulador escribe
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        with self._lock:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.executescript(_ESQUEMA)
+
+    def agregar(self, registros) -> int:
+        """
+        Agrega registros [(archivo, offset, registro_desde_sobre(...)), ...] en una sola
+        transacción; offset es None para archivos sueltos y un tx_hash ya indexado se ignora
+        Retorna cuántos se agregaron
+        """
+        filas = [(r[0], r[1], r[2], _clave_nonce(r[3]), archivo, offset, r[4])
+                 for archivo, offset, r in registros if r is not None]
+        if not filas:
+            return 0
+        with self._lock, self._conexion:
+            antes = self._conexion.total_changes
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO transacciones "
+                "(tx_hash, from_address, to_address, nonce, archivo, offset, tx) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+            return self._conexion.total_changes - antes
+
+    def buscar(self, from_address=None, to=None, nonce=None, tx_hash=None,
+               limite=LIMITE_POR_DEFECTO, despues=None) -> tuple[list[dict], int | None]:
+        """
+        Consulta por cualquier combinación de filtros, en orden de indexación
+        Retorna (transacciones, cursor); el cursor se pasa como `despues` para la página
+        siguiente y es None cuando no hay más
+        """
+        condiciones, parametros = [], []
+        for columna, valor in (("from_address", from_address), ("to_address", to)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(str(valor).lower())
+        if nonce is not None:
+            condiciones.append("nonce = ?")
+            parametros.append(_clave_nonce(nonce))
+        if tx_hash is not None:
+            condiciones.append("tx_hash = ?")
+            parametros.append(str(tx_hash).lower())
+        if despues is not None:
+            condiciones.append("id > ?")
+            parametros.append(int(despues))
+        limite = max(1, min(int(limite), LIMITE_MAXIMO))
+
+        consulta = f"SELECT {_COLUMNAS} FROM transacciones"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        consulta += " ORDER BY id LIMIT ?"
+        parametros.append(limite + 1) # Una fila de más indica si hay otra página
+
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        cursor = filas[limite - 1]["id"] if len(filas) > limite else None
+        return [self._a_dict(fila) for fila in filas[:limite]], cursor
+
+    def contiene(self, from_address: str, nonce: int) -> bool:
+        """True si el nonce de esa dirección ya está verificado."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT 1 FROM transacciones WHERE from_address = ? AND nonce = ? LIMIT 1",
+                (from_address.lower(), _clave_nonce(nonce))).fetchone()
+        return fila is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM transacciones").fetchone()[0]
+
+    def reconstruir(self, carpeta) -> int:
+        """
+        Indexa todo lo que ya está en la carpeta de verificados (archivos sueltos y bundles)
+        Útil para archivos anteriores al índice; lo ya indexado se ignora
+        """
+        from bundles import leer_sobres
+
+        carpeta = Path(carpeta)
+        total = 0
+        for archivo in sorted(carpeta.iterdir()):
+            try:
+                if archivo.suffix == ".jsonl":
+                    sobres = list(leer_sobres(archivo))
+                elif archivo.suffix == ".bin":
+                    sobres = [(None, archivo.read_bytes())]
+                elif archivo.suffix == ".json":
+                    sobres = [(None, json.loads(archivo.read_text(encoding="utf-8")))]
+                else:
+                    continue
+                registros = [(archivo.name, offset, registro_desde_sobre(sobre)) for offset, sobre in sobres]
+            except (ValueError, TypeError, KeyError): # Archivo ajeno o ilegible: no se indexa
+                continue
+            total += self.agregar(registros)
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+    @staticmethod
+    def _a_dict(fila) -> dict:
+        return {
+            "tx_hash": fila["tx_hash"],
+            "from_address": fila["from_address"],
+            "to": fila["to_address"],
+            "nonce": int(fila["nonce"]),
+            "archivo": fila["archivo"],
+            "offset": fila["offset"],
+            "tx": json.loads(fila["tx"]),
+        }
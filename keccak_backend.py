@@ -0,0 +1,75 @@
+"""
+Backend de keccak-256 para derivar direcciones
+Elige una sola vez, al importar, la implementación más rápida disponible
+y ofrece derivación por lotes y un caché LRU de llave pública -> dirección
+"""
+
+import functools
+import os
+
+# Orden de preferencia: pysha3 (C, sin objetos intermedios) y luego pycryptodome.
+# KECCAK_BACKEND=pycryptodome fuerza un backend concreto.
+_PREFERIDO = os.environ.get("KECCAK_BACKEND", "")
+
+
+def _backend_pysha3():
+    from sha3 import keccak_256 as _keccak_256
+
+    def digest(data: bytes) -> bytes:
+        return _keccak_256(data).digest()
+    return digest
+
+
+def _backend_pycryptodome():
+    from Crypto.Hash import keccak as _keccak
+
+    _nuevo = _keccak.new
+
+    def digest(data: bytes) -> bytes:
+        return _nuevo(data=data, digest_bits=256).digest()
+    return digest
+
+
+_BACKENDS = {
+    "pysha3": _backend_pysha3,
+    "pycryptodome": _backend_pycryptodome,
+}
+
+
+def _elegir_backend():
+    nombres = list(_BACKENDS)
+    if _PREFERIDO in _BACKENDS:
+        nombres.remove(_PREFERIDO)
+        nombres.insert(0, _PREFERIDO)
+    for nombre in nombres:
+        try:
+            return nombre, _BACKENDS[nombre]()
+        except ImportError:
+            continue
+    raise ImportError("No hay implementación de keccak-256 disponible (instala pysha3 o pycryptodome)")
+
+
+BACKEND, keccak_256_digest = _elegir_backend()
+
+
+def derivar_direccion(pubkey_bytes: bytes) -> str:
+    """Dirección estilo Ethereum: 0x + últimos 20 bytes de keccak256(pubkey)."""
+    return "0x" + keccak_256_digest(pubkey_bytes)[12:].hex()
+
+
+# Caché acotado de llave pública -> dirección; los remitentes conocidos
+# solo cuestan una búsqueda en diccionario. cache_info() da hits/misses/tamaño.
+ADDRESS_CACHE_SIZE = int(os.environ.get("ADDRESS_CACHE_SIZE", 65536))
+
+@functools.lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def _direccion_cacheada(pubkey_bytes: bytes) -> str:
+    return derivar_direccion(pubkey_bytes)
+
+
+def direccion_cacheada(pubkey_bytes) -> str:
+    """Como derivar_direccion, pero usando el caché LRU."""
+    return _direccion_cacheada(bytes(pubkey_bytes))
+
+
+address_cache_info = _direccion_cacheada.cache_info
+address_cache_clear = _direccion_cacheada.cache_clear
@@ -0,0 +1,450 @@
+"""
+Generador de carga concurrente para la API (el flujo de test_ui.py, pero con muchos clientes a la vez)
+Uso: python loadtest.py [--iniciar | --url http://127.0.0.1:5000] [--mezcla sign=4,verify=4,load=0]
+                        [--concurrencia 8] [--rps 0] [--duracion 10] [--calentamiento 2]
+                        [--guardar corridas/] [--comparar corridas/loadtest-anterior.json] [--json]
+Reporta por endpoint: throughput, latencia p50/p95/p99 y tasa de errores
+Con --rps la carga es de lazo abierto: la latencia se mide desde el instante programado,
+así una cola en el servidor aparece en los percentiles (sin omisión coordinada)
+"""
+
+import argparse
+import contextlib
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from almallave import crear_keystore
+
+VERSION = 1
+
+# Pesos por defecto: lo que hace la UI (firmar y verificar) más algo de lotes y consultas;
+# load (Argon2) queda en 0 porque satura el pool del KDF y tapa todo lo demás
+MEZCLA_POR_DEFECTO = "sign=4,verify=4,sign_batch=1,verify_batch=1,transactions=1,load=0"
+
+# Argon2 liviano para la wallet de la prueba (el servidor usa los parámetros del keystore)
+KDF_CARGA = {"time_cost": 1, "memory_cost_kib": 8192, "parallelism": 1}
+PASSPHRASE = "loadtest-passphrase"
+DESTINO = "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb"
+
+
+def _tx(contexto, nonce):
+    return {"from": contexto["address"], "to": DESTINO, "value": str(1000 + nonce), "nonce": nonce,
+            "data_hex": ""}
+
+
+def _verify(ctx, rng):
+    firmado = rng.choice(ctx["firmados"])
+    return "POST", "/api/signature/verify", {
+        "fromAddress": ctx["address"],
+        "originalMessage": json.dumps(firmado["tx"]),
+        "signature": firmado["signature_b64"],
+        "publicKey": firmado["pubkey_b64"],
+    }
+
+
+# Cada operación retorna (método, ruta, body o None)
+OPERACIONES = {
+    "load": lambda ctx, rng: ("POST", "/api/wallet/load",
+                              {"keystorePath": ctx["keystore"], "passphrase": ctx["passphrase"]}),
+    "sign": lambda ctx, rng: ("POST", "/api/wallet/sign",
+                              {"sessionId": ctx["sessionId"], "transaction": _tx(ctx, rng.randrange(10 ** 6))}),
+    "sign_batch": lambda ctx, rng: ("POST", "/api/wallet/sign-batch", {
+        "sessionId": ctx["sessionId"],
+        "transactions": [_tx(ctx, rng.randrange(10 ** 6)) for _ in range(ctx["lote"])],
+    }),
+    "verify": _verify,
+    "verify_batch": lambda ctx, rng: ("POST", "/api/signature/verify-batch", {
+        "envelopes": rng.sample(ctx["firmados"], min(ctx["lote"], len(ctx["firmados"]))),
+    }),
+    "transactions": lambda ctx, rng: ("GET", "/api/transactions?limit=20", None),
+    "kdf_stats": lambda ctx, rng: ("GET", "/api/kdf/stats", None),
+    "metrics": lambda ctx, rng: ("GET", "/api/metrics", None),
+}
+
+
+def parsear_mezcla(texto: str) -> dict:
+    """
+    "sign=4,verify=4" -> {"sign": 4.0, "verify": 4.0}; los pesos en 0 se descartan
+    """
+    mezcla = {}
+    for parte in filter(None, (p.strip() for p in texto.split(","))):
+        nombre, _, peso = parte.partition("=")
+        if nombre not in OPERACIONES:
+            raise ValueError(f"operación desconocida: {nombre} (opciones: {', '.join(OPERACIONES)})")
+        peso = float(peso or 1)
+        if peso < 0:
+            raise ValueError(f"peso negativo para {nombre}")
+        if peso:
+            mezcla[nombre] = peso
+    if not mezcla:
+        raise ValueError("la mezcla no tiene operaciones con peso > 0")
+    return mezcla
+
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+class Cliente:
+    def __init__(self, url: str, timeout: float = 30.0):
+        """
+        Conexión HTTP/1.1 persistente de un solo hilo; se reabre si el servidor la cierra
+        """
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.port = partes.port or 80
+        self.timeout = timeout
+        self._conexion = None
+
+    def pedir(self, metodo: str, ruta: str, body=None):
+        """
+        Retorna (status, datos JSON o None); lanza OSError/HTTPException si la conexión falla
+        """
+        if self._conexion is None:
+            self._conexion = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        cabeceras = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            cabeceras["Content-Type"] = "application/json"
+        try:
+            self._conexion.request(metodo, ruta, body=payload, headers=cabeceras)
+            respuesta = self._conexion.getresponse()
+            contenido = respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if respuesta.will_close:
+            self.close()
+        datos = None
+        if respuesta.getheader("Content-Type", "").startswith("application/json"):
+            datos = json.loads(contenido)
+        return respuesta.status, datos
+
+    def close(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+
+class ServidorLocal:
+    def __init__(self, puerto: int = 0, directorio: Path | None = None):
+        """
+        Levanta api_server en un subproceso (servidor de Flask con hilos, sin debug ni reloader)
+        El índice de transacciones va a un directorio temporal para no tocar el del repo
+        """
+        self.puerto = puerto or _puerto_libre()
+        self.url = f"http://127.0.0.1:{self.puerto}"
+        self.directorio = directorio
+        self._proceso = None
+
+    def __enter__(self):
+        raiz = Path(__file__).resolve().parent
+        env = dict(os.environ, TX_INDEX_PATH=str(Path(self.directorio) / "verified_index.sqlite3"))
+        codigo = ("import api_server; api_server.app.run(host='127.0.0.1', "
+                  f"port={self.puerto}, threaded=True, debug=False)")
+        self._proceso = subprocess.Popen([sys.executable, "-c", codigo], cwd=raiz, env=env,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        esperar_servidor(self.url, proceso=self._proceso)
+        return self
+
+    def __exit__(self, *exc):
+        self._proceso.terminate()
+        try:
+            self._proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._proceso.kill()
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(url: str, timeout: float = 30.0, proceso=None) -> None:
+    cliente = Cliente(url, timeout=2.0)
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso is not None and proceso.poll() is not None:
+            raise RuntimeError(f"el servidor terminó al iniciar (código {proceso.returncode})")
+        try:
+            if cliente.pedir("GET", "/api/kdf/stats")[0] == 200:
+                cliente.close()
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"el servidor no respondió en {timeout:.0f} s: {url}")
+
+
+def preparar(url: str, keystore: str, passphrase: str, firmados: int, lote: int) -> dict:
+    """
+    Carga la wallet una vez (sessionId para sign) y firma un pool de transacciones
+    con sign-batch para que verify y verify_batch tengan sobres válidos y variados
+    """
+    cliente = Cliente(url)
+    status, datos = cliente.pedir("POST", "/api/wallet/load", {"keystorePath": keystore, "passphrase": passphrase})
+    if status != 200 or not datos.get("success"):
+        raise RuntimeError(f"no se pudo cargar la wallet ({status}): {datos and datos.get('error')}")
+    contexto = {
+        "keystore": keystore,
+        "passphrase": passphrase,
+        "sessionId": datos["sessionId"],
+        "address": datos["wallet"]["address"],
+        "lote": lote,
+    }
+
+    transacciones = [_tx(contexto, nonce) for nonce in range(firmados)]
+    status, datos = cliente.pedir("POST", "/api/wallet/sign-batch",
+                                  {"sessionId": contexto["sessionId"], "transactions": transacciones})
+    if status != 200 or not datos.get("success"):
+        raise RuntimeError(f"no se pudo firmar el pool de transacciones ({status})")
+    contexto["firmados"] = [r["signedTransaction"] for r in datos["results"] if r.get("success")]
+    cliente.close()
+    return contexto
+
+
+def cerrar_sesion(url: str, contexto: dict) -> None:
+    cliente = Cliente(url)
+    try:
+        cliente.pedir("POST", "/api/wallet/logout", {"sessionId": contexto["sessionId"]})
+    finally:
+        cliente.close()
+
+
+def _trabajador(url, contexto, mezcla, semilla, inicio, fin, rps, turnos, muestras):
+    rng = random.Random(semilla)
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    cliente = Cliente(url)
+    try:
+        while True:
+            if rps:
+                # Lazo abierto: cada turno global tiene su instante; se duerme hasta él
+                programado = inicio + next(turnos) / rps
+                if programado >= fin:
+                    break
+                espera = programado - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            else:
+                programado = time.perf_counter()
+                if programado >= fin:
+                    break
+
+            nombre = rng.choices(nombres, pesos)[0]
+            metodo, ruta, body = OPERACIONES[nombre](contexto, rng)
+            try:
+                status, datos = cliente.pedir(metodo, ruta, body)
+                error = None
+                if status >= 400:
+                    error = str(status)
+                elif isinstance(datos, dict) and datos.get("success") is False:
+                    error = "success=false"
+                elif isinstance(datos, dict) and datos.get("valid") is False:
+                    error = "firma_invalida"  # La carga solo usa sobres válidos
+            except (OSError, http.client.HTTPException) as e:
+                status, error = None, type(e).__name__
+            muestras.append((nombre, programado - inicio, time.perf_counter() - programado, status, error))
+    finally:
+        cliente.close()
+
+
+def resumir(muestras: list, segundos: float) -> dict:
+    """
+    Agrupa (nombre, t, latencia, status, error) por endpoint; incluye el total en "_total"
+    """
+    grupos = {}
+    for muestra in muestras:
+        grupos.setdefault(muestra[0], []).append(muestra)
+    grupos["_total"] = muestras
+
+    resumen = {}
+    for nombre, grupo in grupos.items():
+        latencias = sorted(m[2] * 1000 for m in grupo)
+        errores = {}
+        for m in grupo:
+            if m[4] is not None:
+                errores[m[4]] = errores.get(m[4], 0) + 1
+        total_errores = sum(errores.values())
+        resumen[nombre] = {
+            "solicitudes": len(grupo),
+            "errores": total_errores,
+            "tasa_error": total_errores / len(grupo) if grupo else 0.0,
+            "errores_por_tipo": errores,
+            "throughput_rps": len(grupo) / segundos if segundos > 0 else 0.0,
+            "latencia_ms": {
+                "p50": percentil(latencias, 50),
+                "p95": percentil(latencias, 95),
+                "p99": percentil(latencias, 99),
+                "max": latencias[-1] if latencias else 0.0,
+                "media": sum(latencias) / len(latencias) if latencias else 0.0,
+            },
+        }
+    return resumen
+
+
+def ejecutar(url: str, contexto: dict, mezcla: dict, concurrencia: int = 8, rps: float = 0.0,
+             duracion: float = 10.0, calentamiento: float = 0.0, semilla: int = 1234) -> dict:
+    """
+    Corre la carga y retorna el documento JSON de la corrida
+    Las solicitudes que empiezan durante el calentamiento no entran en el resumen
+    """
+    inicio = time.perf_counter()
+    fin = inicio + calentamiento + duracion
+    turnos = itertools.count()
+    por_hilo = [[] for _ in range(concurrencia)]
+    hilos = [
+        threading.Thread(target=_trabajador, daemon=True,
+                         args=(url, contexto, mezcla, semilla + i, inicio, fin, rps, turnos, por_hilo[i]))
+        for i in range(concurrencia)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    muestras = [m for lista in por_hilo for m in lista if m[1] >= calentamiento]
+    return {
+        "version": VERSION,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "url": url,
+        "parametros": {"mezcla": mezcla, "concurrencia": concurrencia, "rps": rps, "duracion": duracion,
+                       "calentamiento": calentamiento, "semilla": semilla, "lote": contexto["lote"]},
+        "endpoints": resumir(muestras, duracion),
+    }
+
+
+def comparar(base: dict, actual: dict, umbral: float = 0.10) -> list[dict]:
+    """
+    Regresión si el p95 sube o el throughput baja más que el umbral, o si aparecen más errores
+    Con --rps el throughput lo fija el objetivo, así que solo cuenta en corridas de lazo cerrado
+    """
+    lazo_cerrado = not actual["parametros"]["rps"] and not base["parametros"]["rps"]
+    filas = []
+    for nombre, ahora in actual["endpoints"].items():
+        antes = base["endpoints"].get(nombre)
+        if antes is None:
+            filas.append({"endpoint": nombre, "estado": "nuevo"})
+            continue
+        p95_antes, p95_ahora = antes["latencia_ms"]["p95"], ahora["latencia_ms"]["p95"]
+        rps_antes, rps_ahora = antes["throughput_rps"], ahora["throughput_rps"]
+        cambio_p95 = p95_ahora / p95_antes - 1 if p95_antes else 0.0
+        cambio_rps = rps_ahora / rps_antes - 1 if rps_antes else 0.0
+        regresion = (cambio_p95 > umbral or (lazo_cerrado and cambio_rps < -umbral)
+                     or ahora["tasa_error"] > antes["tasa_error"] + 0.01)
+        filas.append({"endpoint": nombre, "estado": "regresion" if regresion else "ok",
+                      "p95_ms": [p95_antes, p95_ahora], "cambio_p95": cambio_p95,
+                      "throughput_rps": [rps_antes, rps_ahora], "cambio_throughput": cambio_rps,
+                      "tasa_error": [antes["tasa_error"], ahora["tasa_error"]]})
+    return filas
+
+
+def _imprimir(documento: dict) -> None:
+    p = documento["parametros"]
+    print(f"{documento['url']}  concurrencia={p['concurrencia']}  rps={p['rps'] or 'máximo'}  "
+          f"duración={p['duracion']}s")
+    print(f"{'endpoint':14s} {'solic.':>8s} {'rps':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errores':>9s}")
+    for nombre, r in sorted(documento["endpoints"].items(), key=lambda par: par[0] == "_total"):
+        lat = r["latencia_ms"]
+        print(f"{nombre.lstrip('_'):14s} {r['solicitudes']:8d} {r['throughput_rps']:9.1f} {lat['p50']:9.2f} "
+              f"{lat['p95']:9.2f} {lat['p99']:9.2f} {r['tasa_error']:8.1%}")
+        if r["errores_por_tipo"] and nombre != "_total":
+            print(f"{'':14s} errores: {r['errores_por_tipo']}")
+
+
+def _imprimir_comparacion(filas: list[dict], umbral: float) -> None:
+    print(f"\nComparación contra la corrida base (umbral {umbral:.0%}):")
+    for fila in filas:
+        if fila["estado"] == "nuevo":
+            print(f"{fila['endpoint'].lstrip('_'):14s} nuevo")
+            continue
+        marca = "  <-- REGRESIÓN" if fila["estado"] == "regresion" else ""
+        print(f"{fila['endpoint'].lstrip('_'):14s} p95 {fila['p95_ms'][0]:8.2f} -> {fila['p95_ms'][1]:8.2f} ms "
+              f"({fila['cambio_p95']:+.1%})  rps {fila['throughput_rps'][0]:8.1f} -> "
+              f"{fila['throughput_rps'][1]:8.1f} ({fila['cambio_throughput']:+.1%}){marca}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    destino = parser.add_mutually_exclusive_group()
+    destino.add_argument("--url", default="http://127.0.0.1:5000", help="servidor ya levantado")
+    destino.add_argument("--iniciar", action="store_true", help="levanta api_server en un puerto libre")
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO, help="pesos por operación (nombre=peso,...)")
+    parser.add_argument("--concurrencia", type=int, default=8, help="clientes simultáneos")
+    parser.add_argument("--rps", type=float, default=0.0, help="solicitudes por segundo objetivo (0 = lazo cerrado)")
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos medidos")
+    parser.add_argument("--calentamiento", type=float, default=2.0, help="segundos iniciales que no se cuentan")
+    parser.add_argument("--lote", type=int, default=16, help="transacciones por sign_batch/verify_batch")
+    parser.add_argument("--firmados", type=int, default=256, help="sobres distintos para verify")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--keystore", default=None,
+                        help="keystore visible para el servidor (por defecto se crea uno temporal)")
+    parser.add_argument("--passphrase", default=PASSPHRASE)
+    parser.add_argument("--guardar", type=Path, default=None, help="directorio donde guardar la corrida")
+    parser.add_argument("--comparar", type=Path, default=None, help="corrida guardada contra la que comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="empeoramiento tolerado (0.10 = 10%%)")
+    parser.add_argument("--json", action="store_true", help="imprime la corrida en JSON")
+    args = parser.parse_args()
+
+    mezcla = parsear_mezcla(args.mezcla)
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        keystore = args.keystore
+        if keystore is None:
+            keystore = str(Path(tmp) / "wallet.json")
+            crear_keystore(keystore, args.passphrase, kdf_params=KDF_CARGA)
+
+        with ServidorLocal(directorio=tmp) if args.iniciar else contextlib.nullcontext() as servidor:
+            url = servidor.url if servidor else args.url
+            esperar_servidor(url, timeout=5.0)
+            contexto = preparar(url, keystore, args.passphrase, args.firmados, args.lote)
+            try:
+                documento = ejecutar(url, contexto, mezcla, args.concurrencia, args.rps, args.duracion,
+                                     args.calentamiento, args.semilla)
+            finally:
+                cerrar_sesion(url, contexto)
+
+    if args.guardar is not None:
+        args.guardar.mkdir(parents=True, exist_ok=True)
+        ruta = args.guardar / f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        ruta.write_text(json.dumps(documento, indent=2), encoding="utf-8")
+        print(f"Corrida guardada en {ruta}", file=sys.stderr)
+
+    filas = None
+    if args.comparar is not None:
+        base = json.loads(args.comparar.read_text(encoding="utf-8"))
+        distintos = [k for k in ("mezcla", "concurrencia", "rps", "lote")
+                     if base["parametros"].get(k) != documento["parametros"].get(k)]
+        if distintos:
+            print(f"Aviso: la corrida base usó otros parámetros ({', '.join(distintos)})", file=sys.stderr)
+        filas = comparar(base, documento, args.umbral)
+
+    if args.json:
+        if filas is not None:
+            documento = {**documento, "comparacion": filas}
+        print(json.dumps(documento, indent=2))
+    else:
+        _imprimir(documento)
+        if filas is not None:
+            _imprimir_comparacion(filas, args.umbral)
+
+    return 1 if filas and any(f["estado"] == "regresion" for f in filas) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
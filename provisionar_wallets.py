@@ -0,0 +1,62 @@
+"""
+Aprovisionamiento masivo de wallets
+Crea N keystores en paralelo y escribe un manifiesto (address -> path -> pubkey)
+"""
+
+import argparse
+import getpass
+import os
+import sys
+import time
+
+from almallave import crear_keystores_lote
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea muchos keystores en paralelo")
+    parser.add_argument("n", type=int, help="número de wallets a crear")
+    parser.add_argument("--directorio", default="wallets",
+                        help="carpeta destino de los keystores y el manifiesto")
+    parser.add_argument("--passphrase-env", metavar="VARIABLE",
+                        help="toma la passphrase (la misma para todas) de una variable de entorno")
+    parser.add_argument("--passphrase-file", metavar="ARCHIVO",
+                        help="archivo con una passphrase por línea (una por wallet)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="procesos en paralelo (por defecto núcleos / parallelism del perfil KDF)")
+    parser.add_argument("--memoria-max-mib", type=int, default=None,
+                        help="memoria máxima total para derivaciones Argon2 simultáneas "
+                             "(por defecto KDF_MEMORY_BUDGET_KIB)")
+    parser.add_argument("--manifiesto", default="manifest.json",
+                        help="nombre del manifiesto dentro del directorio")
+    args = parser.parse_args()
+
+    if args.passphrase_file:
+        with open(args.passphrase_file, "r", encoding="utf-8") as f:
+            fuente = [linea.rstrip("\n") for linea in f if linea.strip()]
+    elif args.passphrase_env:
+        fuente = os.environ.get(args.passphrase_env)
+        if not fuente:
+            sys.exit(f"La variable {args.passphrase_env} no está definida")
+    else:
+        fuente = getpass.getpass("Passphrase para todas las wallets: ")
+
+    if isinstance(fuente, str) and len(fuente) < 8:
+        sys.exit("La passphrase debe tener al menos 8 caracteres")
+
+    inicio = time.perf_counter()
+    entradas = crear_keystores_lote(
+        args.n,
+        args.directorio,
+        fuente,
+        workers=args.workers,
+        memoria_max_kib=args.memoria_max_mib * 1024 if args.memoria_max_mib else None,
+        manifiesto=args.manifiesto
+    )
+    duracion = time.perf_counter() - inicio
+    print(f"{len(entradas)} wallets creadas en {duracion:.1f} s "
+          f"({len(entradas) / duracion:.1f} wallets/s)")
+    print(f"Manifiesto: {os.path.join(args.directorio, args.manifiesto)}")
+
+
+if __name__ == "__main__":
+    main()
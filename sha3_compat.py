@@ -5,24 +5,29 @@ Usa pycryptodome en su lugar
 
 from Crypto.Hash import keccak
 
-def keccak_256(data=b''):
+
+class Keccak256Wrapper:
     """
-    Crea un objeto keccak_256 compatible con pysha3
+    Objeto keccak_256 con la misma interfaz que el de pysha3
+    (la clase se define una sola vez, no en cada llamada)
     """
-    class Keccak256Wrapper:
-        def __init__(self):
-            self._hash = keccak.new(digest_bits=256)
+    __slots__ = ("_hash",)
+
+    def __init__(self, data=b''):
+        self._hash = keccak.new(data=data, digest_bits=256) if data else keccak.new(digest_bits=256)
+
+    def update(self, data):
+        self._hash.update(data)
 
-        def update(self, data):
-            self._hash.update(data)
+    def digest(self):
+        return self._hash.digest()
 
-        def digest(self):
-            return self._hash.digest()
+    def hexdigest(self):
+        return self._hash.hexdigest()
 
-        def hexdigest(self):
-            return self._hash.hexdigest()
 
-    wrapper = Keccak256Wrapper()
-    if data:
-        wrapper.update(data)
-    return wrapper
+def keccak_256(data=b''):
+    """
+    Crea un objeto keccak_256 compatible con pysha3
+    """
+    return Keccak256Wrapper(data)
@@ -1,12 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import argparse
+import contextlib
 import json
+import math
+import os
+import queue
 import shutil
-from verifier import verificar_firma, NonceStore
+import threading
+import time
+from verifier import verificar_sin_nonce, aplicar_nonce, NonceStore
+from bundles import EXTENSION as EXTENSION_BUNDLE, EscritorBundle, leer_bundle, rangos_bundle, ruta_indice
+from indice_tx import IndiceTransacciones, registro_desde_sobre
+from app.profiling import Perfilador
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None  # Sin watchdog se usa sondeo del directorio
+    FileSystemEventHandler = object
 
 INBOX_DIR = Path("inbox") 
 OUTBOX_DIR = Path("outbox") #
 VERIFIED_DIR = Path("verified")
 NONCES_FILE = Path("nonces.json")  
+INDICE_FILE = Path("verified_index.sqlite3") # Índice de transacciones verificadas
 
 
 def asegurar_carpetas() -> None:
@@ -17,42 +36,403 @@ def asegurar_carpetas() -> None:
         else:
             (f"Ya existe {carpeta}")
 
+# Extensiones de sobres: JSON (legible) y binario compacto (app/binary_envelope.py)
+EXTENSIONES = (".json", ".bin")
+
+# Bundles JSON Lines (bundles.py): muchos sobres por archivo, se procesan por bloques de bytes
+SUFIJOS_SALIDA_BUNDLE = (".invalid.jsonl", ".badjson.jsonl")
+BLOQUE_BUNDLE = 8 * 1024 * 1024 # Bytes por bloque: acota la memoria con bundles enormes
+
+def _sobres(carpeta: Path) -> list[Path]:
+    return sorted(p for ext in EXTENSIONES for p in carpeta.glob(f"*{ext}"))
+
+def _bundles(carpeta: Path) -> list[Path]:
+    return sorted(p for p in carpeta.glob(f"*{EXTENSION_BUNDLE}") if _es_pendiente(p))
+
+def _entregar(archivo: Path) -> Path:
+    destino = INBOX_DIR / archivo.name
+    indice = ruta_indice(archivo)
+    if archivo.suffix == EXTENSION_BUNDLE and indice.exists(): # El índice viaja con su bundle
+        shutil.move(indice, ruta_indice(destino))
+    shutil.move(archivo, destino)
+    print(f"Entregado a inbox: {archivo.name}")
+    return destino
+
 def simular_entrega_desde_outbox() -> None:
     asegurar_carpetas()
-    for archivo in OUTBOX_DIR.glob("*.json"):
-        destino = INBOX_DIR / archivo.name
-        shutil.move(archivo, destino)
-        print(f"Entregado a inbox: {archivo.name}")
+    for archivo in _sobres(OUTBOX_DIR) + _bundles(OUTBOX_DIR):
+        _entregar(archivo)
+
+def _leer_y_verificar(archivo: Path):
+    # Etapa sin estado (lectura, parseo, canonicalización y firma); puede correr en otro proceso
+    try:
+        if archivo.suffix == ".bin": # Sobre binario: el verifier lo decodifica sin copias
+            data = archivo.read_bytes()
+        else:
+            contenido = archivo.read_text(encoding="utf-8")
+            data = json.loads(contenido)
+    except Exception as e:
+        return archivo, None, None, None, f"error al leer {e}", None
+
+    resultado, from_address, nonce_int = verificar_sin_nonce(data)
+    return archivo, resultado, from_address, nonce_int, None, _registro(resultado, data)
+
+def _registro(resultado, data):
+    # Hash y campos para el índice; se calculan en el worker junto con la firma
+    return registro_desde_sobre(data) if resultado.valido else None
+
+def _aplicar_nonces(verificaciones: list, nonce_store: NonceStore) -> list:
+    # Nonces en un solo hilo: cada remitente se procesa en orden ascendente de nonce,
+    # sin importar el orden de llegada. verificaciones: [(resultado, from_address, nonce_int)]
+    resultados = [resultado for resultado, _, _ in verificaciones]
+    pendientes = [i for i, (resultado, _, _) in enumerate(verificaciones)
+                  if resultado is not None and resultado.valido]
+    pendientes.sort(key=lambda i: verificaciones[i][2])
+    with nonce_store.lote(): # Un solo fsync del journal para todo el lote
+        for i in pendientes:
+            resultado, from_address, nonce_int = verificaciones[i]
+            resultados[i] = aplicar_nonce(resultado, from_address, nonce_int, nonce_store)
+    return resultados
+
+def procesar_archivos(archivos: list[Path], nonce_store: NonceStore, workers: int = 1,
+                      pool: ProcessPoolExecutor | None = None,
+                      indice: IndiceTransacciones | None = None) -> None:
+    # 1) Lectura y verificación de firmas, en paralelo si se pidieron varios workers
+    if len(archivos) > 1 and (pool is not None or workers > 1):
+        chunksize = max(1, len(archivos) // (max(workers, 1) * 8))
+        if pool is not None:
+            etapas = list(pool.map(_leer_y_verificar, archivos, chunksize=chunksize))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                etapas = list(pool.map(_leer_y_verificar, archivos, chunksize=chunksize))
+    else:
+        etapas = [_leer_y_verificar(archivo) for archivo in archivos]
+
+    # 2) Nonces en orden ascendente por remitente, en un solo hilo
+    resultados = _aplicar_nonces([etapa[1:4] for etapa in etapas], nonce_store)
+
+    # 3) Mover cada archivo según su resultado
+    # Los nonces ya se aplicaron: un archivo que no se puede mover no detiene a los demás
+    registros = []
+    for (archivo, _, _, _, error, registro), resultado in zip(etapas, resultados):
+        try:
+            if error is not None:
+                print(f"{archivo.name}: {error}")
+                nuevo_nombre = INBOX_DIR / f"{archivo.stem}.badjson"
+                archivo.rename(nuevo_nombre)
+                continue
+
+            print(f"{archivo.name}: {resultado.as_dict()}")
+
+            if resultado.valido:
+                destino = VERIFIED_DIR / archivo.name
+                shutil.move(archivo, destino)
+                registros.append((archivo.name, None, registro))
+            else: 
+                nuevo_nombre = INBOX_DIR / f"{archivo.stem}.invalid{archivo.suffix}"
+                archivo.rename(nuevo_nombre)
+        except OSError as e:
+            print(f"{archivo.name}: no se pudo mover ({e})")
+
+    if indice is not None: # Una sola transacción del índice por lote
+        indice.agregar(registros)
+
+def _verificar_rango(tarea: tuple[Path, int, int]) -> list:
+    # Etapa sin estado sobre un rango de bytes de un bundle; el worker lo lee con su propio mmap
+    bundle, inicio, fin = tarea
+    etapas = []
+    for _, linea in leer_bundle(bundle, inicio, fin):
+        try:
+            data = json.loads(linea)
+        except ValueError as e:
+            etapas.append((None, None, None, f"error al leer {e}", None))
+            continue
+        resultado, from_address, nonce_int = verificar_sin_nonce(data)
+        etapas.append((resultado, from_address, nonce_int, None, _registro(resultado, data)))
+    return etapas
+
+def procesar_bundle(bundle: Path, nonce_store: NonceStore, workers: int = 1,
+                    pool: ProcessPoolExecutor | None = None, bloque: int = BLOQUE_BUNDLE,
+                    indice: IndiceTransacciones | None = None) -> dict:
+    # El bundle se parte en rangos de bytes (alineados a líneas); cada bloque de `workers` rangos
+    # se verifica en paralelo y sus nonces se aplican antes de pasar al siguiente, así la memoria
+    # queda acotada por el tamaño del bloque. El orden de nonce se respeta dentro de cada bloque;
+    # entre bloques manda el orden del archivo (el escritor agrega en orden de firma)
+    por_bloque = max(workers, 1)
+    tamano = bundle.stat().st_size
+    partes = math.ceil(tamano / max(bloque, 1)) * por_bloque
+    # Solo se procesan los bytes que había al empezar; si el archivo crece no se borra al terminar
+    tareas = [(bundle, inicio, min(fin, tamano)) for inicio, fin in rangos_bundle(bundle, partes) if inicio < tamano]
+    propio = None
+    if pool is None and workers > 1 and len(tareas) > 1:
+        pool = propio = ProcessPoolExecutor(max_workers=workers)
+
+    conteo = {"validos": 0, "invalidos": 0, "ilegibles": 0}
+    salidas: dict[Path, EscritorBundle] = {} # Se abren solo si hacen falta
+    def salida(destino: Path) -> EscritorBundle:
+        if destino not in salidas:
+            salidas[destino] = EscritorBundle(destino)
+        return salidas[destino]
+
+    try:
+        for i in range(0, len(tareas), por_bloque):
+            grupo = tareas[i:i + por_bloque]
+            if pool is not None and len(grupo) > 1:
+                etapas = [e for parte in pool.map(_verificar_rango, grupo) for e in parte]
+            else:
+                etapas = [e for tarea in grupo for e in _verificar_rango(tarea)]
+            resultados = _aplicar_nonces([etapa[:3] for etapa in etapas], nonce_store)
+
+            # Las líneas se vuelven a leer del mmap en el mismo orden, sin pasar por los workers
+            lineas = leer_bundle(bundle, grupo[0][1], grupo[-1][2])
+            registros = []
+            for (_, linea), etapa, resultado in zip(lineas, etapas, resultados):
+                if etapa[3] is not None:
+                    conteo["ilegibles"] += 1
+                    salida(INBOX_DIR / f"{bundle.stem}.badjson{EXTENSION_BUNDLE}").agregar(linea)
+                elif resultado.valido:
+                    conteo["validos"] += 1
+                    offset = salida(VERIFIED_DIR / bundle.name).agregar(linea)
+                    registros.append((bundle.name, offset, etapa[4]))
+                else:
+                    conteo["invalidos"] += 1
+                    salida(INBOX_DIR / f"{bundle.stem}.invalid{EXTENSION_BUNDLE}").agregar(linea)
+            if indice is not None and registros:
+                salida(VERIFIED_DIR / bundle.name).flush() # Los offsets indexados ya están en disco
+                indice.agregar(registros)
+    finally:
+        for escritor in salidas.values():
+            escritor.close()
+        if propio is not None:
+            propio.shutdown()
 
-def procesar_inbox() -> None:
+    print(f"{bundle.name}: {conteo}")
+    if bundle.stat().st_size != tamano: # Alguien siguió escribiendo: lo no leído no se borra
+        _cuarentena(bundle, RuntimeError(f"cambió de tamaño mientras se procesaba (se leyeron {tamano} bytes)"))
+        return conteo
+    bundle.unlink()
+    ruta_indice(bundle).unlink(missing_ok=True)
+    return conteo
+
+def procesar_inbox(workers: int = 1, ventana: int = 0) -> None:
     asegurar_carpetas()
-    nonce_store = NonceStore(NONCES_FILE)
-    archivos = list(INBOX_DIR.glob("*.json"))
-    if not archivos:
+    nonce_store = NonceStore(NONCES_FILE, ventana=ventana)
+    archivos = _sobres(INBOX_DIR)
+    bundles = _bundles(INBOX_DIR)
+    if not archivos and not bundles:
         print("No hay archivos para procesar en el inbox")
         return
 
-    for archivo in archivos:
+    indice = IndiceTransacciones(INDICE_FILE)
+    if archivos:
+        procesar_archivos(archivos, nonce_store, workers=workers, indice=indice)
+    for bundle in bundles:
+        procesar_bundle(bundle, nonce_store, workers=workers, indice=indice)
+    indice.close()
+    nonce_store.close() # Compacta: nonces.json queda al día al terminar la corrida
+
+# -------------------- Modo daemon (vigilancia del inbox) --------------------
+
+def _es_pendiente(archivo: Path) -> bool:
+    # Solo sobres nuevos: los .invalid.json/.invalid.bin ya fueron procesados y se quedan en el inbox
+    if archivo.suffix == EXTENSION_BUNDLE:
+        return not archivo.name.endswith(SUFIJOS_SALIDA_BUNDLE)
+    return archivo.suffix in EXTENSIONES and not archivo.name.endswith(f".invalid{archivo.suffix}")
+
+class _SondeoDirectorio:
+    # Fallback sin inotify: solo se lista la carpeta cuando cambia su mtime
+    def __init__(self, carpeta: Path) -> None:
+        self.carpeta = carpeta
+        self._mtime = None
+
+    def nuevos(self) -> list[Path]:
         try:
-            contenido = archivo.read_text(encoding="utf-8")
-            data = json.loads(contenido)
-        except Exception as e:
-            print(f"{archivo.name}: error al leer {e}")
-            nuevo_nombre = INBOX_DIR / f"{archivo.stem}.badjson"
-            archivo.rename(nuevo_nombre)
-            continue
+            mtime = os.stat(self.carpeta).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if mtime == self._mtime:
+            return []
+        self._mtime = mtime
+        with os.scandir(self.carpeta) as entradas:
+            return [Path(e.path) for e in entradas if e.is_file()]
+
+ESPERA_ESCRITURA = 0.5 # Segundos sin eventos ni cambios de tamaño para dar por escrito un archivo
+
+def _tamano(archivo: Path) -> int | None:
+    try:
+        return archivo.stat().st_size
+    except OSError:
+        return None
+
+class _Manejador(FileSystemEventHandler):
+    # La cola recibe (archivo, listo). closed (solo inotify) y moved marcan un archivo completo;
+    # los demás backends solo emiten created/modified, así que esos esperan a que deje de cambiar
+    def __init__(self, cola: queue.Queue) -> None:
+        super().__init__()
+        self.cola = cola
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.cola.put((Path(event.src_path), True))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.cola.put((Path(event.dest_path), True))
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.cola.put((Path(event.src_path), False))
 
-        resultado = verificar_firma(data, nonce_store)
-        print(f"{archivo.name}: {resultado.as_dict()}")
+    on_modified = on_created
 
-        if resultado.valido:
-            destino = VERIFIED_DIR / archivo.name
-            shutil.move(archivo, destino)
-        else: 
-            nuevo_nombre = INBOX_DIR / f"{archivo.stem}.invalid.json"
-            archivo.rename(nuevo_nombre)
+def _iniciar_observador(carpetas: list[Path], cola: queue.Queue):
+    # Con watchdog (inotify/FSEvents/ReadDirectoryChangesW) los eventos llegan sin escanear carpetas
+    if Observer is None:
+        return None
+
+    observador = Observer()
+    manejador = _Manejador(cola)
+    for carpeta in carpetas:
+        observador.schedule(manejador, str(carpeta), recursive=False)
+    observador.start()
+    return observador
+
+def _cuarentena(archivo: Path, error: Exception) -> None:
+    # Un archivo que hace fallar el procesamiento se aparta como .error para que el daemon siga
+    print(f"{archivo.name}: error al procesar ({type(error).__name__}: {error}); se aparta como .error")
+    try:
+        archivo.rename(archivo.with_name(archivo.name + ".error"))
+    except OSError:
+        pass
+
+def _procesar_sueltos(sueltos: list[Path], nonce_store: NonceStore, workers: int, pool, indice) -> None:
+    try:
+        procesar_archivos(sueltos, nonce_store, workers=workers, pool=pool, indice=indice)
+    except Exception as e:
+        if len(sueltos) == 1:
+            _cuarentena(sueltos[0], e)
+            return
+        # Se reintenta uno por uno lo que siga en el inbox para encontrar al culpable
+        print(f"Error en un lote de {len(sueltos)} archivos ({type(e).__name__}: {e}); se reintenta uno por uno")
+        for archivo in sueltos:
+            if archivo.exists():
+                _procesar_sueltos([archivo], nonce_store, workers=1, pool=None, indice=indice)
+
+def vigilar_inbox(workers: int = 1, ventana: int = 0, intervalo: float = 0.2,
+                  detener: threading.Event | None = None) -> None:
+    asegurar_carpetas()
+    detener = detener or threading.Event()
+    nonce_store = NonceStore(NONCES_FILE, ventana=ventana) # Se carga una sola vez y vive en memoria
+    indice = IndiceTransacciones(INDICE_FILE)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    cola: queue.Queue = queue.Queue()
+    observador = _iniciar_observador([INBOX_DIR, OUTBOX_DIR], cola)
+    sondeos = [] if observador is not None else [_SondeoDirectorio(OUTBOX_DIR), _SondeoDirectorio(INBOX_DIR)]
+
+    esperando: dict[Path, tuple[float, int | None]] = {} # Archivo -> (último evento o cambio, tamaño visto)
+
+    # Lo que ya estaba antes de arrancar: los bundles están sellados; un sobre suelto podría seguir
+    # escribiéndose, así que pasa por la misma espera que created/modified
+    for archivo in _sobres(OUTBOX_DIR) + _sobres(INBOX_DIR):
+        cola.put((archivo, False))
+    for bundle in _bundles(OUTBOX_DIR) + _bundles(INBOX_DIR):
+        cola.put((bundle, True))
+
+    print(f"Vigilando {OUTBOX_DIR} e {INBOX_DIR} ({'watchdog' if observador else 'sondeo'})")
+    try:
+        while not detener.is_set():
+            # El sondeo no sabe si el archivo terminó de escribirse: espera igual que created/modified
+            # (un bundle con nombre final ya está sellado)
+            for sondeo in sondeos:
+                for archivo in sondeo.nuevos():
+                    cola.put((archivo, archivo.suffix == EXTENSION_BUNDLE))
+
+            # Juntar todo lo que llegó para verificarlo como un solo lote
+            lote = []
+            eventos = []
+            try:
+                eventos.append(cola.get(timeout=intervalo))
+                while True:
+                    eventos.append(cola.get_nowait())
+            except queue.Empty:
+                pass
+            ahora = time.monotonic()
+            for archivo, listo in eventos:
+                if not listo and archivo.suffix == EXTENSION_BUNDLE:
+                    continue # Un bundle se publica sellado (rename del .part), nunca a medio escribir
+                if listo:
+                    lote.append(archivo)
+                    esperando.pop(archivo, None)
+                else: # Cada evento reinicia la espera
+                    esperando[archivo] = (ahora, _tamano(archivo))
+            for archivo, (visto, tamano) in list(esperando.items()):
+                if ahora - visto < ESPERA_ESCRITURA:
+                    continue
+                actual = _tamano(archivo)
+                if actual is None: # Ya no está (movido o borrado)
+                    del esperando[archivo]
+                elif actual != tamano: # Siguió creciendo sin avisar: se espera otro periodo
+                    esperando[archivo] = (ahora, actual)
+                else: # Ya no cambia: se da por escrito
+                    lote.append(archivo)
+                    del esperando[archivo]
+
+            entrantes = []
+            for archivo in dict.fromkeys(lote): # Sin duplicados, en orden de llegada
+                if not _es_pendiente(archivo) or not archivo.exists():
+                    continue
+                if archivo.parent == OUTBOX_DIR: # Entrega simulada: outbox -> inbox
+                    try:
+                        archivo = _entregar(archivo)
+                    except OSError as e:
+                        print(f"{archivo.name}: no se pudo entregar ({e})")
+                        continue
+                entrantes.append(archivo)
+
+            sueltos = [a for a in entrantes if a.suffix != EXTENSION_BUNDLE]
+            if sueltos:
+                _procesar_sueltos(sueltos, nonce_store, workers, pool, indice)
+            for bundle in entrantes:
+                if bundle.suffix == EXTENSION_BUNDLE:
+                    try:
+                        procesar_bundle(bundle, nonce_store, workers=workers, pool=pool, indice=indice)
+                    except Exception as e:
+                        _cuarentena(bundle, e)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if observador is not None:
+            observador.stop()
+            observador.join()
+        if pool is not None:
+            pool.shutdown()
+        indice.close()
+        nonce_store.close()
 
 
 if __name__ == "__main__":
-    simular_entrega_desde_outbox()
-    procesar_inbox()
+    parser = argparse.ArgumentParser(description="Simulador de entrega y verificación de transacciones")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="procesos para verificar el inbox (0 = uno por núcleo)")
+    parser.add_argument("--ventana", type=int, default=0,
+                        help="ventana anti-replay por dirección (0 = nonces estrictamente crecientes)")
+    parser.add_argument("--watch", action="store_true",
+                        help="modo daemon: vigila outbox/inbox y procesa cada archivo al llegar")
+    parser.add_argument("--intervalo", type=float, default=0.2,
+                        help="segundos entre sondeos cuando no hay watchdog")
+    parser.add_argument("--profile", nargs="?", const="profiles", default=None, metavar="DIR",
+                        help="perfila la corrida completa con cProfile y deja un .pstats en DIR "
+                             "(con --workers > 1 solo se perfila el proceso principal)")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+
+    # Perfil de toda la corrida (opcional); nullcontext deja la lista de rutas vacía
+    perfil = Perfilador(args.profile).perfilar("simulator") if args.profile else contextlib.nullcontext([])
+    with perfil as rutas:
+        if args.watch:
+            vigilar_inbox(workers=workers, ventana=args.ventana, intervalo=args.intervalo)
+        else:
+            simular_entrega_desde_outbox()
+            procesar_inbox(workers=workers, ventana=args.ventana)
+    for ruta in rutas:
+        print(f"Perfil guardado en {ruta} (python -m pstats {ruta})")
@@ -1,5 +1,6 @@
 """
 Script de prueba para demostrar el flujo completo de firma y verificación
+Es una sola pasada secuencial; para medir la API con muchos clientes usar loadtest.py
 """
 
 import requests
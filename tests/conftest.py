@@ -0,0 +1,36 @@
+import base64
+from pathlib import Path
+import sys
+
+import pytest
+
+Directorios = Path(__file__).resolve().parents[1]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from verifier import address_from_public_key, canonical_json_bytes
+
+LLAVE = ed25519.Ed25519PrivateKey.from_private_bytes(b"\x01" * 32)
+
+
+def _tx_firmado(nonce: int = 0, from_address: str | None = None) -> dict:
+    public_key_bytes = LLAVE.public_key().public_bytes_raw()
+    tx = {
+        "from_address": from_address or address_from_public_key(public_key_bytes),
+        "to": "0xDESTINO123",
+        "value": "100",
+        "nonce": str(nonce),
+        "timestamp": 1234567890,
+    }
+    return {
+        "tx": tx,
+        "sig_scheme": "ed25519",
+        "signature_b64": base64.b64encode(LLAVE.sign(canonical_json_bytes(tx))).decode("utf-8"),
+        "public_key_b64": base64.b64encode(public_key_bytes).decode("utf-8"),
+    }
+
+
+@pytest.fixture
+def tx_firmado():
+    # Fábrica de sobres ed25519 válidos: tx_firmado(nonce, from_address=None)
+    return _tx_firmado
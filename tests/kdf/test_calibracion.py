@@ -0,0 +1,25 @@
+import almallave
+from almallave import calibrar_argon2, cargar_perfil_kdf, guardar_perfil_kdf, crear_keystore
+
+
+def test_calibracion_respeta_limites():
+    perfil = calibrar_argon2(objetivo_ms=50, memoria_max_kib=32768, lanes=2, time_cost_max=3)
+    assert 1 <= perfil["time_cost"] <= 3
+    assert perfil["memory_cost_kib"] <= 32768
+    assert perfil["parallelism"] == 2
+
+def test_perfil_por_defecto_sin_archivo(tmp_path):
+    assert cargar_perfil_kdf(str(tmp_path / "no_existe.json")) == almallave.KDF_PARAMS_POR_DEFECTO
+
+def test_crear_keystore_usa_perfil(tmp_path, monkeypatch):
+    ruta_perfil = str(tmp_path / "kdf_profile.json")
+    guardar_perfil_kdf({"time_cost": 1, "memory_cost_kib": 64, "parallelism": 2}, ruta_perfil)
+    monkeypatch.setattr(almallave, "RUTA_PERFIL_KDF", ruta_perfil)
+
+    obj = crear_keystore(str(tmp_path / "wallet.json"), "passphrase-segura")
+    assert obj["kdf_params"]["time_cost"] == 1
+    assert obj["kdf_params"]["memory_cost_kib"] == 64
+    assert obj["kdf_params"]["parallelism"] == 2
+
+    _, pub_bytes, _ = almallave.cargar_keystore(str(tmp_path / "wallet.json"), "passphrase-segura")
+    assert len(pub_bytes) == 32
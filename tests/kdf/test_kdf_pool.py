@@ -0,0 +1,182 @@
+import threading
+
+import pytest
+
+from app.kdf_pool import KdfPool, MemoriaExcedida, PoolSaturado
+from almallave import crear_keystore, cargar_keystore
+
+PARAMS_RAPIDOS = {"time_cost": 1, "memory_cost_kib": 8, "parallelism": 1}
+
+
+def test_presupuesto_limita_concurrencia():
+    pool = KdfPool(memoria_max_kib=200, max_workers=4, max_cola=8)
+    liberar = threading.Event()
+    maximo = []
+    activos = []
+    lock = threading.Lock()
+
+    def trabajo():
+        with lock:
+            activos.append(1)
+            maximo.append(len(activos))
+        liberar.wait(5)
+        with lock:
+            activos.pop()
+        return "ok"
+
+    hilos = [threading.Thread(target=pool.ejecutar, args=(100, trabajo)) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    liberar.set()
+    for h in hilos:
+        h.join()
+
+    assert max(maximo) <= 2
+    assert pool.stats()["completed"] == 4
+    assert pool.stats()["memory_in_use_kib"] == 0
+    pool.shutdown()
+
+def test_cola_llena_rechaza_con_retry_after():
+    pool = KdfPool(memoria_max_kib=100, max_workers=1, max_cola=0, retry_after=3)
+    liberar = threading.Event()
+    hilo = threading.Thread(target=pool.ejecutar, args=(100, liberar.wait, 5))
+    hilo.start()
+    while pool.stats()["running"] == 0:
+        pass
+
+    with pytest.raises(PoolSaturado) as exc:
+        pool.ejecutar(100, lambda: None)
+    assert exc.value.retry_after == 3
+    assert pool.stats()["rejected"] == 1
+
+    liberar.set()
+    hilo.join()
+    pool.shutdown()
+
+def test_trabajo_mayor_al_presupuesto_se_rechaza():
+    pool = KdfPool(memoria_max_kib=100, max_workers=1)
+    with pytest.raises(MemoriaExcedida):
+        pool.ejecutar(101, lambda: None)  # Aunque el pool esté vacío
+    assert pool.stats()["rejected"] == 1
+    assert pool.ejecutar(100, lambda: "ok") == "ok"
+    pool.shutdown()
+
+def test_admitidos_no_superan_los_hilos():
+    pool = KdfPool(memoria_max_kib=1000, max_workers=2, max_cola=8)
+    liberar = threading.Event()
+    hilos = [threading.Thread(target=pool.ejecutar, args=(10, liberar.wait, 5)) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    while pool.stats()["queue_depth"] < 2:
+        pass
+
+    assert pool.stats()["running"] == 2  # Los otros dos esperan en la cola del pool, no en el ejecutor
+    liberar.set()
+    for h in hilos:
+        h.join()
+    assert pool.stats()["completed"] == 4
+    pool.shutdown()
+
+def test_keystore_con_ejecutor(tmp_path):
+    pool = KdfPool(memoria_max_kib=64)
+    ruta = str(tmp_path / "wallet.json")
+    obj = crear_keystore(ruta, "passphrase-segura", kdf_params=PARAMS_RAPIDOS, ejecutor_kdf=pool)
+    _, pub_bytes, _ = cargar_keystore(ruta, "passphrase-segura", ejecutor_kdf=pool)
+
+    assert obj["pubkey_b64"]
+    assert len(pub_bytes) == 32
+    assert pool.stats()["completed"] == 2
+    pool.shutdown()
+
+def test_crear_desbloqueado_una_sola_derivacion(tmp_path):
+    from almallave import crear_keystore_desbloqueado, derivar_direccion_keccak
+
+    pool = KdfPool(memoria_max_kib=64)
+    ruta = str(tmp_path / "wallet.json")
+    priv, pub_bytes, direccion, obj = crear_keystore_desbloqueado(
+        ruta, "passphrase-segura", kdf_params=PARAMS_RAPIDOS, ejecutor_kdf=pool
+    )
+    assert pool.stats()["completed"] == 1
+    assert direccion == derivar_direccion_keccak(pub_bytes)
+
+    # El keystore escrito se abre con la misma llave
+    priv_cargada, pub_cargada, _ = cargar_keystore(ruta, "passphrase-segura")
+    assert pub_cargada == pub_bytes
+    assert priv_cargada.sign(b"m") == priv.sign(b"m")
+    pool.shutdown()
+
+def test_crear_keystores_lote(tmp_path):
+    import json
+    from almallave import crear_keystores_lote
+
+    directorio = tmp_path / "wallets"
+    entradas = crear_keystores_lote(
+        3, str(directorio), lambda i: f"passphrase-{i}",
+        workers=2, memoria_max_kib=16, kdf_params=PARAMS_RAPIDOS
+    )
+
+    manifiesto = json.loads((directorio / "manifest.json").read_text(encoding="utf-8"))
+    assert manifiesto == entradas
+    assert len({e["address"] for e in entradas}) == 3
+    for i, entrada in enumerate(entradas):
+        _, pub_bytes, obj = cargar_keystore(entrada["path"], f"passphrase-{i}")
+        assert obj["pubkey_b64"] == entrada["pubkey_b64"]
+    assert not list(directorio.glob(".tmp-*"))
+
+
+def test_lote_por_defecto_respeta_presupuesto_y_lanes(tmp_path, monkeypatch):
+    import almallave
+
+    monkeypatch.setattr(almallave.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(almallave, "KDF_PRESUPUESTO_MEMORIA_KIB", 4 * 131072)
+    perfil = {"time_cost": 2, "memory_cost_kib": 131072, "parallelism": 1}
+    assert almallave._workers_lote(100, None, None, perfil) == 4 # Presupuesto / memory_cost
+    assert almallave._workers_lote(100, None, None, dict(perfil, memory_cost_kib=8, parallelism=4)) == 4
+    assert almallave._workers_lote(100, None, None, dict(perfil, memory_cost_kib=1 << 30)) == 1
+    assert almallave._workers_lote(2, None, None, dict(perfil, memory_cost_kib=8)) == 2
+
+    # Sin workers ni memoria_max_kib el pool se dimensiona con esos mismos límites
+    tamanos = []
+
+    class PoolFalso:
+        def __init__(self, max_workers):
+            tamanos.append(max_workers)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def map(self, funcion, tareas):
+            return map(funcion, tareas)
+
+    monkeypatch.setattr(almallave, "ProcessPoolExecutor", PoolFalso)
+    monkeypatch.setattr(almallave, "KDF_PRESUPUESTO_MEMORIA_KIB", 16) # Caben dos derivaciones de 8 KiB
+    entradas = almallave.crear_keystores_lote(3, str(tmp_path), "passphrase-segura", kdf_params=PARAMS_RAPIDOS)
+    assert tamanos == [2] and len(entradas) == 3
+
+
+def test_observador_recibe_duracion_y_espera():
+    observadas = []
+    pool = KdfPool(memoria_max_kib=100, max_workers=1, observador=lambda d, e: observadas.append((d, e)))
+    try:
+        assert pool.ejecutar(10, lambda: 42) == 42
+    finally:
+        pool.shutdown()
+    assert len(observadas) == 1 and all(v >= 0 for v in observadas[0])
+
+
+def test_crear_wallet_por_encima_del_presupuesto(tmp_path, monkeypatch):
+    monkeypatch.setenv("TX_INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    import api_server
+
+    pool = KdfPool(memoria_max_kib=16, max_workers=1)
+    monkeypatch.setattr(api_server, "kdf_pool", pool)
+    try:
+        respuesta = api_server.app.test_client().post("/api/wallet/create", json={
+            "keystorePath": str(tmp_path / "wallet.json"), "passphrase": "passphrase-segura"})
+    finally:
+        pool.shutdown()
+    assert respuesta.status_code == 400 and not respuesta.get_json()["success"]
+    assert not (tmp_path / "wallet.json").exists()
@@ -0,0 +1,22 @@
+import pytest
+
+from almallave import cargar_keystore, crear_keystore, derivar_direccion_keccak
+from vanity import buscar_vanity, normalizar_patron
+
+
+def test_normalizar_patron():
+    assert normalizar_patron("0xAB") == "ab"
+    with pytest.raises(ValueError):
+        normalizar_patron("xyz")
+
+def test_busqueda_y_keystore(tmp_path):
+    llave, pub, direccion, intentos = buscar_vanity("a", "", workers=2, lote=64, intervalo=0.05)
+    assert direccion.startswith("0xa")
+    assert direccion == derivar_direccion_keccak(pub)
+    assert intentos > 0
+
+    ruta = str(tmp_path / "vanity.json")
+    crear_keystore(ruta, "passphrase-segura", llave_privada=llave,
+                   kdf_params={"time_cost": 1, "memory_cost_kib": 8, "parallelism": 1})
+    _, pub_cargada, _ = cargar_keystore(ruta, "passphrase-segura")
+    assert pub_cargada == pub
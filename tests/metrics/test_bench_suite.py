@@ -0,0 +1,36 @@
+from pathlib import Path
+import random
+import sys
+
+Directorios = Path(__file__).resolve().parents[2]
+for ruta in (Directorios, Directorios / "benchmarks"):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+import bench_suite
+
+
+def _documento(medianas: dict) -> dict:
+    return {"resultados": {nombre: {"us_por_op": {"mediana": us}} for nombre, us in medianas.items()}}
+
+
+def test_comparar_marca_regresiones_y_mejoras():
+    base = _documento({"a": 100.0, "b": 100.0, "c": 100.0, "viejo": 1.0})
+    actual = _documento({"a": 125.0, "b": 80.0, "c": 105.0, "nuevo": 1.0})
+
+    estados = {f["caso"]: f["estado"] for f in bench_suite.comparar(base, actual, umbral=0.10)}
+    assert estados == {"a": "regresion", "b": "mejora", "c": "igual", "nuevo": "nuevo", "viejo": "ausente"}
+
+
+def test_suite_reproducible():
+    # Misma semilla, mismos datos: las transacciones y firmas generadas son idénticas
+    primero = bench_suite._sobres(random.Random("1234:x"), 4)
+    segundo = bench_suite._sobres(random.Random("1234:x"), 4)
+    assert primero == segundo
+
+    documento = bench_suite.ejecutar(["canonicalize", "update_nonce_lote"], repeticiones=2, escala="rapido")
+    assert list(documento["resultados"]) == ["canonicalize", "update_nonce_lote"]
+    assert documento["parametros"]["semilla"] == 1234
+    resultado = documento["resultados"]["canonicalize"]
+    assert resultado["operaciones"] == bench_suite.TAMANOS["rapido"]["canonicalize"]
+    assert resultado["us_por_op"]["min"] <= resultado["us_por_op"]["mediana"]
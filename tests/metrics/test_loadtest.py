@@ -0,0 +1,69 @@
+from pathlib import Path
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+
+import loadtest
+from almallave import crear_keystore
+
+
+def test_parsear_mezcla():
+    assert loadtest.parsear_mezcla("sign=4, verify=1,load=0") == {"sign": 4.0, "verify": 1.0}
+    with pytest.raises(ValueError):
+        loadtest.parsear_mezcla("borrar=1")
+    with pytest.raises(ValueError):
+        loadtest.parsear_mezcla("load=0")
+
+
+def test_percentiles_y_errores():
+    muestras = [("sign", 0.0, (i + 1) / 1000, 200, None) for i in range(100)]
+    muestras.append(("verify", 0.0, 0.5, 500, "500"))
+    resumen = loadtest.resumir(muestras, segundos=2.0)
+
+    assert resumen["sign"]["latencia_ms"]["p50"] == pytest.approx(50)
+    assert resumen["sign"]["latencia_ms"]["p99"] == pytest.approx(99)
+    assert resumen["sign"]["throughput_rps"] == 50
+    assert resumen["verify"]["tasa_error"] == 1.0
+    assert resumen["verify"]["errores_por_tipo"] == {"500": 1}
+    assert resumen["_total"]["solicitudes"] == 101
+
+
+def test_comparar_detecta_regresion_de_p95():
+    def corrida(p95, rps):
+        return {"parametros": {"rps": 0}, "endpoints": {"sign": {
+            "latencia_ms": {"p95": p95}, "throughput_rps": rps, "tasa_error": 0.0}}}
+
+    assert loadtest.comparar(corrida(10, 100), corrida(10.5, 98))[0]["estado"] == "ok"
+    assert loadtest.comparar(corrida(10, 100), corrida(15, 100))[0]["estado"] == "regresion"
+    assert loadtest.comparar(corrida(10, 100), corrida(10, 50))[0]["estado"] == "regresion"
+
+
+def test_carga_contra_servidor_en_proceso(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("TX_INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    import api_server
+
+    keystore = str(tmp_path / "wallet.json")
+    crear_keystore(keystore, loadtest.PASSPHRASE, kdf_params=loadtest.KDF_CARGA)
+    servidor = make_server("127.0.0.1", 0, api_server.app, threaded=True)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        url = f"http://127.0.0.1:{servidor.server_port}"
+        contexto = loadtest.preparar(url, keystore, loadtest.PASSPHRASE, firmados=8, lote=4)
+        mezcla = loadtest.parsear_mezcla("sign=1,verify=1,verify_batch=1")
+        documento = loadtest.ejecutar(url, contexto, mezcla, concurrencia=2, duracion=0.5)
+        loadtest.cerrar_sesion(url, contexto)
+    finally:
+        servidor.shutdown()
+        hilo.join()
+
+    total = documento["endpoints"]["_total"]
+    assert total["solicitudes"] > 0
+    assert total["errores"] == 0
+    assert set(documento["endpoints"]) <= {"sign", "verify", "verify_batch", "_total"}
@@ -0,0 +1,73 @@
+import base64
+from pathlib import Path
+import sys
+import threading
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+
+from app.metrics import Registro
+
+
+def test_formato_prometheus():
+    registro = Registro()
+    peticiones = registro.contador('http_requests_total', 'Peticiones', ('endpoint', 'status'))
+    latencia = registro.histograma('latencia_seconds', 'Latencia', ('endpoint',), buckets=(0.1, 1.0))
+    registro.medidor('sesiones', 'Sesiones activas', lambda: 3)
+
+    peticiones.inc('verify', 200)
+    peticiones.inc('verify', 200, cantidad=2)
+    peticiones.inc('dice "hola"', 500)
+    for valor in (0.05, 0.1, 0.5, 7):
+        latencia.observe(valor, 'verify')
+
+    texto = registro.exponer()
+    assert '# TYPE http_requests_total counter' in texto
+    assert 'http_requests_total{endpoint="verify",status="200"} 3' in texto
+    assert 'http_requests_total{endpoint="dice \\"hola\\"",status="500"} 1' in texto
+    assert 'latencia_seconds_bucket{endpoint="verify",le="0.1"} 2' in texto
+    assert 'latencia_seconds_bucket{endpoint="verify",le="1"} 3' in texto
+    assert 'latencia_seconds_bucket{endpoint="verify",le="+Inf"} 4' in texto
+    assert 'latencia_seconds_count{endpoint="verify"} 4' in texto
+    assert 'latencia_seconds_sum{endpoint="verify"} 7.65' in texto
+    assert 'sesiones 3' in texto
+
+
+def test_contador_concurrente_no_pierde_incrementos():
+    contador = Registro().contador('n_total', 'n', ('hilo',))
+
+    def trabajo():
+        for _ in range(10000):
+            contador.inc('x')
+
+    hilos = [threading.Thread(target=trabajo) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert contador.valor('x') == 80000
+
+
+def test_endpoint_metrics(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv('TX_INDEX_PATH', str(tmp_path / 'index.sqlite3'))
+    import api_server
+
+    cliente = api_server.app.test_client()
+    sobre = {
+        'fromAddress': '0x' + 'aa' * 20,
+        'originalMessage': '{"from_address": "0x' + 'aa' * 20 + '", "to": "0xbb", "value": "1", "nonce": "0", "timestamp": 1}',
+        'signature': base64.b64encode(b'x' * 64).decode(),
+        'publicKey': base64.b64encode(b'y' * 32).decode(),
+    }
+    assert cliente.post('/api/signature/verify', json=sobre).status_code == 200
+
+    respuesta = cliente.get('/api/metrics')
+    assert respuesta.status_code == 200
+    assert respuesta.content_type.startswith('text/plain; version=0.0.4')
+    texto = respuesta.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="verify_signature",method="POST",status="200"}' in texto
+    assert 'http_request_duration_seconds_count{endpoint="verify_signature"}' in texto
+    assert 'signature_verifications_total{endpoint="verify",razon="Firma invalida"}' in texto
+    assert 'crypto_operation_duration_seconds_count{operation="verify"}' in texto
+    assert 'sessions_active 0' in texto
@@ -0,0 +1,85 @@
+from pathlib import Path
+import pstats
+import sys
+import tracemalloc
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+
+from app.cache import CacheLRU
+from app.profiling import Perfilador, iniciar_tracemalloc, instantanea_memoria
+
+
+def test_perfilar_escribe_pstats(tmp_path: Path):
+    perfilador = Perfilador(tmp_path / 'perfiles')
+    with perfilador.perfilar('prueba') as rutas:
+        sum(i * i for i in range(1000))
+
+    assert len(rutas) == 1 and rutas[0].suffix == '.pstats'
+    assert pstats.Stats(str(rutas[0])).total_calls > 0
+
+
+def test_apagado_por_defecto():
+    perfilador = Perfilador()
+    assert not perfilador.activo
+    assert not perfilador.debe_perfilar('1')
+    assert Perfilador(permitir_header=True).debe_perfilar('1')
+    assert not Perfilador(permitir_header=True).debe_perfilar('0')
+    assert Perfilador(muestreo=1.0).debe_perfilar()
+
+
+def test_header_perfila_peticion(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv('TX_INDEX_PATH', str(tmp_path / 'index.sqlite3'))
+    import api_server
+
+    monkeypatch.setattr(api_server, 'perfilador', Perfilador(tmp_path, permitir_header=True))
+    cliente = api_server.app.test_client()
+
+    assert 'X-Profile-File' not in cliente.get('/api/kdf/stats').headers
+    respuesta = cliente.get('/api/kdf/stats', headers={'X-Profile': '1'})
+    nombre = respuesta.headers['X-Profile-File']
+    assert nombre.startswith('kdf_stats-')
+    assert pstats.Stats(str(tmp_path / nombre)).total_calls > 0
+
+
+def test_instantanea_incluye_caches(tmp_path: Path):
+    iniciado = iniciar_tracemalloc()
+    try:
+        cache = CacheLRU(max_entries=100)
+        for i in range(100):
+            cache.put(i, b'x' * 256)
+        resumen = instantanea_memoria(tmp_path, limite=5)
+    finally:
+        if iniciado:
+            tracemalloc.stop()
+
+    assert Path(resumen['snapshot']).exists()
+    assert resumen['components']['caches']['blocks'] > 0
+    assert set(resumen['components']) == {'session_store', 'caches'}
+    assert len(resumen['top']) <= 5
+
+
+def test_endpoint_tracemalloc(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv('TX_INDEX_PATH', str(tmp_path / 'index.sqlite3'))
+    import api_server
+
+    cliente = api_server.app.test_client()
+    monkeypatch.setattr(api_server, 'PROFILE_DEBUG_ENDPOINTS', False)
+    assert cliente.get('/api/debug/tracemalloc').status_code == 404
+
+    monkeypatch.setattr(api_server, 'PROFILE_DEBUG_ENDPOINTS', True)
+    monkeypatch.setattr(api_server, 'PROFILE_DIR', str(tmp_path))
+    estaba = tracemalloc.is_tracing()
+    try:
+        if not estaba:
+            assert cliente.get('/api/debug/tracemalloc').status_code == 409
+            assert cliente.get('/api/debug/tracemalloc?start=1').get_json()['tracing']
+        datos = cliente.get('/api/debug/tracemalloc?limit=3').get_json()
+    finally:
+        if not estaba:
+            tracemalloc.stop()
+
+    assert datos['success']
+    assert 'session_store' in datos['snapshot']['components']
+    assert datos['snapshot']['sessions'] == 0
@@ -0,0 +1,84 @@
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from app.session_store import SessionStore
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def nueva_llave():
+    return ed25519.Ed25519PrivateKey.generate()
+
+def test_sesion_cachea_signer_y_pubkey():
+    store = SessionStore()
+    llave = nueva_llave()
+    sid = store.create(llave, address="0xabc")
+
+    sesion = store.get(sid)
+    assert sesion['address'] == "0xabc"
+    assert sesion['public_key'] == sesion['signer'].public_bytes
+    assert store.get(sid)['signer'] is sesion['signer']
+    assert store.stats()['hits'] == 2
+
+def test_expiracion_por_inactividad_y_absoluta():
+    reloj = Reloj()
+    store = SessionStore(idle_ttl=10, absolute_ttl=25, clock=reloj)
+    sid = store.create(nueva_llave())
+
+    for _ in range(2):
+        reloj.t += 9
+        assert store.get(sid) is not None  # el uso renueva el TTL de inactividad
+    reloj.t += 9
+    assert store.get(sid) is None  # pasó la vida máxima aunque se siguiera usando
+
+    otra = store.create(nueva_llave())
+    reloj.t += 11
+    assert store.get(otra) is None
+    assert store.stats()['expired'] == 2
+    assert store.stats()['misses'] == 2
+
+def test_desalojo_lru():
+    store = SessionStore(max_entries=2)
+    a = store.create(nueva_llave())
+    b = store.create(nueva_llave())
+    store.get(a)  # b queda como la menos usada
+    c = store.create(nueva_llave())
+
+    assert store.get(b) is None
+    assert store.get(a) is not None and store.get(c) is not None
+    assert len(store) == 2
+    assert store.stats()['evicted'] == 1
+
+def test_barrido_periodico():
+    reloj = Reloj()
+    store = SessionStore(idle_ttl=5, sweep_interval=30, clock=reloj)
+    for _ in range(3):
+        store.create(nueva_llave())
+    reloj.t = 31
+    store.create(nueva_llave())  # cualquier acceso dispara el barrido pendiente
+    assert len(store) == 1
+
+    reloj.t = 40
+    assert store.sweep() == 1
+    assert len(store) == 0
+
+
+def test_barrido_en_segundo_plano_sin_accesos():
+    import time
+
+    reloj = Reloj()
+    store = SessionStore(idle_ttl=5, sweep_interval=0.01, clock=reloj)
+    store.create(nueva_llave())
+    store.iniciar_barrido()
+    try:
+        reloj.t = 10  # Nadie vuelve a llamar create/get
+        limite = time.monotonic() + 2
+        while len(store) and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert len(store) == 0
+    finally:
+        store.detener_barrido()
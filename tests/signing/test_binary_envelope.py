@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from app.binary_envelope import a_json, codificar, decodificar
+from app.signer import Signer
+from app.transaction import Transaction
+
+
+def sobre_firmado():
+    priv = ed25519.Ed25519PrivateKey.from_private_bytes(b'\x03' * 32)
+    tx = Transaction("0x" + "ab" * 20, "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb", 1000, 7,
+                     timestamp="2025-12-03T23:39:58.759966Z")
+    return Signer(priv).sign_transaction(tx)
+
+def test_ida_y_vuelta_sin_perdida():
+    sobre = sobre_firmado()
+    binario = codificar(sobre)
+    assert a_json(binario) == sobre
+    assert json.dumps(a_json(binario)) == json.dumps(sobre)  # también el orden de llaves
+
+def test_formato_del_verifier_y_valores_variados():
+    sobre = {
+        "tx": {"from_address": "0x01ee133b9c05e4e6289ee1c05a83e3d9ff5f58be", "to": "0xDESTINO123",
+               "value": "007", "nonce": "0", "timestamp": 1234567890, "extra": -5,
+               "nota": "mañana", "vacío": None, "lista": [1.5, True, {"a": "b"}]},
+        "sig_scheme": "secp256k1",
+        "signature_b64": "ZHVtbXlfc2lnbmF0dXJl",
+        "public_key_b64": "ZHVtbXlwdWI=",
+    }
+    assert a_json(codificar(sobre)) == sobre
+
+def test_mas_chico_que_el_json():
+    sobre = sobre_firmado()
+    assert len(codificar(sobre)) * 2 < len(json.dumps(sobre, indent=2))
+
+def test_decodificacion_sin_copias():
+    binario = bytearray(codificar(sobre_firmado()))
+    sobre = decodificar(binario)
+    assert isinstance(sobre.signature, memoryview)
+    assert sobre.signature.obj is binario
+    assert len(sobre.signature) == 64 and len(sobre.public_key) == 32
+
+def test_errores_de_formato():
+    binario = codificar(sobre_firmado())
+    with pytest.raises(ValueError):
+        decodificar(binario[:-1])
+    with pytest.raises(ValueError):
+        decodificar(binario + b"\x00")
+    with pytest.raises(ValueError):
+        codificar({**sobre_firmado(), "otro": 1})
+    with pytest.raises(ValueError):
+        codificar({**sobre_firmado(), "sig_scheme": "rsa"})
+
+def test_verifier_acepta_ambos_formatos():
+    from keccak_backend import derivar_direccion
+    from verifier import verificar_firma
+
+    signer = Signer(ed25519.Ed25519PrivateKey.from_private_bytes(b'\x04' * 32))
+    tx = Transaction(derivar_direccion(signer.public_bytes), "0xDESTINO123", 100, 0, timestamp=1234567890)
+    sobre = signer.sign_transaction(tx)
+
+    assert verificar_firma(sobre).razon == "ok"
+    assert verificar_firma(codificar(sobre)) == verificar_firma(sobre)
+    alterado = bytearray(codificar(sobre))
+    alterado[-1] ^= 1 # Un bit del tx cambia la firma esperada
+    assert verificar_firma(alterado).razon == "Firma invalida"
+    assert verificar_firma(b"CWE\x01garbage").razon == "Formato invalido"
@@ -1,7 +1,9 @@
 import sys
 import os
 import json
-from app.canonicalizer import canonicalize
+import io
+import random
+from app.canonicalizer import canonicalize, canonicalize_tx, canonicalize_into, write_canonical
 
 def test_canonicalize_orden():
     # Caso 1: Mismos datos, diferente orden en el diccionario
@@ -25,4 +27,61 @@ def test_tipos_de_datos():
     data = {"msg": "mañana", "val": "10"}
     res = canonicalize(data)
     assert b"msg" in res
-    assert "mañana".encode('utf-8') in res
\ No newline at end of file
+    assert "mañana".encode('utf-8') in res
+
+# Pruebas diferenciales: el motor rápido debe dar exactamente los mismos bytes que canonicalize
+_ALFABETO = 'abcXYZ019 "\\/\n\t\x00\x1f\x7fñé€😀 '
+
+def _texto(rnd):
+    return ''.join(rnd.choice(_ALFABETO) for _ in range(rnd.randint(0, 12)))
+
+def _valor(rnd, profundidad=0):
+    opcion = rnd.randint(0, 9)
+    if opcion <= 3:
+        return _texto(rnd)
+    if opcion <= 5:
+        return rnd.randint(-10**30, 10**30)
+    if opcion == 6:
+        return rnd.choice([True, False, None])
+    if opcion == 7:
+        return rnd.random() * 1000
+    if opcion == 8 and profundidad < 2:
+        return {_texto(rnd): _valor(rnd, profundidad + 1) for _ in range(rnd.randint(0, 3))}
+    return [_valor(rnd, profundidad + 1) for _ in range(rnd.randint(0, 3))] if profundidad < 2 else 0
+
+def _dict_aleatorio(rnd):
+    llaves = ["from_address", "to", "value", "nonce", "gas_limit", "data_hex", "timestamp"]
+    llaves += [_texto(rnd) for _ in range(rnd.randint(0, 2))]
+    rnd.shuffle(llaves)
+    return {llave: _valor(rnd) for llave in llaves[:rnd.randint(0, len(llaves))]}
+
+def test_diferencial_aleatorio():
+    rnd = random.Random(2026)
+    for _ in range(5000):
+        data = _dict_aleatorio(rnd)
+        assert canonicalize_tx(data) == canonicalize(data), data
+
+def test_diferencial_transacciones_planas():
+    rnd = random.Random(7)
+    for _ in range(2000):
+        data = {
+            "from_address": "0x" + "%040x" % rnd.getrandbits(160),
+            "to": _texto(rnd),
+            "value": str(rnd.randint(0, 10**20)),
+            "nonce": rnd.choice([str(rnd.randint(0, 99)), rnd.randint(0, 99)]),
+            "gas_limit": "21000",
+            "data_hex": _texto(rnd),
+            "timestamp": rnd.choice([_texto(rnd), rnd.randint(0, 2**40)]),
+        }
+        assert canonicalize_tx(data) == canonicalize(data)
+
+def test_escritura_en_buffer_y_archivo():
+    data = {"b": "2", "a": 1, "c": "mañana"}
+    buffer = bytearray(b"prefijo:")
+    escritos = canonicalize_into(data, buffer)
+    assert bytes(buffer) == b"prefijo:" + canonicalize(data)
+    assert escritos == len(canonicalize(data))
+
+    archivo = io.BytesIO()
+    write_canonical(data, archivo)
+    assert archivo.getvalue() == canonicalize(data)
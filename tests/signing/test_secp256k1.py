@@ -0,0 +1,45 @@
+import hashlib
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+from app.secp256k1 import firmar_recuperable, recuperar_llave, sin_comprimir
+
+
+def llave(semilla: int):
+    priv = ec.derive_private_key(semilla, ec.SECP256K1())
+    pub = priv.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint)
+    return priv, pub
+
+
+@pytest.mark.parametrize("semilla", [1, 2, 7, 2**128 + 1, 0xC0FFEE])
+def test_recuperacion_coincide_con_la_llave(semilla: int):
+    priv, pub = llave(semilla)
+    for i in range(4):
+        mensaje = f"mensaje {i}".encode()
+        firma = firmar_recuperable(priv, mensaje)
+        assert recuperar_llave(hashlib.sha256(mensaje).digest(), firma) == pub
+
+        # La firma también es ECDSA estándar para cryptography
+        der = encode_dss_signature(int.from_bytes(firma[:32], "big"), int.from_bytes(firma[32:64], "big"))
+        priv.public_key().verify(der, mensaje, ec.ECDSA(hashes.SHA256()))
+
+
+def test_formatos_de_llave():
+    priv, pub = llave(99)
+    completa = priv.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+    assert sin_comprimir(pub) == completa[1:] == sin_comprimir(completa)
+    with pytest.raises(ValueError):
+        sin_comprimir(b"\x02" + b"\xff" * 32)
+
+
+def test_firma_alterada_recupera_otra_llave_o_falla():
+    priv, pub = llave(5)
+    firma = bytearray(firmar_recuperable(priv, b"hola"))
+    digest = hashlib.sha256(b"hola").digest()
+    firma[64] ^= 1 # Otro id de recuperación
+    assert recuperar_llave(digest, bytes(firma)) != pub
+    with pytest.raises(ValueError):
+        recuperar_llave(digest, bytes(firma[:64]))
@@ -54,4 +54,46 @@ def test_golden_vector_ed25519():
     # EL GOLDEN VECTOR FINAL:
     firma_esperada = "FjXfomBjPv/KEOu+/rsOqKsf7ldaKrCvw3r2zFN8jejPWkBX0G6og3CQ3afT5h1k8a2wbpFf6kgQorHOnzcmCg=="
     
-    assert resultado["signature_b64"] == firma_esperada
\ No newline at end of file
+    assert resultado["signature_b64"] == firma_esperada
+
+def test_sign_batch_igual_a_firma_individual():
+    # Ed25519 es determinista: el lote debe producir exactamente las mismas firmas
+    priv = ed25519.Ed25519PrivateKey.from_private_bytes(b'\x01' * 32)
+    signer = Signer(priv)
+
+    txs = [
+        Transaction("0xAlice", "0xBob", 10 * i, i, timestamp="2025-01-01T00:00:00Z")
+        for i in range(5)
+    ]
+    lote = signer.sign_batch(txs)
+
+    assert len(lote) == len(txs)
+    for tx, firmado in zip(txs, lote):
+        assert firmado == signer.sign_transaction(tx)
+
+def test_signer_secp256k1_recuperable():
+    import hashlib
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from app.secp256k1 import N, recuperar_llave
+
+    priv = ec.derive_private_key(424242, ec.SECP256K1())
+    signer = Signer(priv, incluir_pubkey=False)
+    tx = Transaction("0xabc", "0xdef", 5, 3, timestamp="2025-01-01T00:00:00Z")
+    firmado = signer.sign_transaction(tx)
+
+    assert firmado["sig_scheme"] == "secp256k1"
+    assert "pubkey_b64" not in firmado
+    firma = base64.b64decode(firmado["signature_b64"])
+    assert len(firma) == 65
+    assert int.from_bytes(firma[32:64], "big") <= N // 2 # s bajo: firma no maleable
+    digest = hashlib.sha256(tx.canonical_bytes).digest()
+    assert recuperar_llave(digest, firma) == signer.public_bytes
+    # ECDSA de OpenSSL usa k aleatorio: el lote no repite bytes, pero recupera la misma llave
+    (en_lote,) = signer.sign_batch([tx])
+    assert recuperar_llave(digest, base64.b64decode(en_lote["signature_b64"])) == signer.public_bytes
+
+def test_signer_ed25519_no_omite_pubkey():
+    import pytest
+
+    with pytest.raises(ValueError):
+        Signer(ed25519.Ed25519PrivateKey.generate(), incluir_pubkey=False)
@@ -0,0 +1,64 @@
+import sys
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from app.canonicalizer import canonicalize
+from app.signer import Signer
+from app.transaction import Transaction, calcular_tx_hash
+
+
+def tx_fija():
+    return Transaction("0xAlice", "0xBob", 1000, 5, timestamp="2025-01-01T00:00:00Z")
+
+def test_inmutable_y_sin_dict():
+    tx = tx_fija()
+    with pytest.raises(AttributeError):
+        tx.value = "1"
+    with pytest.raises(AttributeError):
+        del tx.nonce
+    assert not hasattr(tx, "__dict__")
+
+def test_pickle_y_copy_ida_y_vuelta():
+    import copy
+    import pickle
+
+    tx = tx_fija()
+    tx.canonical_bytes # Los memorizados no impiden serializarla
+    for copia in (pickle.loads(pickle.dumps(tx)), copy.copy(tx), copy.deepcopy(tx)):
+        assert isinstance(copia, Transaction)
+        assert copia.to_dict() == tx.to_dict() and copia.tx_hash == tx.tx_hash
+
+def test_from_dict_ida_y_vuelta():
+    tx = tx_fija()
+    copia = Transaction.from_dict(tx.to_dict())
+    assert copia.to_dict() == tx.to_dict()
+    assert copia.canonical_bytes == tx.canonical_bytes
+    assert Transaction.from_dict({"from": "0xA", "to": "0xB", "value": 1, "nonce": 0,
+                                  "timestamp": "t"}).sender == "0xA"
+
+def test_bytes_canonicos_y_hash_memorizados():
+    tx = tx_fija()
+    assert tx.canonical_bytes == canonicalize(tx.to_dict())
+    assert tx.canonical_bytes is tx.canonical_bytes
+    assert tx.tx_hash == calcular_tx_hash(tx.canonical_bytes)
+    assert tx.tx_hash is tx.tx_hash
+
+def test_menos_memoria_que_un_dict():
+    assert sys.getsizeof(tx_fija()) < sys.getsizeof(tx_fija().to_dict())
+
+def test_signer_y_verifier_usan_bytes_memorizados():
+    from verifier import verificar_firma
+
+    priv = ed25519.Ed25519PrivateKey.from_private_bytes(b'\x02' * 32)
+    signer = Signer(priv)
+    tx = tx_fija()
+    firmado = signer.sign_transaction(tx)
+    assert firmado == signer.sign_transaction(tx)
+
+    # El verifier acepta la Transaction tal cual, sin volver a canonicalizar
+    from keccak_backend import derivar_direccion
+    tx_propia = Transaction(derivar_direccion(signer.public_bytes), "0xBob", 1, 0, timestamp="t")
+    sobre = signer.sign_transaction(tx_propia)
+    sobre["tx"] = tx_propia
+    assert verificar_firma(sobre).razon == "ok"
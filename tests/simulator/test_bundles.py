@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+
+from bundles import (EscritorBundle, cargar_indice, indexar_bundle, leer_bundle, leer_linea,
+                     leer_sobres, rangos_bundle, ruta_indice, ruta_parcial)
+
+
+def sobres(n: int) -> list[dict]:
+    return [{"n": i, "relleno": "x" * (i % 7), "texto": "línea\nno se parte"} for i in range(n)]
+
+
+def test_escritor_y_lector_ida_y_vuelta(tmp_path: Path):
+    bundle = tmp_path / "b.jsonl"
+    with EscritorBundle(bundle) as escritor:
+        escritor.agregar_muchos(sobres(50))
+    with EscritorBundle(bundle) as escritor: # Solo-append: se agrega al final
+        escritor.agregar({"n": 50})
+
+    leidos = [sobre for _, sobre in leer_sobres(bundle)]
+    assert [s["n"] for s in leidos] == list(range(51))
+    assert leidos[:50] == sobres(50)
+
+
+def test_bundle_se_publica_al_cerrar(tmp_path: Path):
+    bundle = tmp_path / "b.jsonl"
+    with EscritorBundle(bundle, indice=True) as escritor:
+        escritor.agregar_muchos(sobres(3))
+        assert not bundle.exists() and ruta_parcial(bundle).exists()
+    assert bundle.exists() and not ruta_parcial(bundle).exists()
+    assert len(cargar_indice(bundle)) == 3
+
+    with EscritorBundle(bundle, indice=True) as escritor: # Reabrirlo lo retira del nombre final
+        assert not bundle.exists() and not ruta_indice(bundle).exists()
+        escritor.agregar({"n": 3})
+    assert len(cargar_indice(bundle)) == 4 and not ruta_indice(ruta_parcial(bundle)).exists()
+
+
+@pytest.mark.parametrize("partes", [1, 2, 3, 7, 500])
+@pytest.mark.parametrize("con_indice", [False, True])
+def test_rangos_cubren_cada_linea_una_vez(tmp_path: Path, partes: int, con_indice: bool):
+    bundle = tmp_path / "b.jsonl"
+    with EscritorBundle(bundle, indice=con_indice) as escritor:
+        escritor.agregar_muchos(sobres(100))
+
+    indice = cargar_indice(bundle)
+    assert (indice is not None) == con_indice
+    rangos = rangos_bundle(bundle, partes)
+    assert rangos[0][0] == 0 and rangos[-1][1] == bundle.stat().st_size
+    vistos = [json.loads(linea)["n"] for inicio, fin in rangos for _, linea in leer_bundle(bundle, inicio, fin)]
+    assert vistos == list(range(100))
+
+
+def test_indice_acceso_directo_y_validacion(tmp_path: Path):
+    bundle = tmp_path / "b.jsonl"
+    with EscritorBundle(bundle, indice=True) as escritor:
+        escritor.agregar_muchos(sobres(20))
+    assert list(cargar_indice(bundle)) == list(indexar_bundle(bundle))
+    assert json.loads(leer_linea(bundle, 13))["n"] == 13
+
+    # Un append sin índice deja el .idx desactualizado: se detecta y se reconstruye
+    with EscritorBundle(bundle) as escritor:
+        escritor.agregar({"n": 20})
+    assert cargar_indice(bundle) is None
+    with EscritorBundle(bundle, indice=True) as escritor:
+        escritor.agregar({"n": 21})
+    assert len(cargar_indice(bundle)) == 22
+
+
+def test_bundle_vacio_y_linea_final_sin_salto(tmp_path: Path):
+    vacio = tmp_path / "vacio.jsonl"
+    vacio.write_bytes(b"")
+    assert list(leer_bundle(vacio)) == [] and rangos_bundle(vacio, 4) == []
+
+    bundle = tmp_path / "b.jsonl"
+    bundle.write_bytes(b'{"n":0}\n\n{"n":1}')
+    assert [o for o, _ in leer_bundle(bundle)] == [0, 9]
+    assert not ruta_indice(bundle).exists()
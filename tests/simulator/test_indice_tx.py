@@ -0,0 +1,87 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+
+from indice_tx import IndiceTransacciones, registro_desde_sobre
+from app.binary_envelope import codificar
+
+
+def sobre(remitente: str, destino: str, nonce: int) -> dict:
+    return {
+        "tx": {"from_address": remitente, "to": destino, "value": "1", "nonce": str(nonce),
+               "timestamp": "2025-01-01T00:00:00Z"},
+        "sig_scheme": "ed25519",
+        "signature_b64": "ZHVtbXk=",
+        "public_key_b64": "ZHVtbXk=",
+    }
+
+
+@pytest.fixture
+def indice(tmp_path: Path):
+    indice = IndiceTransacciones(tmp_path / "index.sqlite3")
+    yield indice
+    indice.close()
+
+
+def test_registro_igual_para_json_y_binario():
+    s = sobre("0x" + "aa" * 20, "0xBB", 3)
+    registro = registro_desde_sobre(s)
+    assert registro == registro_desde_sobre(codificar(s))
+    assert registro[1:4] == ("0x" + "aa" * 20, "0xbb", 3)
+    assert registro[0].startswith("0x") and len(registro[0]) == 66
+
+
+def test_consultas_por_clave_y_paginacion(indice: IndiceTransacciones):
+    a, b, c = "0x" + "aa" * 20, "0x" + "bb" * 20, "0x" + "cc" * 20
+    registros = [("lote.jsonl", i * 100, registro_desde_sobre(sobre(a if i % 2 else b, c, i))) for i in range(25)]
+    assert indice.agregar(registros) == 25
+    assert indice.agregar(registros[:5]) == 0 # Los hashes repetidos se ignoran
+    assert len(indice) == 25
+
+    de_a, cursor = indice.buscar(from_address=a.upper().replace("0X", "0x"), limite=100)
+    assert [t["nonce"] for t in de_a] == list(range(1, 25, 2)) and cursor is None
+    assert indice.contiene(b, 4) and not indice.contiene(b, 5)
+
+    hash_7 = registros[7][2][0]
+    (tx,), _ = indice.buscar(tx_hash=hash_7)
+    assert tx["nonce"] == 7 and tx["offset"] == 700 and tx["tx"]["from_address"] == a
+
+    vistos, cursor = [], None
+    while True:
+        pagina, cursor = indice.buscar(to=c, limite=10, despues=cursor)
+        vistos += [t["nonce"] for t in pagina]
+        if cursor is None:
+            break
+    assert vistos == list(range(25))
+
+
+def test_nonce_mayor_a_64_bits(indice: IndiceTransacciones):
+    a = "0x" + "aa" * 20
+    grandes = [2 ** 64, 2 ** 63, 2 ** 256 - 1]
+    assert indice.agregar([("t.json", None, registro_desde_sobre(sobre(a, "0xcc", n))) for n in grandes]) == 3
+    assert indice.contiene(a, 2 ** 64) and not indice.contiene(a, 2 ** 64 + 1)
+    (tx,), _ = indice.buscar(nonce=2 ** 256 - 1)
+    assert tx["nonce"] == 2 ** 256 - 1
+    claves = [fila[0] for fila in indice._conexion.execute("SELECT nonce FROM transacciones ORDER BY nonce")]
+    assert [int(c) for c in claves] == sorted(grandes)
+
+
+def test_endpoint_transactions(indice: IndiceTransacciones, monkeypatch, tmp_path: Path):
+    monkeypatch.setenv("TX_INDEX_PATH", str(tmp_path / "api.sqlite3"))
+    import api_server
+
+    monkeypatch.setattr(api_server, "tx_index", indice)
+    a = "0x" + "aa" * 20
+    indice.agregar([("t.json", None, registro_desde_sobre(sobre(a, "0xcc", n))) for n in range(3)])
+    cliente = api_server.app.test_client()
+
+    respuesta = cliente.get(f"/api/transactions?from={a}&limit=2").get_json()
+    assert respuesta["success"] and [t["nonce"] for t in respuesta["transactions"]] == [0, 1]
+    siguiente = cliente.get(f"/api/transactions?from={a}&limit=2&cursor={respuesta['nextCursor']}").get_json()
+    assert [t["nonce"] for t in siguiente["transactions"]] == [2] and siguiente["nextCursor"] is None
+    assert cliente.get("/api/transactions?nonce=x").status_code == 400
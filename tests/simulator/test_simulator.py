@@ -0,0 +1,247 @@
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+import simulator
+from verifier import NonceStore
+
+
+@pytest.fixture
+def carpetas(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(simulator, "INBOX_DIR", tmp_path / "inbox")
+    monkeypatch.setattr(simulator, "OUTBOX_DIR", tmp_path / "outbox")
+    monkeypatch.setattr(simulator, "VERIFIED_DIR", tmp_path / "verified")
+    monkeypatch.setattr(simulator, "NONCES_FILE", tmp_path / "nonces.json")
+    monkeypatch.setattr(simulator, "INDICE_FILE", tmp_path / "verified_index.sqlite3")
+    simulator.asegurar_carpetas()
+    return tmp_path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_procesar_inbox_respeta_orden_de_nonce(carpetas: Path, workers: int, tx_firmado):
+    inbox = carpetas / "inbox"
+    # Los nombres llegan desordenados respecto al nonce; el nonce 1 se repite
+    for nombre, nonce in [("c", 0), ("a", 2), ("b", 1), ("d", 1)]:
+        (inbox / f"{nombre}.json").write_text(json.dumps(tx_firmado(nonce)), encoding="utf-8")
+    (inbox / "roto.json").write_text("{no es json", encoding="utf-8")
+
+    simulator.procesar_inbox(workers=workers)
+
+    verificados = sorted(p.name for p in (carpetas / "verified").iterdir())
+    assert verificados == ["a.json", "b.json", "c.json"]
+    assert (inbox / "d.invalid.json").exists()
+    assert (inbox / "roto.badjson").exists()
+    remitente = tx_firmado(0)["tx"]["from_address"]
+    assert NonceStore(carpetas / "nonces.json").last_nonce(remitente) == 2
+
+
+def _vigilar(carpetas: Path, accion, esperados: int, **kwargs) -> list[str]:
+    import threading
+    import time
+
+    detener = threading.Event()
+    hilo = threading.Thread(target=simulator.vigilar_inbox,
+                            kwargs={"intervalo": 0.02, "detener": detener, **kwargs})
+    hilo.start()
+    try:
+        accion()
+        limite = time.monotonic() + 5
+        while len(list((carpetas / "verified").iterdir())) < esperados and time.monotonic() < limite:
+            time.sleep(0.02)
+    finally:
+        detener.set()
+        hilo.join()
+    return sorted(p.name for p in (carpetas / "verified").iterdir())
+
+
+def test_vigilar_inbox_procesa_al_llegar(carpetas: Path, tx_firmado):
+    def escribir():
+        for nonce in range(3):
+            destino = carpetas / "outbox" / f"tx{nonce}.json"
+            tmp = destino.with_suffix(".tmp")
+            tmp.write_text(json.dumps(tx_firmado(nonce)), encoding="utf-8")
+            tmp.rename(destino)
+
+    assert _vigilar(carpetas, escribir, 3) == ["tx0.json", "tx1.json", "tx2.json"]
+    remitente = tx_firmado(0)["tx"]["from_address"]
+    assert NonceStore(carpetas / "nonces.json").last_nonce(remitente) == 2
+
+
+def test_sondeo_espera_a_que_termine_la_escritura(carpetas: Path, monkeypatch, tx_firmado):
+    # Sin watchdog: un archivo escrito en dos partes no se lee a medias
+    import time
+
+    monkeypatch.setattr(simulator, "Observer", None)
+
+    def escribir():
+        contenido = json.dumps(tx_firmado(0)).encode("utf-8")
+        with open(carpetas / "inbox" / "tx0.json", "wb") as archivo:
+            archivo.write(contenido[:20])
+            archivo.flush()
+            time.sleep(0.3)
+            archivo.write(contenido[20:])
+
+    assert _vigilar(carpetas, escribir, 1) == ["tx0.json"]
+    assert list((carpetas / "inbox").iterdir()) == []
+
+
+def test_manejador_sin_eventos_closed(carpetas: Path, monkeypatch, tx_firmado):
+    # Backends sin inotify: solo llegan created/modified y el archivo se toma cuando deja de cambiar
+    from types import SimpleNamespace
+
+    manejadores = []
+
+    class ObservadorFalso:
+        def schedule(self, manejador, ruta, recursive=False):
+            manejadores.append(manejador)
+
+        def start(self):
+            pass
+
+        def stop(self):
+            pass
+
+        def join(self):
+            pass
+
+    monkeypatch.setattr(simulator, "Observer", ObservadorFalso)
+    monkeypatch.setattr(simulator, "ESPERA_ESCRITURA", 0.05)
+
+    def escribir():
+        import time
+
+        while not manejadores:
+            time.sleep(0.01)
+        destino = carpetas / "inbox" / "tx0.json"
+        destino.write_text(json.dumps(tx_firmado(0)), encoding="utf-8")
+        manejadores[0].on_created(SimpleNamespace(is_directory=False, src_path=str(destino)))
+        manejadores[0].on_modified(SimpleNamespace(is_directory=False, src_path=str(destino)))
+
+    assert _vigilar(carpetas, escribir, 1) == ["tx0.json"]
+
+
+def test_vigilar_aparta_archivo_que_falla(carpetas: Path, monkeypatch, tx_firmado):
+    original = simulator._leer_y_verificar
+
+    def leer(archivo):
+        if archivo.name == "malo.json":
+            raise RuntimeError("falla inesperada")
+        return original(archivo)
+
+    monkeypatch.setattr(simulator, "_leer_y_verificar", leer)
+
+    def escribir():
+        for nombre, nonce in [("malo", 0), ("a", 1), ("b", 2)]:
+            destino = carpetas / "outbox" / f"{nombre}.json"
+            tmp = destino.with_suffix(".tmp")
+            tmp.write_text(json.dumps(tx_firmado(nonce)), encoding="utf-8")
+            tmp.rename(destino)
+
+    assert _vigilar(carpetas, escribir, 2) == ["a.json", "b.json"]
+    assert (carpetas / "inbox" / "malo.json.error").exists()
+
+
+def test_vigilar_bundle_escrito_con_pausas(carpetas: Path, tx_firmado):
+    # El bundle se escribe como .part y solo se toma al cerrarse: no se pierde ningún sobre
+    import time
+    from bundles import EscritorBundle, leer_sobres
+
+    verificado = carpetas / "verified" / "lote.jsonl"
+
+    def escribir():
+        with EscritorBundle(carpetas / "outbox" / "lote.jsonl") as escritor:
+            for nonce in range(4):
+                escritor.agregar(tx_firmado(nonce))
+                escritor.flush()
+                time.sleep(0.3)
+        limite = time.monotonic() + 5
+        while not verificado.exists() and time.monotonic() < limite:
+            time.sleep(0.02)
+
+    assert _vigilar(carpetas, escribir, 1) == ["lote.jsonl"]
+    assert [int(s["tx"]["nonce"]) for _, s in leer_sobres(verificado)] == [0, 1, 2, 3]
+    assert list((carpetas / "outbox").iterdir()) == [] and list((carpetas / "inbox").iterdir()) == []
+
+
+def test_bundle_que_crece_no_se_borra(carpetas: Path, monkeypatch, tx_firmado):
+    from bundles import EscritorBundle, leer_sobres, linea_json
+
+    bundle = carpetas / "inbox" / "lote.jsonl"
+    with EscritorBundle(bundle) as escritor:
+        escritor.agregar_muchos([tx_firmado(0), tx_firmado(1)])
+
+    original = simulator._aplicar_nonces
+
+    def aplicar_y_agregar(verificaciones, nonce_store):
+        with open(bundle, "ab") as archivo: # Un escritor que no respeta el .part
+            archivo.write(linea_json(tx_firmado(2)))
+        return original(verificaciones, nonce_store)
+
+    monkeypatch.setattr(simulator, "_aplicar_nonces", aplicar_y_agregar)
+    simulator.procesar_bundle(bundle, NonceStore(carpetas / "nonces.json"))
+
+    assert [int(s["tx"]["nonce"]) for _, s in leer_sobres(carpetas / "verified" / "lote.jsonl")] == [0, 1]
+    apartado = carpetas / "inbox" / "lote.jsonl.error"
+    assert not bundle.exists() and [int(s["tx"]["nonce"]) for _, s in leer_sobres(apartado)] == [0, 1, 2]
+
+
+def test_procesar_inbox_sobres_binarios(carpetas: Path, tx_firmado):
+    from app.binary_envelope import codificar
+
+    inbox = carpetas / "inbox"
+    (inbox / "a.bin").write_bytes(codificar(tx_firmado(0)))
+    (inbox / "b.json").write_text(json.dumps(tx_firmado(1)), encoding="utf-8")
+    (inbox / "c.bin").write_bytes(codificar(tx_firmado(1)))
+
+    simulator.procesar_inbox()
+
+    assert sorted(p.name for p in (carpetas / "verified").iterdir()) == ["a.bin", "b.json"]
+    assert (inbox / "c.invalid.bin").exists()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_procesar_inbox_bundle_por_bloques(carpetas: Path, monkeypatch, workers: int, tx_firmado):
+    from bundles import EscritorBundle, leer_sobres
+
+    monkeypatch.setattr(simulator, "BLOQUE_BUNDLE", 256) # Muchos bloques pequeños
+    with EscritorBundle(carpetas / "outbox" / "lote.jsonl", indice=True) as escritor:
+        for nonce in [0, 1, 1, 2, 3]:
+            escritor.agregar(tx_firmado(nonce))
+        escritor.agregar(b"{no es json")
+
+    simulator.simular_entrega_desde_outbox()
+    simulator.procesar_inbox(workers=workers)
+
+    verificados = [int(s["tx"]["nonce"]) for _, s in leer_sobres(carpetas / "verified" / "lote.jsonl")]
+    assert verificados == [0, 1, 2, 3]
+    assert [int(s["tx"]["nonce"]) for _, s in leer_sobres(carpetas / "inbox" / "lote.invalid.jsonl")] == [1]
+    assert (carpetas / "inbox" / "lote.badjson.jsonl").read_bytes() == b"{no es json\n"
+    assert not (carpetas / "inbox" / "lote.jsonl").exists()
+    assert not (carpetas / "inbox" / "lote.jsonl.idx").exists()
+
+
+def test_procesar_inbox_actualiza_indice(carpetas: Path, tx_firmado):
+    from bundles import EscritorBundle
+    from indice_tx import IndiceTransacciones
+
+    inbox = carpetas / "inbox"
+    (inbox / "a.json").write_text(json.dumps(tx_firmado(0)), encoding="utf-8")
+    with EscritorBundle(inbox / "lote.jsonl") as escritor:
+        escritor.agregar_muchos([tx_firmado(1), tx_firmado(1), tx_firmado(2)])
+    simulator.procesar_inbox()
+    (inbox / "b.json").write_text(json.dumps(tx_firmado(3)), encoding="utf-8")
+    simulator.procesar_inbox() # Incremental: se agrega sin reindexar lo anterior
+
+    indice = IndiceTransacciones(simulator.INDICE_FILE)
+    remitente = tx_firmado(0)["tx"]["from_address"]
+    transacciones, _ = indice.buscar(from_address=remitente)
+    assert [(t["nonce"], t["archivo"]) for t in transacciones] == [
+        (0, "a.json"), (1, "lote.jsonl"), (2, "lote.jsonl"), (3, "b.json")]
+    lote = (carpetas / "verified" / "lote.jsonl").read_bytes()
+    assert json.loads(lote[transacciones[2]["offset"]:].split(b"\n")[0])["tx"]["nonce"] == "2"
+    indice.close()
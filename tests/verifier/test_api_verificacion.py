@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+import sys
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from app.signer import Signer
+from app.transaction import Transaction
+from verifier import address_from_public_key
+
+LLAVE = ed25519.Ed25519PrivateKey.from_private_bytes(b"\x05" * 32)
+
+
+def _api(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("TX_INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    import api_server
+    return api_server
+
+
+def test_sign_batch_y_verify_batch_ida_y_vuelta(tmp_path: Path, monkeypatch):
+    api_server = _api(tmp_path, monkeypatch)
+    cliente = api_server.app.test_client()
+    direccion = address_from_public_key(LLAVE.public_key().public_bytes_raw())
+    session_id = api_server.active_wallets.create(LLAVE, address=direccion)
+    try:
+        firmados = cliente.post("/api/wallet/sign-batch", json={
+            "sessionId": session_id,
+            "transactions": [{"from": direccion, "to": "0xbb", "value": str(n), "nonce": n} for n in range(3)],
+        }).get_json()
+    finally:
+        api_server.active_wallets.remove(session_id)
+
+    # Los sobres del Signer traen pubkey_b64 y se verifican tal cual
+    sobres = [r["signedTransaction"] for r in firmados["results"]]
+    sobres.append({"tx": dict(sobres[0]["tx"], from_address=None), "sig_scheme": "ed25519"})
+    datos = cliente.post("/api/signature/verify-batch", json={"envelopes": sobres, "workers": 1}).get_json()
+
+    assert datos["success"]
+    assert [r["reason"] for r in datos["results"]] == ["ok", "ok", "ok", "Formato invalido"]
+
+
+def test_verify_batch_workers_no_entero(tmp_path: Path, monkeypatch):
+    api_server = _api(tmp_path, monkeypatch)
+    respuesta = api_server.app.test_client().post("/api/signature/verify-batch",
+                                                  json={"envelopes": [{}], "workers": "muchos"})
+    assert respuesta.status_code == 400
+
+
+def test_verify_acepta_sig_scheme_y_llave_recuperable(tmp_path: Path, monkeypatch):
+    cliente = _api(tmp_path, monkeypatch).app.test_client()
+    llave = ec.derive_private_key(777, ec.SECP256K1())
+    direccion = address_from_public_key(Signer(llave).public_bytes, "secp256k1")
+    tx = Transaction(direccion, "0x" + "bb" * 20, 5, 1)
+
+    for incluir_pubkey in (True, False):
+        sobre = Signer(llave, incluir_pubkey=incluir_pubkey).sign_transaction(tx)
+        cuerpo = {"fromAddress": direccion, "originalMessage": json.dumps(sobre["tx"]),
+                  "signature": sobre["signature_b64"], "sigScheme": "secp256k1"}
+        if incluir_pubkey:
+            cuerpo["publicKey"] = sobre["pubkey_b64"]
+        datos = cliente.post("/api/signature/verify", json=cuerpo).get_json()
+        assert datos["success"] and datos["valid"], datos
+
+    # ed25519 (el esquema por defecto) sigue exigiendo la llave pública
+    cuerpo.pop("sigScheme")
+    assert cliente.post("/api/signature/verify", json=cuerpo).status_code == 400
+    cuerpo["sigScheme"] = "rsa"
+    assert cliente.post("/api/signature/verify", json=cuerpo).status_code == 400
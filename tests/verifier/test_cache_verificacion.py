@@ -0,0 +1,66 @@
+from pathlib import Path
+import sys
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+
+import verifier
+from app.cache import CacheLRU
+from verifier import NonceStore, verificar_firma
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_cache_lru_tamano_y_ttl():
+    reloj = Reloj()
+    cache = CacheLRU(max_entries=2, ttl=10, clock=reloj)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3) # Desaloja "b", el menos usado
+    assert cache.get("b") is None and cache.get("c") == 3
+
+    reloj.t = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expired'], stats['evicted']) == (2, 2, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_sobre_repetido_no_se_verifica_otra_vez(monkeypatch, tx_firmado):
+    llamadas = []
+    original = verifier.VERIFICADORES["ed25519"]
+    monkeypatch.setitem(verifier.VERIFICADORES, "ed25519",
+                        lambda *args: llamadas.append(args) or original(*args))
+    cache = CacheLRU()
+
+    for _ in range(5):
+        assert verificar_firma(tx_firmado(0), cache=cache).razon == "ok"
+    assert len(llamadas) == 1
+    assert cache.stats()['hits'] == 4
+
+    # Otra firma u otro contenido es otra llave
+    otro = tx_firmado(1)
+    assert verificar_firma(otro, cache=cache).valido
+    otro["signature_b64"] = "b3RyYQ=="
+    verificar_firma(otro, cache=cache)
+    assert len(llamadas) == 3
+
+
+def test_cache_no_guarda_la_decision_de_nonce(tmp_path: Path, tx_firmado):
+    cache = CacheLRU()
+    nonce_store = NonceStore(tmp_path / "nonces.json")
+    assert verificar_firma(tx_firmado(0), nonce_store, cache=cache).valido
+    # El resultado de la firma sale del caché, pero el replay se detecta igual
+    repetido = verificar_firma(tx_firmado(0), nonce_store, cache=cache)
+    assert repetido.razon == "stale_nonce"
+    assert cache.stats()['hits'] == 1
+    # Y un resultado cacheado no impide aceptar el sobre con otro almacén de nonces
+    assert verificar_firma(tx_firmado(0), NonceStore(tmp_path / "otro.json"), cache=cache).valido
@@ -0,0 +1,23 @@
+import os
+
+import keccak_backend
+import sha3_compat
+from keccak_backend import derivar_direccion, direccion_cacheada
+
+
+def test_backend_coincide_con_compat():
+    # Vector conocido: keccak256("") de Ethereum
+    assert keccak_backend.keccak_256_digest(b"").hex() == (
+        "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    )
+    for _ in range(20):
+        data = os.urandom(32)
+        assert keccak_backend.keccak_256_digest(data) == sha3_compat.keccak_256(data).digest()
+
+def test_cache_de_direcciones():
+    keccak_backend.address_cache_clear()
+    pub = os.urandom(32)
+    assert direccion_cacheada(pub) == derivar_direccion(pub)
+    assert direccion_cacheada(bytearray(pub)) == derivar_direccion(pub)
+    info = keccak_backend.address_cache_info()
+    assert info.hits == 1 and info.misses == 1
@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+import sys
+
+
+Directorios = Path(__file__).resolve().parents[2]
+if str(Directorios) not in sys.path:
+    sys.path.insert(0, str(Directorios))
+import verifier
+from verifier import NonceStore
+
+def test_journal_sobrevive_reinicio(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json")
+    store.update_nonce("0xA", 1)
+    store.update_nonce("0xB", 7)
+    store.update_nonce("0xA", 2)
+
+    # Sin compactar, el estado se reconstruye desde el journal
+    assert not (tmp_path / "nonces.json").exists()
+    nuevo = NonceStore(tmp_path / "nonces.json")
+    assert nuevo.last_nonce("0xA") == 2
+    assert nuevo.last_nonce("0xB") == 7
+
+def test_linea_cortada_por_crash(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json")
+    store.update_nonce("0xA", 1)
+    store.close()
+    store = NonceStore(tmp_path / "nonces.json")
+    store.update_nonce("0xA", 2)
+    with open(tmp_path / "nonces.json.wal", "ab") as f:
+        f.write(b'["0xA",3')  # escritura interrumpida
+
+    nuevo = NonceStore(tmp_path / "nonces.json")
+    assert nuevo.last_nonce("0xA") == 2
+    nuevo.update_nonce("0xC", 5)  # el append posterior sigue siendo legible
+    assert NonceStore(tmp_path / "nonces.json").last_nonce("0xC") == 5
+
+def test_compactacion_y_formato_json(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json", compactar_cada=3)
+    for n in range(4):
+        store.update_nonce("0xA", n)
+
+    # Al llegar a 3 entradas se escribió el snapshot y se vació el journal
+    assert json.loads((tmp_path / "nonces.json").read_text(encoding="utf-8")) == {"0xA": 2}
+    assert (tmp_path / "nonces.json.wal").read_bytes().count(b"\n") == 1
+
+    store.close()
+    assert json.loads((tmp_path / "nonces.json").read_text(encoding="utf-8")) == {"0xA": 3}
+    assert (tmp_path / "nonces.json.wal").read_bytes() == b""
+
+def test_lote_agrupa_fsync(tmp_path: Path, monkeypatch):
+    llamadas = []
+    fsync_real = verifier.os.fsync
+    monkeypatch.setattr(verifier.os, "fsync", lambda fd: llamadas.append(fd) or fsync_real(fd))
+
+    store = NonceStore(tmp_path / "nonces.json")
+    with store.lote():
+        for n in range(50):
+            store.update_nonce(f"0x{n}", n)
+    assert len(llamadas) == 1
+
+def test_modo_clasico_sin_journal(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json", journal=False)
+    store.update_nonce("0xA", 4)
+    assert json.loads((tmp_path / "nonces.json").read_text(encoding="utf-8")) == {"0xA": 4}
+    assert not (tmp_path / "nonces.json.wal").exists()
+
+def test_ventana_acepta_desorden_una_sola_vez(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json", ventana=4)
+    assert store.registrar_nonce("0xA", 5)
+    assert store.registrar_nonce("0xA", 3)      # atrasado pero dentro de la ventana
+    assert not store.registrar_nonce("0xA", 3)  # replay
+    assert not store.registrar_nonce("0xA", 5)  # replay del máximo
+    assert store.registrar_nonce("0xA", 9)
+    assert not store.registrar_nonce("0xA", 5)  # ya salió de la ventana
+    assert store.registrar_nonce("0xA", 7)
+    assert store.last_nonce("0xA") == 9
+
+def test_ventana_persiste_en_journal_y_snapshot(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json", ventana=8)
+    for n in (10, 8, 6):
+        assert store.registrar_nonce("0xA", n)
+
+    reiniciado = NonceStore(tmp_path / "nonces.json", ventana=8)
+    assert not reiniciado.registrar_nonce("0xA", 8)
+    assert reiniciado.registrar_nonce("0xA", 7)
+    reiniciado.close()
+
+    # El snapshot JSON sigue siendo address -> nonce máximo
+    assert json.loads((tmp_path / "nonces.json").read_text(encoding="utf-8")) == {"0xA": 10}
+    compactado = NonceStore(tmp_path / "nonces.json", ventana=8)
+    assert not compactado.registrar_nonce("0xA", 7)
+    assert compactado.registrar_nonce("0xA", 9)
+
+def test_ventana_ignora_nonce_fuera_de_rango(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json", ventana=64)
+    store.update_nonce("0xA", 1_000_000)
+    store.update_nonce("0xA", 10)  # Muy por detrás: el bitmap no debe crecer
+    assert store.ventanas["0xA"] <= store._mascara
+    assert store.last_nonce("0xA") == 1_000_000
+    store.close()
+    assert json.loads((tmp_path / "nonces.json").read_text(encoding="utf-8")) == {"0xA": 1_000_000}
+
+def test_sin_ventana_es_estricto(tmp_path: Path):
+    store = NonceStore(tmp_path / "nonces.json")
+    assert store.registrar_nonce("0xA", 5)
+    assert not store.registrar_nonce("0xA", 4)
+    assert store.registrar_nonce("0xA", 6)
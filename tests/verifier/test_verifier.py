@@ -6,43 +6,26 @@ import sys
 Directorios = Path(__file__).resolve().parents[2]
 if str(Directorios) not in sys.path:
     sys.path.insert(0, str(Directorios))
+from cryptography.hazmat.primitives.asymmetric import ed25519
 from verifier import (
     verificar_firma,
+    verificar_lote,
     NonceStore,
     address_from_public_key,
+    canonical_json_bytes,
 )
 
-def tx_firmado(nonce: int = 0) -> dict:
-    public_key_bytes = b"dummypub"
-    signature_bytes = b"dummy_signature"
-    public_key_b64 = base64.b64encode(public_key_bytes).decode("utf-8")
-    signature_b64 = base64.b64encode(signature_bytes).decode("utf-8")
-
-    from_address = address_from_public_key(public_key_bytes)
-    tx = {
-        "from_address": from_address,
-        "to": "0xDESTINO123",
-        "value": "100",
-        "nonce": str(nonce),
-        "timestamp": 1234567890,
-    }
+LLAVE = ed25519.Ed25519PrivateKey.from_private_bytes(b"\x01" * 32)
 
-    data = {
-        "tx": tx,
-        "sig_scheme": "ed25519",
-        "signature_b64": signature_b64,
-        "public_key_b64": public_key_b64,
-    }
-    return data
 
-def test_valid_transaction_ok(tmp_path: Path):
+def test_valid_transaction_ok(tmp_path: Path, tx_firmado):
     nonce_store = NonceStore(tmp_path / "nonce_store.json")
     data = tx_firmado(nonce=0)
     resultado = verificar_firma(data, nonce_store)
     assert resultado.valido is True
     assert resultado.razon == "ok"
 
-def test_replay_nonce(tmp_path: Path):
+def test_replay_nonce(tmp_path: Path, tx_firmado):
     nonce_store = NonceStore(tmp_path / "nonces.json")
     data = tx_firmado(nonce=0)
     rec1 = verificar_firma(data, nonce_store)
@@ -53,25 +36,154 @@ def test_replay_nonce(tmp_path: Path):
     assert rec2.valido is False
     assert rec2.razon == "stale_nonce"
 
-def test_bad_format_missing_field():
+def test_bad_format_missing_field(tx_firmado):
     data = tx_firmado(nonce=0)
     del data["tx"]["from_address"]
     resultado = verificar_firma(data, nonce_store=None)
     assert resultado.valido is False
     assert resultado.razon == "Formato invalido"
 
-def test_address_mismatch(tmp_path: Path):
+def test_address_mismatch(tmp_path: Path, tx_firmado):
     nonce_store = NonceStore(tmp_path / "nonces.json")
-    data = tx_firmado(nonce=0)
-    data["tx"]["from_address"] = "0x" + "deadbeef" * 5
+    data = tx_firmado(nonce=0, from_address="0x" + "deadbeef" * 5) # Firma válida de otra dirección
     resultado = verificar_firma(data, nonce_store)
     assert resultado.valido is False
     assert resultado.razon == "Direccion invalida"
 
-def test_bad_signature(tmp_path: Path):
+def test_bad_signature(tmp_path: Path, tx_firmado):
     nonce_store = NonceStore(tmp_path / "nonces.json")
     data = tx_firmado(nonce=0)
     data["signature_b64"] = base64.b64encode(b"").decode("utf-8")
     resultado = verificar_firma(data, nonce_store)
     assert resultado.valido is False
-    assert resultado.razon == "Firma invalida"
\ No newline at end of file
+    assert resultado.razon == "Firma invalida"
+def test_verificar_lote_orden_y_nonces(tmp_path: Path, tx_firmado):
+    nonce_store = NonceStore(tmp_path / "nonces.json")
+    envelopes = [tx_firmado(nonce=n) for n in (0, 1, 1, 2)]
+    envelopes.append({"tx": "no es dict"})
+
+    resultados = verificar_lote(envelopes, nonce_store, workers=2, chunk_size=2)
+
+    assert [r.razon for r in resultados] == [
+        "ok", "ok", "stale_nonce", "ok", "Formato invalido"
+    ]
+    assert nonce_store.last_nonce(envelopes[0]["tx"]["from_address"]) == 2
+
+def test_verificar_lote_con_transaction_en_procesos(tmp_path: Path):
+    # Los sobres con un Transaction (no dict) tienen que poder viajar a los workers
+    from app.signer import Signer
+    from app.transaction import Transaction
+
+    signer = Signer(LLAVE)
+    remitente = address_from_public_key(signer.public_bytes)
+    envelopes = []
+    for nonce in range(5):
+        tx = Transaction(remitente, "0xDESTINO123", 100, nonce, timestamp="2025-01-01T00:00:00Z")
+        envelopes.append(dict(signer.sign_transaction(tx), tx=tx))
+
+    resultados = verificar_lote(envelopes, NonceStore(tmp_path / "n.json"), workers=2, chunk_size=2)
+    assert [r.razon for r in resultados] == ["ok"] * 5
+
+def test_tx_con_from_y_sobre_raro_fallan_por_elemento(tmp_path: Path, tx_firmado):
+    public_key_bytes = LLAVE.public_key().public_bytes_raw()
+    tx = {"from": address_from_public_key(public_key_bytes), "to": "0xDESTINO123", "value": "1",
+          "nonce": "0", "timestamp": 1234567890}
+    solo_from = {
+        "tx": tx,
+        "sig_scheme": "ed25519",
+        "signature_b64": base64.b64encode(LLAVE.sign(canonical_json_bytes(tx))).decode("utf-8"),
+        "pubkey_b64": base64.b64encode(public_key_bytes).decode("utf-8"),  # Nombre que emite el Signer
+    }
+    raro = dict(tx_firmado(nonce=1), sig_scheme=["ed25519"])  # Lanza TypeError al despachar
+
+    resultados = verificar_lote([solo_from, raro, tx_firmado(nonce=2)], NonceStore(tmp_path / "n.json"),
+                                workers=2, chunk_size=1)
+
+    assert [r.razon for r in resultados] == ["ok", "Formato invalido", "ok"]
+    assert "TypeError" in resultados[1].detalles
+
+def test_verificar_lote_igual_a_secuencial(tmp_path: Path, tx_firmado):
+    envelopes = [tx_firmado(nonce=n % 3) for n in range(20)]
+    secuencial_store = NonceStore(tmp_path / "a.json")
+    secuencial = [verificar_firma(e, secuencial_store) for e in envelopes]
+    lote = verificar_lote(envelopes, NonceStore(tmp_path / "b.json"), workers=1, chunk_size=3)
+    assert lote == secuencial
+
+def test_ventana_en_verificar_firma(tmp_path: Path, tx_firmado):
+    nonce_store = NonceStore(tmp_path / "nonces.json", ventana=16)
+    resultados = [verificar_firma(tx_firmado(nonce=n), nonce_store) for n in (2, 0, 1, 1)]
+    assert [r.razon for r in resultados] == ["ok", "ok", "ok", "stale_nonce"]
+
+def test_firma_ed25519_real_y_cache_de_llaves(tx_firmado):
+    from verifier import pubkey_cache_clear, pubkey_cache_info
+
+    pubkey_cache_clear()
+    for n in range(3):
+        assert verificar_firma(tx_firmado(nonce=n)).razon == "ok"
+    info = pubkey_cache_info()["ed25519"]
+    assert (info["misses"], info["hits"]) == (1, 2) # La llave se parsea una sola vez
+
+    data = tx_firmado(nonce=0)
+    data["tx"]["value"] = "101" # Tx alterado después de firmar
+    assert verificar_firma(data).razon == "Firma invalida"
+
+def test_verificar_firma_secp256k1_der_y_cruda():
+    import hashlib
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+    from verifier import verificarFirma_secp256k1
+
+    llave = ec.derive_private_key(12345, ec.SECP256K1())
+    pub = llave.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint)
+    digest = hashlib.sha256(b"mensaje").digest()
+    der = llave.sign(b"mensaje", ec.ECDSA(hashes.SHA256()))
+    r, s = decode_dss_signature(der)
+    cruda = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    assert verificarFirma_secp256k1(pub, digest, der)
+    assert verificarFirma_secp256k1(pub, digest, cruda)
+    assert not verificarFirma_secp256k1(pub, hashlib.sha256(b"otro").digest(), cruda)
+
+def sobre_secp256k1(nonce: int, incluir_pubkey: bool = False) -> dict:
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from app.signer import Signer
+    from app.transaction import Transaction
+
+    signer = Signer(ec.derive_private_key(777, ec.SECP256K1()), incluir_pubkey=incluir_pubkey)
+    tx = Transaction(address_from_public_key(signer.public_bytes, "secp256k1"), "0xDESTINO123", 100, nonce,
+                     timestamp=1234567890)
+    return signer.sign_transaction(tx)
+
+def test_secp256k1_con_y_sin_llave_publica(tmp_path: Path):
+    import verifier
+    from app.binary_envelope import codificar
+
+    assert verificar_firma(sobre_secp256k1(0, incluir_pubkey=True)).razon == "ok"
+
+    verifier.llaves_recuperadas.clear()
+    nonce_store = NonceStore(tmp_path / "nonces.json")
+    resultados = [verificar_firma(sobre_secp256k1(n), nonce_store).razon for n in (0, 1, 1)]
+    assert resultados == ["ok", "ok", "stale_nonce"]
+    assert verifier.llaves_recuperadas.stats()["hits"] == 2 # Solo el primero recupera la llave
+
+    binario = codificar(sobre_secp256k1(2))
+    assert len(binario) < len(codificar(sobre_secp256k1(2, incluir_pubkey=True)))
+    assert verificar_firma(binario, nonce_store).razon == "ok"
+
+def test_secp256k1_sin_llave_rechaza_otra_direccion_o_alteracion():
+    import verifier
+
+    verifier.llaves_recuperadas.clear()
+    sobre = sobre_secp256k1(0)
+    sobre["tx"]["value"] = "999" # Con otro mensaje se recupera otra llave
+    assert verificar_firma(sobre).razon == "Direccion invalida"
+
+    assert verificar_firma(sobre_secp256k1(0)).razon == "ok" # Deja la llave en el caché
+    sobre = sobre_secp256k1(1)
+    sobre["tx"]["value"] = "999" # La llave conocida no la valida y la recuperada no coincide
+    assert verificar_firma(sobre).razon == "Direccion invalida"
+
+    sobre = sobre_secp256k1(0)
+    sobre["signature_b64"] = base64.b64encode(base64.b64decode(sobre["signature_b64"])[:64]).decode()
+    assert verificar_firma(sobre).razon == "Firma invalida" # Sin v no hay recuperación
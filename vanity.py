@@ -0,0 +1,147 @@
+"""
+Búsqueda de direcciones "vanity" (con un prefijo o sufijo hexadecimal reconocible)
+Reparte la búsqueda en varios procesos; cada uno genera y hashea llaves en lotes
+"""
+
+import argparse
+import getpass
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from almallave import crear_keystore, derivar_direccion_keccak
+from keccak_backend import keccak_256_digest
+
+HEX = set("0123456789abcdef")
+
+
+def normalizar_patron(patron: str) -> str:
+    """Quita el 0x opcional, pasa a minúsculas y valida que sea hexadecimal."""
+    patron = (patron or "").lower()
+    if patron.startswith("0x"):
+        patron = patron[2:]
+    if not set(patron) <= HEX:
+        raise ValueError(f"El patrón debe ser hexadecimal: {patron}")
+    if len(patron) > 40:
+        raise ValueError("El patrón no puede ser más largo que una dirección (40 caracteres)")
+    return patron
+
+def intentos_esperados(prefijo: str = "", sufijo: str = "") -> int:
+    """Número esperado de intentos para encontrar el patrón."""
+    return 16 ** (len(prefijo) + len(sufijo))
+
+def _buscar_en_proceso(prefijo, sufijo, lote, contador, encontrado, resultados):
+    # Ciclo caliente: todo lo que se usa en cada vuelta se enlaza a variables locales
+    from_private_bytes = Ed25519PrivateKey.from_private_bytes
+    keccak_digest = keccak_256_digest
+    urandom = os.urandom
+    tam = 32 * lote
+
+    while not encontrado.is_set():
+        semillas = urandom(tam)
+        for inicio in range(0, tam, 32):
+            semilla = semillas[inicio:inicio + 32]
+            pub = from_private_bytes(semilla).public_key().public_bytes_raw()
+            direccion = keccak_digest(pub)[12:].hex()
+            if direccion.startswith(prefijo) and direccion.endswith(sufijo):
+                resultados.put((semilla, pub))
+                encontrado.set()
+                break
+        with contador.get_lock():
+            contador.value += lote
+
+def buscar_vanity(prefijo: str = "", sufijo: str = "", workers: int = None,
+                  lote: int = 2048, reporte=None, intervalo: float = 1.0,
+                  max_intentos: int = None):
+    """
+    Busca una llave Ed25519 cuya dirección empiece con prefijo y termine con sufijo.
+    reporte(intentos, intentos_por_segundo) se llama cada `intervalo` segundos.
+    Regresa (llave_privada, pub_bytes, direccion, intentos) o None si se alcanzó max_intentos.
+    """
+    prefijo = normalizar_patron(prefijo)
+    sufijo = normalizar_patron(sufijo)
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    contador = mp.Value("Q", 0)
+    encontrado = mp.Event()
+    resultados = mp.Queue()
+    procesos = [
+        mp.Process(target=_buscar_en_proceso,
+                   args=(prefijo, sufijo, lote, contador, encontrado, resultados),
+                   daemon=True)
+        for _ in range(workers)
+    ]
+    inicio = time.perf_counter()
+    for proceso in procesos:
+        proceso.start()
+
+    ganador = None
+    try:
+        while ganador is None:
+            try:
+                ganador = resultados.get(timeout=intervalo)
+            except queue.Empty:
+                pass
+            intentos = contador.value
+            if reporte is not None:
+                transcurrido = time.perf_counter() - inicio
+                reporte(intentos, intentos / transcurrido if transcurrido else 0.0)
+            if max_intentos is not None and intentos >= max_intentos:
+                break
+    finally:
+        encontrado.set()
+        for proceso in procesos:
+            proceso.join(timeout=5)
+            if proceso.is_alive():
+                proceso.terminate()
+
+    if ganador is None:
+        return None
+    semilla, pub = ganador
+    return (Ed25519PrivateKey.from_private_bytes(semilla), pub,
+            derivar_direccion_keccak(pub), contador.value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca una dirección con prefijo/sufijo y la guarda en un keystore")
+    parser.add_argument("--prefijo", default="", help="prefijo hexadecimal (después de 0x)")
+    parser.add_argument("--sufijo", default="", help="sufijo hexadecimal")
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto uno por núcleo)")
+    parser.add_argument("--lote", type=int, default=2048, help="llaves por lote en cada proceso")
+    parser.add_argument("--keystore", required=True, help="ruta del keystore donde se guarda la llave encontrada")
+    parser.add_argument("--passphrase-env", metavar="VARIABLE",
+                        help="toma la passphrase de una variable de entorno")
+    args = parser.parse_args()
+
+    try:
+        prefijo = normalizar_patron(args.prefijo)
+        sufijo = normalizar_patron(args.sufijo)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    if args.passphrase_env:
+        passphrase = os.environ.get(args.passphrase_env, "")
+    else:
+        passphrase = getpass.getpass("Passphrase del keystore: ")
+    if len(passphrase) < 8:
+        sys.exit("La passphrase debe tener al menos 8 caracteres")
+
+    print(f"Buscando 0x{prefijo}...{sufijo} (~{intentos_esperados(prefijo, sufijo):,} intentos esperados)")
+
+    def reporte(intentos, tasa):
+        print(f"\r  {intentos:,} intentos, {tasa:,.0f}/s", end="", flush=True)
+
+    llave, _, direccion, intentos = buscar_vanity(prefijo, sufijo, workers=args.workers,
+                                                  lote=args.lote, reporte=reporte)
+    print(f"\nEncontrada {direccion} tras {intentos:,} intentos")
+
+    crear_keystore(args.keystore, passphrase, llave_privada=llave)
+    print(f"Keystore guardado en {args.keystore}")
+
+
+if __name__ == "__main__":
+    main()
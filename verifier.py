@@ -1,10 +1,22 @@
 from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
 from pathlib import Path
+import os
 import json
 import base64
 import hashlib
-from app.canonicalizer import canonicalize
-from almallave import derivar_direccion_keccak
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed, encode_dss_signature
+from app.canonicalizer import canonicalize_tx
+from app.transaction import Transaction
+from app.binary_envelope import decodificar as decodificar_binario
+from app.cache import CacheLRU
+from app import secp256k1
+from keccak_backend import direccion_cacheada
 
 @dataclass
 class VerificaResultato: # Resultado de la verificación de firma
@@ -19,112 +31,415 @@ class VerificaResultato: # Resultado de la verificación de firma
         return data
 
 class NonceStore: # Almacén de nonces para prevenir replay attacks
-    def __init__(self, path: Path) -> None: # Inicializa el almacén de nonces
-        self.path = Path(path) # Ruta al archivo de nonces
-        if self.path.exists(): # Si el archivo existe, lo cargamos
+    # Con journal=True cada actualización se agrega a un log (<path>.wal) en vez de reescribir
+    # todo el JSON; el JSON queda como snapshot (mismo formato de siempre) y se compacta cada
+    # `compactar_cada` entradas. Dentro de `with store.lote():` los fsync se agrupan en uno solo.
+    # Con ventana=W > 0 se acepta cada nonce una sola vez dentro de los últimos W (estilo IPsec):
+    # por dirección se guarda el máximo visto y un bitmap de W bits (bit i = nonce máximo - i visto).
+    def __init__(self, path: Path, journal: bool = True, compactar_cada: int = 10000,
+                 ventana: int = 0) -> None: # Inicializa el almacén de nonces
+        self.path = Path(path) # Ruta al archivo de nonces (snapshot JSON)
+        self.journal = journal # Si se usa el log de escritura anticipada
+        self.journal_path = self.path.with_name(self.path.name + ".wal") # Ruta del log
+        self.compactar_cada = max(1, int(compactar_cada)) # Entradas del log antes de compactar
+        self._log = None # Archivo del log abierto en modo append
+        self._entradas_log = 0 # Entradas en el log desde el último snapshot
+        self._nivel_lote = 0 # Profundidad de lotes anidados
+        self._pendiente_sync = False # Hay escrituras sin fsync dentro de un lote
+        self.ventana = max(0, int(ventana)) # Tamaño de la ventana anti-replay (0 = estricto)
+        self._mascara = (1 << self.ventana) - 1 # Bits válidos del bitmap
+        self.ventanas_path = self.path.with_name(self.path.name + ".ventanas") # Bitmaps del snapshot
+
+        self.nonces: dict[str, int] = self._leer_snapshot(self.path) # Cargar nonces desde el snapshot
+        self.ventanas: dict[str, int] = {} # Bitmap por dirección (solo con ventana)
+        if self.ventana: # Sin bitmap guardado se asume todo visto: es lo conservador
+            guardadas = self._leer_snapshot(self.ventanas_path)
+            self.ventanas = {a: int(guardadas.get(a, self._mascara)) & self._mascara for a in self.nonces}
+        if self.journal: # Reaplicar la cola del log sobre el snapshot
+            self._reproducir_log()
+
+    def _leer_snapshot(self, path: Path) -> dict[str, int]: # Lee un snapshot JSON si existe
+        if path.exists(): # Si el archivo existe, lo cargamos
             try: 
-                self.nonces: dict[str, int] = json.loads( # Cargar nonces desde el archivo
-                    self.path.read_text(encoding="utf-8") # Leer el contenido del archivo
+                return json.loads( # Cargar nonces desde el archivo
+                    path.read_text(encoding="utf-8") # Leer el contenido del archivo
                 )
             except json.JSONDecodeError: # Si hay un error de decodificación JSON
-                self.nonces = {} # Inicializar nonces vacíos
-        else:
-            self.nonces = {} # Inicializar nonces vacíos
+                return {} # Inicializar nonces vacíos
+        return {} # Inicializar nonces vacíos
+
+    def _reproducir_log(self) -> None: # Aplica las entradas completas del log
+        if not self.journal_path.exists():
+            return
+        contenido = self.journal_path.read_bytes()
+        valido = 0 # Offset hasta donde el log está íntegro
+        while valido < len(contenido):
+            fin = contenido.find(b"\n", valido)
+            if fin == -1: # Línea cortada por un crash a mitad de escritura
+                break
+            try:
+                entrada = json.loads(contenido[valido:fin]) # [address, nonce] o [address, nonce, bitmap]
+                address, nonce = entrada[0], int(entrada[1])
+            except (ValueError, TypeError, IndexError, KeyError): # Entrada corrupta: se descarta desde aquí
+                break
+            self.nonces[address] = nonce
+            if self.ventana:
+                bitmap = entrada[2] if len(entrada) > 2 else self._mascara
+                self.ventanas[address] = int(bitmap) & self._mascara
+            self._entradas_log += 1
+            valido = fin + 1
+        if valido < len(contenido): # Se recorta la cola dañada para que los appends sigan siendo legibles
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valido)
+
+    def _abrir_log(self):
+        if self._log is None:
+            self._log = open(self.journal_path, "ab")
+        return self._log
+
+    def _sync(self) -> None: # Baja el log a disco
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._pendiente_sync = False
 
     def last_nonce(self, address: str) -> int: # Obtiene el último nonce para una dirección
         return int(self.nonces.get(address, -1)) 
 
+    def acepta_nonce(self, address: str, nonce: int) -> bool: # True si el nonce no es replay (O(1), sin modificar)
+        last = self.nonces.get(address)
+        if last is None or nonce > last: # Dirección nueva o nonce por encima del máximo
+            return True
+        if not self.ventana: # Modo estricto: solo nonces crecientes
+            return False
+        atraso = last - nonce
+        if atraso >= self.ventana: # Demasiado viejo, fuera de la ventana
+            return False
+        return not (self.ventanas[address] >> atraso) & 1 # Dentro de la ventana: aceptar si no se ha visto
+
+    def registrar_nonce(self, address: str, nonce: int) -> bool: # Verifica y registra el nonce en un solo paso
+        nonce = int(nonce)
+        if not self.acepta_nonce(address, nonce):
+            return False
+        self.update_nonce(address, nonce)
+        return True
+
     def update_nonce(self, address: str, nonce: int) -> None: # Actualiza el nonce para una dirección
-        self.nonces[address] = int(nonce) # Actualiza el nonce en el diccionario
-        self.path.write_text( # Guarda los nonces en el archivo
-            json.dumps(self.nonces, indent=2), # Formatea el JSON con indentación
-            encoding="utf-8", # Usa UTF-8 para escribir el archivo
-        )
+        nonce = int(nonce)
+        if self.ventana: # Desplaza el bitmap o marca el bit del nonce atrasado
+            last = self.nonces.get(address)
+            if last is None:
+                self.ventanas[address] = 1
+            elif nonce > last:
+                desplazamiento = nonce - last
+                bitmap = self.ventanas.get(address, self._mascara)
+                self.ventanas[address] = ((bitmap << desplazamiento) | 1) & self._mascara if desplazamiento < self.ventana else 1
+            else:
+                atraso = last - nonce
+                if atraso >= self.ventana: # Fuera de la ventana: no cabe en el bitmap y no cambia nada
+                    return
+                self.ventanas[address] = (self.ventanas[address] | 1 << atraso) & self._mascara
+                nonce = last # El máximo no cambia
+        self.nonces[address] = nonce # Actualiza el nonce en el diccionario
+        if not self.journal: # Modo clásico: reescribe el JSON completo
+            self._escribir_snapshots()
+            return
+
+        entrada = [address, nonce, self.ventanas[address]] if self.ventana else [address, nonce]
+        linea = json.dumps(entrada, separators=(",", ":")) + "\n" # Entrada del log
+        self._abrir_log().write(linea.encode("utf-8"))
+        self._entradas_log += 1
+        if self._nivel_lote: # Dentro de un lote el fsync se hace una sola vez al final
+            self._pendiente_sync = True
+        else:
+            self._sync()
+            if self._entradas_log >= self.compactar_cada:
+                self.compactar()
+
+    @contextmanager
+    def lote(self): # Group commit: un solo fsync para todas las actualizaciones del bloque
+        self._nivel_lote += 1
+        try:
+            yield self
+        finally:
+            self._nivel_lote -= 1
+            if self._nivel_lote == 0 and self.journal:
+                if self._pendiente_sync:
+                    self._sync()
+                if self._entradas_log >= self.compactar_cada:
+                    self.compactar()
+
+    def _escribir_snapshots(self) -> None: # Escribe nonces (y bitmaps si hay ventana)
+        if self.ventana: # Primero los bitmaps: si hay un crash el journal los reconstruye
+            self._escribir_snapshot(self.ventanas_path, self.ventanas)
+        self._escribir_snapshot(self.path, self.nonces)
+
+    def _escribir_snapshot(self, destino: Path, datos: dict) -> None: # Escribe el JSON de forma atómica
+        tmp = destino.with_name(destino.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(datos, indent=2)) # Mismo formato legible de siempre
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, destino) # Reemplazo atómico: nunca queda un JSON a medias
+
+    def compactar(self) -> None: # Vuelca el estado al snapshot y vacía el log
+        if self._pendiente_sync:
+            self._sync()
+        self._escribir_snapshots()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self.journal_path.exists(): # Si hay un crash antes de esto, reaplicar el log es idempotente
+            with open(self.journal_path, "wb") as f:
+                os.fsync(f.fileno())
+        self._entradas_log = 0
+
+    def exportar(self, destino: Path) -> None: # Exporta los nonces al formato JSON clásico
+        self._escribir_snapshot(Path(destino), self.nonces)
+
+    def close(self) -> None: # Compacta lo pendiente y cierra el log
+        if self.journal and self._entradas_log:
+            self.compactar()
+        elif self._log is not None:
+            self._log.close()
+            self._log = None
 
 def canonical_json_bytes(tx: dict) -> bytes: # Convierte un diccionario a bytes JSON canónicos
-    return canonicalize(tx)
+    return canonicalize_tx(tx) # Motor rápido, mismos bytes que canonicalize
 
-def address_from_public_key(public_key: bytes) -> str: # Deriva una dirección desde la clave pública
-    return derivar_direccion_keccak(public_key)
+def address_from_public_key(public_key: bytes, sig_scheme: str = "ed25519") -> str: # Deriva una dirección desde la clave pública
+    if sig_scheme == "secp256k1": # Estilo Ethereum: keccak(X || Y), igual para llave comprimida o no
+        return _direccion_secp256k1(bytes(public_key))
+    return direccion_cacheada(public_key) # Remitentes ya vistos: solo una búsqueda en el caché LRU
 
-def verificarFirma_ed25519(public_key: bytes, message: bytes, signature: bytes) -> bool: # Verifica una firma Ed25519
-    return len(signature) > 0 
+@lru_cache(maxsize=int(os.environ.get("ADDRESS_CACHE_SIZE", 65536)))
+def _direccion_secp256k1(public_key: bytes) -> str: # Descomprimir el punto cuesta una raíz modular: se memoriza por llave
+    return direccion_cacheada(secp256k1.sin_comprimir(public_key))
+
+# Llaves públicas ya parseadas por remitente: from_public_bytes/from_encoded_point solo corren
+# la primera vez que se ve una llave. PUBKEY_CACHE_SIZE=0 desactiva el caché
+PUBKEY_CACHE_SIZE = int(os.environ.get("PUBKEY_CACHE_SIZE", 4096))
+
+@lru_cache(maxsize=PUBKEY_CACHE_SIZE)
+def _llave_ed25519(public_key: bytes) -> ed25519.Ed25519PublicKey: # Parsea una llave Ed25519 (32 bytes)
+    return ed25519.Ed25519PublicKey.from_public_bytes(public_key)
+
+@lru_cache(maxsize=PUBKEY_CACHE_SIZE)
+def _llave_secp256k1(public_key: bytes) -> ec.EllipticCurvePublicKey: # Parsea un punto SEC1 (33 o 65 bytes)
+    return ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256K1(), public_key)
 
+def pubkey_cache_info() -> dict: # Hits/misses/tamaño del caché de llaves parseadas, por esquema
+    return {"ed25519": _llave_ed25519.cache_info()._asdict(), "secp256k1": _llave_secp256k1.cache_info()._asdict()}
+
+def pubkey_cache_clear() -> None: # Vacía el caché de llaves parseadas
+    _llave_ed25519.cache_clear()
+    _llave_secp256k1.cache_clear()
+
+def verificarFirma_ed25519(public_key: bytes, message: bytes, signature: bytes) -> bool: # Verifica una firma Ed25519
+    try:
+        _llave_ed25519(bytes(public_key)).verify(bytes(signature), bytes(message)) # Lanza si la firma no corresponde
+    except InvalidSignature: # Firma inválida para esta llave y mensaje
+        return False
+    return True
 
 def verificarFirma_secp256k1(public_key: bytes, digest: bytes, signature: bytes) -> bool: # Verifica una firma secp256k1
-    return len(signature) > 0
+    signature = bytes(signature)
+    if len(signature) == secp256k1.LARGO_FIRMA: # Firma recuperable r || s || v: v no hace falta para verificar
+        signature = signature[:64]
+    if len(signature) == 64: # Formato crudo r || s (32 bytes cada uno)
+        signature = encode_dss_signature(int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big"))
+    try: # Cualquier otro largo se interpreta como DER
+        _llave_secp256k1(bytes(public_key)).verify(signature, bytes(digest), ec.ECDSA(Prehashed(hashes.SHA256())))
+    except InvalidSignature: # Firma inválida para esta llave y digest
+        return False
+    return True
+
+def _verificar_secp256k1_mensaje(public_key: bytes, message: bytes, signature: bytes) -> bool: # secp256k1 firma el SHA-256 del mensaje
+    return verificarFirma_secp256k1(public_key, hashlib.sha256(message).digest(), signature)
+
+# Tabla de despacho: esquema -> verificador(public_key, bytes canónicos, firma)
+VERIFICADORES = {
+    "ed25519": verificarFirma_ed25519,
+    "secp256k1": _verificar_secp256k1_mensaje,
+}
+
+# Esquemas cuya firma permite recuperar la llave pública (el sobre puede omitir public_key_b64)
+RECUPERABLES = {"secp256k1"}
+
+# from_address -> llave recuperada; solo entra una llave cuya dirección ya coincidió con from_address.
+# Para un remitente conocido basta verificar con OpenSSL en lugar de recuperar en Python (~2 ms)
+llaves_recuperadas = CacheLRU(max_entries=int(os.environ.get("RECOVERED_KEY_CACHE_SIZE", 4096)), ttl=None)
+
+def recuperar_llave_secp256k1(from_address: str, message: bytes, signature: bytes) -> tuple[bytes, bool]: # Llave del firmante de un sobre sin public_key_b64
+    if len(signature) != secp256k1.LARGO_FIRMA: # Sin v no hay recuperación, esté o no la llave en caché
+        raise ValueError(f"la firma recuperable debe tener {secp256k1.LARGO_FIRMA} bytes")
+    digest = hashlib.sha256(message).digest() # secp256k1 firma el SHA-256 de los bytes canónicos
+    conocida = llaves_recuperadas.get(from_address)
+    if conocida is not None and verificarFirma_secp256k1(conocida, digest, signature): # Remitente repetido
+        return conocida, True # La firma ya quedó verificada con la llave conocida
+    return secp256k1.recuperar_llave(digest, signature), False # Lanza ValueError si no se puede recuperar
+
+def _fallo(resultado: VerificaResultato) -> tuple[VerificaResultato, None, None]: # Resultado de error sin address ni nonce
+    return resultado, None, None
+
+def verificar_sin_nonce(data: dict | bytes, cache=None) -> tuple[VerificaResultato, str | None, int | None]: # Etapa sin estado: formato, firma y dirección
+    try: # Un sobre con una forma inesperada falla solo, no tumba el lote ni el pool
+        return _verificar_sin_nonce(data, cache)
+    except Exception as e:
+        return _fallo(VerificaResultato(False, "Formato invalido", f"sobre inválido: {type(e).__name__}: {e}"))
 
-def verificar_firma(data: dict, nonce_store: NonceStore | None = None) -> VerificaResultato: # Verifica la firma de una transacción
-    if not isinstance(data, dict): # Si data no es un diccionario
-        return VerificaResultato(False, "Formato invalido", "data no es un diccionario")
+def _llave_publica_b64(data: dict) -> str | None: # public_key_b64, o pubkey_b64 tal como lo emite el Signer
+    return data.get("public_key_b64", data.get("pubkey_b64"))
 
-    for campo in ["tx", "sig_scheme", "signature_b64", "public_key_b64"]: # Campos requeridos
-        if campo not in data: # Si falta un campo
-            return VerificaResultato(False, "Formato invalido", f"falta campo: {campo}")
+def _verificar_sin_nonce(data: dict | bytes, cache=None) -> tuple[VerificaResultato, str | None, int | None]:
+    sobre_binario = None # Sobre en formato binario (firma y llave ya vienen crudas)
+    if isinstance(data, (bytes, bytearray, memoryview)): # Si data es un sobre binario
+        try:
+            sobre_binario = decodificar_binario(data) # Decodifica sin copiar firma ni llave
+        except ValueError as e: # Si el sobre binario está mal formado
+            return _fallo(VerificaResultato(False, "Formato invalido", f"sobre binario inválido: {e}"))
+        if sobre_binario.public_key is None and sobre_binario.sig_scheme not in RECUPERABLES: # El sobre no trae llave pública
+            return _fallo(VerificaResultato(False, "Formato invalido", "falta campo: public_key_b64"))
+        data = {"tx": sobre_binario.tx, "sig_scheme": sobre_binario.sig_scheme}
+    elif not isinstance(data, dict): # Si data no es un diccionario
+        return _fallo(VerificaResultato(False, "Formato invalido", "data no es un diccionario"))
+    else:
+        for campo in ["tx", "sig_scheme", "signature_b64", "public_key_b64"]: # Campos requeridos
+            if campo == "public_key_b64" and data.get("sig_scheme") in RECUPERABLES: # Se puede recuperar de la firma
+                continue
+            if campo == "public_key_b64" and "pubkey_b64" in data: # Alias que usa el Signer
+                continue
+            if campo not in data: # Si falta un campo
+                return _fallo(VerificaResultato(False, "Formato invalido", f"falta campo: {campo}"))
 
     tx = data["tx"] # Obtiene la transacción
+    tx_obj = None # Transaction ya construida (trae sus bytes canónicos memorizados)
+    if isinstance(tx, Transaction):
+        tx_obj, tx = tx, tx.to_dict()
     if not isinstance(tx, dict): # Si tx no es un diccionario
-        return VerificaResultato(False, "Formato invalido", "tx debe ser un dict")
+        return _fallo(VerificaResultato(False, "Formato invalido", "tx debe ser un dict"))
 
     for campo in ["to", "value", "nonce", "timestamp"]: # Campos requeridos en tx
         if campo not in tx: # Si falta un campo en tx
-            return VerificaResultato(False, "Formato invalido", f"falta campo en tx: {campo}")
+            return _fallo(VerificaResultato(False, "Formato invalido", f"falta campo en tx: {campo}"))
 
     #Para que no haya errores con el archivo transaction
     if "from_address" not in tx and "from" not in tx:
-        return VerificaResultato(
+        return _fallo(VerificaResultato(
             False,
             "Formato invalido",
             "Falta from en el campo tx"
-        )
+        ))
 
     try: # Convierte nonce a entero
         nonce_int = int(tx["nonce"]) # Convierte nonce a entero
     except (ValueError, TypeError): # Si hay un error en la conversión
-        return VerificaResultato(False, "Formato invalido", "nonce no es entero") 
+        return _fallo(VerificaResultato(False, "Formato invalido", "nonce no es entero"))
 
     sig_scheme = data["sig_scheme"] # Obtiene el esquema de firma
-    if sig_scheme not in ("ed25519", "secp256k1"): # Si el esquema no es soportado
-        return VerificaResultato(False, "Formato invalido", f"sig_scheme no soportado: {sig_scheme}") 
+    if sig_scheme not in VERIFICADORES: # Si el esquema no es soportado
+        return _fallo(VerificaResultato(False, "Formato invalido", f"sig_scheme no soportado: {sig_scheme}"))
 
     try: # Obtiene los bytes JSON canónicos de la transacción
-        canonical_bytes = canonical_json_bytes(tx) # Convierte tx a bytes JSON canónicos
+        canonical_bytes = tx_obj.canonical_bytes if tx_obj is not None else canonical_json_bytes(tx) # Convierte tx a bytes JSON canónicos
     except Exception as e: # Si hay un error en la conversión
-        return VerificaResultato(False, "Formato invalido", f"error al canonicalizar: {e}") 
+        return _fallo(VerificaResultato(False, "Formato invalido", f"error al canonicalizar: {e}"))
 
-    try: # Decodifica la firma y la clave pública desde base64
-        firma = base64.b64decode(data["signature_b64"]) # Decodifica la firma
-        public_key = base64.b64decode(data["public_key_b64"]) # Decodifica la clave pública
-    except Exception as e: # Si hay un error en la decodificación
-        return VerificaResultato(False, "Formato invalido", f"error en base64: {e}") 
+    if sobre_binario is not None: # Formato binario: firma y llave crudas, sin base64
+        firma = sobre_binario.signature
+        public_key = sobre_binario.public_key
+    else:
+        try: # Decodifica la firma y la clave pública desde base64
+            firma = base64.b64decode(data["signature_b64"]) # Decodifica la firma
+            public_key_b64 = _llave_publica_b64(data) # Acepta ambos nombres del campo
+            public_key = base64.b64decode(public_key_b64) if public_key_b64 is not None else None # Decodifica la clave pública
+        except Exception as e: # Si hay un error en la decodificación
+            return _fallo(VerificaResultato(False, "Formato invalido", f"error en base64: {e}"))
 
+    llave_cache = None # Sobre repetido: un hash y una búsqueda en lugar de verificar otra vez
+    if cache is not None: # Solo se guarda el resultado sin estado; el nonce se decide siempre después
+        llave_cache = (sig_scheme, bytes(public_key or b""), hashlib.sha256(canonical_bytes).digest(), bytes(firma))
+        guardado = cache.get(llave_cache)
+        if guardado is not None:
+            resultado, from_address = guardado
+            return resultado, from_address, (nonce_int if from_address is not None else None)
+
+    resultado, from_address = _verificar_firma_y_direccion(sig_scheme, public_key, canonical_bytes, firma, tx)
+    if llave_cache is not None:
+        cache.put(llave_cache, (resultado, from_address))
+    return resultado, from_address, (nonce_int if from_address is not None else None)
+
+def _verificar_firma_y_direccion(sig_scheme: str, public_key: bytes | None, canonical_bytes: bytes, firma: bytes,
+                                 tx: dict) -> tuple[VerificaResultato, str | None]: # Parte cara y determinista: firma y address
+    from_address = str(tx.get("from_address") or tx.get("from")) # Obtiene la dirección del remitente (acepta el alias "from")
+    recuperada = public_key is None # Sobre sin llave: se recupera de la firma
     try: # Verifica la firma según el esquema
-        if sig_scheme == "ed25519": # Si el esquema es Ed25519
-            ok = verificarFirma_ed25519(public_key, canonical_bytes, firma) # Verifica la firma Ed25519
-        else: # Si el esquema es secp256k1
-            digest = hashlib.sha256(canonical_bytes).digest() # Calcula el hash SHA-256 de los bytes canónicos
-            ok = verificarFirma_secp256k1(public_key, digest, firma) # Verifica la firma secp256k1
+        if recuperada: # La recuperación ya implica una firma válida para la llave obtenida
+            public_key, conocida = recuperar_llave_secp256k1(from_address, canonical_bytes, firma)
+            if conocida: # Llave del caché, ya asociada a from_address
+                return VerificaResultato(True, "ok", "transacción válida"), from_address
+            ok = True
+        else:
+            ok = VERIFICADORES[sig_scheme](public_key, canonical_bytes, firma) # Despacho por esquema
     except Exception as e: # Si hay un error durante la verificación
-        return VerificaResultato(False, "Firma invalida", f"error cripto: {e}") 
+        return VerificaResultato(False, "Firma invalida", f"error cripto: {e}"), None
 
     if not ok: # Si la firma no es válida
-        return VerificaResultato(False, "Firma invalida", "firma inválida") 
+        return VerificaResultato(False, "Firma invalida", "firma inválida"), None
 
     try: # Deriva la dirección desde la clave pública
-        derived = address_from_public_key(public_key) # Deriva la dirección
+        derived = address_from_public_key(public_key, sig_scheme) # Deriva la dirección
     except Exception as e: # Si hay un error durante la derivación
-        return VerificaResultato(False, "Direccion invalida", f"no se pudo derivar address: {e}")
+        return VerificaResultato(False, "Direccion invalida", f"no se pudo derivar address: {e}"), None
 
-    from_address = str(tx["from_address"]) or tx.get("from") # Obtiene la dirección del remitente
     if derived != from_address: # Si la dirección derivada no coincide con from_address
         msg = f"address derivada ({derived}) != from_address ({from_address})" # Mensaje de error
-        return VerificaResultato(False, "Direccion invalida", msg) 
+        return VerificaResultato(False, "Direccion invalida", msg), None
+
+    if recuperada: # Solo se guarda una llave que ya coincidió con su dirección
+        llaves_recuperadas.put(from_address, public_key)
+    return VerificaResultato(True, "ok", "transacción válida"), from_address
+
+def aplicar_nonce(resultado: VerificaResultato, from_address: str | None, nonce_int: int | None,
+                  nonce_store: NonceStore | None) -> VerificaResultato: # Etapa con estado: protección contra replay
+    if not resultado.valido or nonce_store is None: # Solo se registran nonces de transacciones válidas
+        return resultado
 
-    if nonce_store is not None: # Si se proporciona un almacén de nonces
+    if not nonce_store.registrar_nonce(from_address, nonce_int): # Verifica y actualiza el nonce en el almacén
         last = nonce_store.last_nonce(from_address) # Obtiene el último nonce registrado
-        if nonce_int <= last: # Si el nonce es menor o igual al último registrado
+        if nonce_store.ventana: # Con ventana: repetido o demasiado viejo
+            msg = f"replay detectado: nonce {nonce_int} repetido o fuera de la ventana de {nonce_store.ventana} (último {last})"
+        else:
             msg = f"replay detectado: nonce {nonce_int} <= último {last}" # Mensaje de replay attack
-            return VerificaResultato(False, "stale_nonce", msg) 
-        nonce_store.update_nonce(from_address, nonce_int) # Actualiza el nonce en el almacén
+        return VerificaResultato(False, "stale_nonce", msg)
+    return resultado
+
+def verificar_firma(data: dict, nonce_store: NonceStore | None = None, cache=None) -> VerificaResultato: # Verifica la firma de una transacción
+    resultado, from_address, nonce_int = verificar_sin_nonce(data, cache) # Formato, firma y dirección (cache: app.cache.CacheLRU opcional)
+    return aplicar_nonce(resultado, from_address, nonce_int, nonce_store) # Nonce al final, en orden
+
+def _verificar_bloque(bloque: list) -> list: # Corre en un proceso del pool: solo la etapa sin estado
+    return [verificar_sin_nonce(data) for data in bloque]
+
+def verificar_lote(envelopes, nonce_store: NonceStore | None = None, workers: int | None = None,
+                   chunk_size: int = 256, executor: Executor | None = None) -> list[VerificaResultato]: # Verifica un lote de transacciones
+    envelopes = list(envelopes) # Materializa el lote para poder partirlo
+    if workers is None: # Por defecto un proceso por núcleo
+        workers = os.cpu_count() or 1
+    chunk_size = max(1, int(chunk_size))
+    bloques = [envelopes[i:i + chunk_size] for i in range(0, len(envelopes), chunk_size)] # Bloques de trabajo
+
+    if executor is not None and len(bloques) > 1: # Pool provisto por quien llama (se reutiliza entre lotes)
+        parciales = executor.map(_verificar_bloque, bloques)
+    elif workers <= 1 or len(bloques) <= 1: # No vale la pena levantar procesos
+        parciales = map(_verificar_bloque, bloques)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(bloques))) as pool:
+            parciales = list(pool.map(_verificar_bloque, bloques)) # map conserva el orden de entrada
 
-    return VerificaResultato(True, "ok", "transacción válida") 
\ No newline at end of file
+    resultados = [] # La etapa de nonces es secuencial y en orden de entrada, así se respeta el orden por address
+    with nonce_store.lote() if nonce_store is not None else nullcontext(): # Un solo fsync para todo el lote
+        for parcial in parciales:
+            for resultado, from_address, nonce_int in parcial:
+                resultados.append(aplicar_nonce(resultado, from_address, nonce_int, nonce_store))
+    return resultados